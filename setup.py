@@ -2,8 +2,8 @@ import os
 import sys
 from setuptools import setup
 
-if sys.version_info < (3, 4):
-    print("Sorry, django-system-maintenance currently requires Python 3.4+.")
+if sys.version_info < (3, 5):
+    print("Sorry, django-system-maintenance currently requires Python 3.5+.")
     sys.exit(1)
 
 # From: https://hynek.me/articles/sharing-your-labor-of-love-pypi-quick-and-dirty/
@@ -16,7 +16,7 @@ def read(*paths):
 os.chdir(os.path.normpath(os.path.join(os.path.abspath(__file__), os.pardir)))
 
 install_requires = [
-    "Django>=2.0,<3.0",    # Confirmed good through 2.1.3
+    "Django>=2.2,<3.0",    # Confirmed good through 2.2.28
     "django-markupfield-helpers>=0.1.1",    # Confirmed good through 0.1.1
     "django-project-home-templatetags>=0.1.0",    # Confirmed good through 0.1.0
 ]
@@ -38,8 +38,7 @@ setup(
         'Development Status :: 3 - Alpha',
         'Environment :: Web Environment',
         'Framework :: Django',
-        'Framework :: Django :: 2.0',
-        'Framework :: Django :: 2.1',
+        'Framework :: Django :: 2.2',
         'Intended Audience :: Developers',
         'Intended Audience :: Information Technology',
         'Intended Audience :: System Administrators',
@@ -47,7 +46,6 @@ setup(
         'Operating System :: OS Independent',
         'Programming Language :: Python',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.4',
         'Programming Language :: Python :: 3.5',
         'Programming Language :: Python :: 3.6',
         'Programming Language :: Python :: 3.7',
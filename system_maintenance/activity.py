@@ -0,0 +1,218 @@
+"""
+Daily rollup of maintenance activity.
+
+`MaintenanceActivity` counts maintenance records per day, system,
+maintenance type and status. Signals adjust the counts as records are
+created, changed and deleted, so trends are read from the rollup instead of
+grouping the whole `MaintenanceRecord` table. Days are in the default time
+zone (`TIME_ZONE`).
+"""
+
+import datetime
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import MaintenanceActivity, MaintenanceRecord
+
+
+# Record fields that decide which rollup row a record counts towards
+KEY_FIELDS = ['datetime', 'system_id', 'maintenance_type_id', 'status']
+
+ActivityKey = namedtuple(
+    'ActivityKey', ['date', 'system_id', 'maintenance_type_id', 'status'])
+
+INTERVALS = ['day', 'week', 'month']
+
+# Trends can be grouped by these fields, labelled by the given lookups
+TREND_GROUPS = {
+    'maintenance_type': 'maintenance_type__maintenance_type',
+    'status': 'status',
+    'system': 'system__name',
+}
+
+ActivityTrend = namedtuple('ActivityTrend', ['periods', 'series', 'totals'])
+ActivityTrend.__doc__ = """
+Maintenance activity over time.
+
+- `periods`: list of the start dates of each day, week or month
+- `series`: list of `(label, counts)` tuples, one per group, where `counts`
+  is a list of record counts for each period
+- `totals`: list of the record counts for each period
+"""
+
+
+def get_activity_date(value):
+    """
+    Return the day (in the default time zone) of a maintenance record's
+    `datetime`.
+    """
+    if settings.USE_TZ and timezone.is_aware(value):
+        value = timezone.localtime(value, timezone.get_default_timezone())
+    return value.date()
+
+
+def get_activity_today():
+    """
+    Return today's date in the default time zone (or in local time, without
+    `USE_TZ`).
+    """
+    if settings.USE_TZ:
+        return timezone.localdate(timezone=timezone.get_default_timezone())
+    return datetime.date.today()
+
+
+def get_activity_key(record):
+    """
+    Return the `ActivityKey` of a maintenance record, or None if any of its
+    fields are deferred.
+    """
+    if any(field not in record.__dict__ for field in KEY_FIELDS):
+        return None
+    return ActivityKey(
+        get_activity_date(record.datetime), record.system_id,
+        record.maintenance_type_id, record.status)
+
+
+def fetch_activity_key(pk):
+    """
+    Return the `ActivityKey` of the saved maintenance record `pk`, or None if
+    there is no such record.
+    """
+    row = MaintenanceRecord.objects.filter(pk=pk).values_list(
+        *KEY_FIELDS).first()
+    if row is None:
+        return None
+    return ActivityKey(get_activity_date(row[0]), *row[1:])
+
+
+def adjust_activity(key, delta):
+    """
+    Add `delta` to the count of records for `key`, creating or deleting its
+    rollup row as needed.
+    """
+    rows = MaintenanceActivity.objects.filter(**key._asdict())
+
+    # Rows that would drop to zero (or below, if the rollup is out of date)
+    if delta < 0 and rows.filter(count__lte=-delta).delete()[0]:
+        return
+    if rows.update(count=F('count') + delta) or delta < 0:
+        return
+
+    try:
+        with transaction.atomic():
+            MaintenanceActivity.objects.create(count=delta, **key._asdict())
+    except IntegrityError:
+        # Created by a concurrent save
+        rows.update(count=F('count') + delta)
+
+
+def rebuild_maintenance_activity():
+    """
+    Recount the rollup from every maintenance record. Returns the number of
+    rollup rows.
+    """
+    with timezone.override(timezone.get_default_timezone()):
+        rows = MaintenanceRecord.objects.order_by().annotate(
+            date=TruncDate('datetime'),
+        ).values(
+            'date', 'system', 'maintenance_type', 'status',
+        ).annotate(count=Count('*'))
+
+        with transaction.atomic():
+            # A raw DELETE doesn't load every row to send delete signals
+            with connection.cursor() as cursor:
+                cursor.execute('DELETE FROM {}'.format(
+                    connection.ops.quote_name(
+                        MaintenanceActivity._meta.db_table)))
+            activity = MaintenanceActivity.objects.bulk_create([
+                MaintenanceActivity(
+                    date=row['date'],
+                    system_id=row['system'],
+                    maintenance_type_id=row['maintenance_type'],
+                    status=row['status'],
+                    count=row['count'],
+                )
+                for row in rows.iterator()])
+    return len(activity)
+
+
+def get_period_start(date, interval):
+    """
+    Return the first day of the day, week (starting on Monday) or month
+    containing `date`.
+    """
+    if interval == 'week':
+        return date - datetime.timedelta(days=date.weekday())
+    if interval == 'month':
+        return date.replace(day=1)
+    return date
+
+
+def get_next_period(start, interval):
+    """
+    Return the first day of the period after the one starting on `start`.
+    """
+    if interval == 'week':
+        return start + datetime.timedelta(days=7)
+    if interval == 'month':
+        return (start.replace(day=28) + datetime.timedelta(days=4)).replace(
+            day=1)
+    return start + datetime.timedelta(days=1)
+
+
+def get_periods(start, end, interval):
+    """
+    Return the start dates of the periods from `start` to `end`, inclusive.
+    """
+    periods = []
+    period = get_period_start(start, interval)
+    while period <= end:
+        periods.append(period)
+        period = get_next_period(period, interval)
+    return periods
+
+
+def get_activity_trend(start, end, interval='month', group_by='system',
+                       filters=None):
+    """
+    Return the `ActivityTrend` of maintenance records from `start` to `end`
+    (dates, inclusive) per `interval` ('day', 'week' or 'month'), grouped by
+    'system', 'maintenance_type' or 'status'. `filters` is a dict of
+    `MaintenanceActivity` lookups (e.g., `{'status': 'Failed'}`).
+
+    Costs one query over the rollup, whatever the number of records.
+    """
+    if interval not in INTERVALS:
+        raise ValueError('Invalid interval {!r}'.format(interval))
+    label = TREND_GROUPS[group_by]
+
+    period = {
+        'day': F('date'),
+        'month': TruncMonth('date'),
+        'week': TruncWeek('date'),
+    }[interval]
+    rows = MaintenanceActivity.objects.filter(
+        date__gte=start, date__lte=end, **(filters or {}),
+    ).order_by().annotate(
+        period=period,
+    ).values('period', label).annotate(count=Sum('count'))
+
+    periods = get_periods(start, end, interval)
+    index = {period: i for i, period in enumerate(periods)}
+    series = {}
+    totals = [0] * len(periods)
+    for row in rows:
+        counts = series.setdefault(row[label], [0] * len(periods))
+        counts[index[row['period']]] += row['count']
+        totals[index[row['period']]] += row['count']
+
+    return ActivityTrend(
+        periods=periods,
+        series=sorted(series.items()),
+        totals=totals,
+    )
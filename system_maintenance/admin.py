@@ -1,31 +1,180 @@
 from django import forms
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.urls import reverse
+from django.utils.html import format_html
 
-from .models import (DocumentationRecord, Hardware, MaintenanceRecord,
-    MaintenanceRecordRelationship, MaintenanceType, Software, SysAdmin, System)
+from .export import export_response
+from .models import (MAINTENANCE_MARKUP_FIELDS, DocumentationRecord, Hardware,
+    MaintenanceRecord, MaintenanceRecordRelationship, MaintenanceType,
+    RenderJob, Software, SysAdmin, System, get_markup_columns)
+from .pagination import EstimatedCountPaginator
+from .search import search_filter
 
 
-class ReferencingRecordInline(admin.TabularInline):
+class FullTextSearchMixin(object):
+    """
+    Search the changelist with the full-text search index instead of
+    `icontains` lookups on `search_fields`.
+
+    `search_record_fields` lists the fields (or 'pk') that refer to records
+    of type `search_record_type`; objects match if any of them refers to a
+    matching record.
+    """
+
+    search_record_fields = ['pk']
+    search_record_type = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+
+        matches = Q()
+        for field in self.search_record_fields:
+            matches |= search_filter(
+                self.search_record_type, search_term, field)
+        return queryset.filter(matches), False
+
+
+class SummaryChangeList(ChangeList):
+    """
+    Lists the `summaries()` of records, leaving out the markup columns that
+    changelists don't show. Change forms still load every column.
+    """
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).summaries()
+
+
+class SummaryChangeListMixin(object):
+    """
+    Use `SummaryChangeList` for the changelist of a model whose queryset
+    has a `summaries()` method.
+    """
+
+    def get_changelist(self, request, **kwargs):
+        return SummaryChangeList
+
+
+# Joins needed to label a relationship (records are labelled by their
+# denormalized `display_label`)
+RELATIONSHIP_SELECT_RELATED = [
+    'referenced_record',
+    'referencing_record',
+]
+
+# Markup columns of the joined records, which relationships don't show
+RELATIONSHIP_DEFERRED = [
+    '{}__{}'.format(record, column)
+    for record in RELATIONSHIP_SELECT_RELATED
+    for column in get_markup_columns(
+        MAINTENANCE_MARKUP_FIELDS, markup_types=True)
+]
+
+
+def get_relationship_queryset(queryset):
+    """
+    Join the records of relationships, without their markup columns.
+    """
+    return queryset.select_related(*RELATIONSHIP_SELECT_RELATED).defer(
+        *RELATIONSHIP_DEFERRED)
+
+
+class RelationshipInline(admin.TabularInline):
     model = MaintenanceRecordRelationship
+
+    def get_queryset(self, request):
+        return get_relationship_queryset(super().get_queryset(request))
+
+
+class ReferencingRecordInline(RelationshipInline):
     fk_name = 'referencing_record'
+    autocomplete_fields = ['referenced_record']
 
 
-class ReferencedRecordInline(admin.TabularInline):
-    model = MaintenanceRecordRelationship
+class ReferencedRecordInline(RelationshipInline):
     fk_name = 'referenced_record'
+    autocomplete_fields = ['referencing_record']
+
+
+class SysAdminListFilter(admin.RelatedFieldListFilter):
+    """
+    List sysadmins to filter by, joining their users for their names.
+    """
+
+    def field_choices(self, field, request, model_admin):
+        return [
+            (sysadmin.pk, str(sysadmin))
+            for sysadmin in SysAdmin.objects.select_related('user').order_by(
+                'user__username')]
+
+
+class SelectedRelatedListFilter(admin.RelatedFieldListFilter):
+    """
+    Filter by an object of a large related table (e.g., hardware) given by
+    pk in the query string, listing only the selected object instead of
+    every row. Links to filtered changelists come from the related
+    object's admin (see `MaintenanceRecordsLinkMixin`).
+    """
+
+    def field_choices(self, field, request, model_admin):
+        if not self.lookup_val:
+            return []
+        try:
+            selected = list(
+                field.related_model.objects.filter(pk=self.lookup_val))
+        except (ValidationError, ValueError):
+            return []
+        return [(obj.pk, str(obj)) for obj in selected]
+
+
+class MaintenanceRecordsLinkMixin(object):
+    """
+    List objects with a link to the maintenance records that mention them,
+    filtered with `SelectedRelatedListFilter`.
+    """
+
+    list_display = ['name', 'maintenance_records']
+
+    maintenance_records_field = None
+
+    def maintenance_records(self, obj):
+        return format_html(
+            '<a href="{}?{}__id__exact={}">Maintenance records</a>',
+            reverse('admin:system_maintenance_maintenancerecord_changelist'),
+            self.maintenance_records_field, obj.pk)
 
 
 @admin.register(Hardware)
-class HardwareAdmin(admin.ModelAdmin):
+class HardwareAdmin(MaintenanceRecordsLinkMixin, admin.ModelAdmin):
+
+    maintenance_records_field = 'hardware'
 
     search_fields = ['name']
 
 
+class MaintenanceRecordAutocompleteSelectMultiple(
+        admin.widgets.AutocompleteSelectMultiple):
+    """
+    Select maintenance records with the `MaintenanceRecord` admin's
+    autocomplete view, for forms whose field isn't a relation to
+    `MaintenanceRecord` (so `rel.model` would point elsewhere).
+    """
+
+    def get_url(self):
+        return reverse(
+            '{}:system_maintenance_maintenancerecord_autocomplete'.format(
+                self.admin_site.name))
+
+
 class DocumentationRecordAdminForm(forms.ModelForm):
     maintenance_records = forms.ModelMultipleChoiceField(
         MaintenanceRecord.objects.all(),
-        widget=admin.widgets.FilteredSelectMultiple(
-            'MaintenanceRecord', False),
+        widget=MaintenanceRecordAutocompleteSelectMultiple(
+            DocumentationRecord._meta.get_field('maintenance_records'),
+            admin.site),
         required=False,
     )
 
@@ -35,17 +184,30 @@ class DocumentationRecordAdminForm(forms.ModelForm):
             self.initial['maintenance_records'] = \
                 self.instance.maintenance_records.values_list('pk', flat=True)
 
-    def save(self, *args, **kwargs):
-        instance = super().save(*args, **kwargs)
-        if instance.pk:
-            instance.maintenance_records.clear()
-            instance.maintenance_records.add(
-                *self.cleaned_data['maintenance_records'])
-        return instance
+    def _save_m2m(self):
+        """
+        Add and remove only the maintenance records whose selection changed.
+        Runs on `save()`, or on `save_m2m()` after `save(commit=False)`.
+        """
+        super()._save_m2m()
+        selected = {
+            record.pk for record in self.cleaned_data['maintenance_records']}
+        current = set(
+            self.instance.maintenance_records.values_list('pk', flat=True))
+
+        if current - selected:
+            self.instance.maintenance_records.remove(*(current - selected))
+        if selected - current:
+            self.instance.maintenance_records.add(*(selected - current))
 
 
 @admin.register(DocumentationRecord)
-class DocumentationRecordAdmin(admin.ModelAdmin):
+class DocumentationRecordAdmin(
+        SummaryChangeListMixin, FullTextSearchMixin, admin.ModelAdmin):
+
+    autocomplete_fields = [
+        'maintenance_type',
+    ]
 
     form = DocumentationRecordAdminForm
 
@@ -95,6 +257,12 @@ class DocumentationRecordAdmin(admin.ModelAdmin):
         'maintenance_type',
     ]
 
+    list_select_related = [
+        'maintenance_type',
+    ]
+
+    paginator = EstimatedCountPaginator
+
     readonly_fields = [
         'created_at',
         'updated_at',
@@ -107,9 +275,18 @@ class DocumentationRecordAdmin(admin.ModelAdmin):
         'documentation',
     ]
 
+    search_record_type = 'documentation'
+
+    show_full_result_count = False
+
 
 @admin.register(MaintenanceRecordRelationship)
-class MaintenanceRecordRelationshipAdmin(admin.ModelAdmin):
+class MaintenanceRecordRelationshipAdmin(FullTextSearchMixin, admin.ModelAdmin):
+
+    autocomplete_fields = [
+        'referencing_record',
+        'referenced_record',
+    ]
 
     list_display = [
         '__str__',
@@ -117,6 +294,8 @@ class MaintenanceRecordRelationshipAdmin(admin.ModelAdmin):
         'referenced_record',
     ]
 
+    paginator = EstimatedCountPaginator
+
     search_fields = [
         'referencing_record__description',
         'referencing_record__procedure',
@@ -134,9 +313,47 @@ class MaintenanceRecordRelationshipAdmin(admin.ModelAdmin):
         'referenced_record__maintenance_type__maintenance_type',
     ]
 
+    search_record_fields = [
+        'referencing_record',
+        'referenced_record',
+    ]
+
+    search_record_type = 'maintenance'
+
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return get_relationship_queryset(super().get_queryset(request))
+
+
+def export_as_csv(modeladmin, request, queryset):
+    return export_response(queryset, 'csv')
+export_as_csv.short_description = 'Export selected maintenance records as CSV'
+
+
+def export_as_jsonl(modeladmin, request, queryset):
+    return export_response(queryset, 'jsonl')
+export_as_jsonl.short_description = \
+    'Export selected maintenance records as JSON Lines'
+
 
 @admin.register(MaintenanceRecord)
-class MaintenanceRecordAdmin(admin.ModelAdmin):
+class MaintenanceRecordAdmin(
+        SummaryChangeListMixin, FullTextSearchMixin, admin.ModelAdmin):
+
+    actions = [
+        export_as_csv,
+        export_as_jsonl,
+    ]
+
+    autocomplete_fields = [
+        'system',
+        'sys_admin',
+        'maintenance_type',
+        'hardware',
+        'software',
+        'documentation_records',
+    ]
 
     fieldset_basic = ('Basic', {
         'fields': [
@@ -185,12 +402,6 @@ class MaintenanceRecordAdmin(admin.ModelAdmin):
         fieldset_documentation,
     ]
 
-    filter_horizontal = [
-        'hardware',
-        'software',
-        'documentation_records',
-    ]
-
     inlines = [
         ReferencingRecordInline,
         ReferencedRecordInline,
@@ -209,11 +420,13 @@ class MaintenanceRecordAdmin(admin.ModelAdmin):
         'status',
         'system',
         'maintenance_type',
-        'hardware',
-        'software',
-        'sys_admin',
+        ('sys_admin', SysAdminListFilter),
+        ('hardware', SelectedRelatedListFilter),
+        ('software', SelectedRelatedListFilter),
     ]
 
+    paginator = EstimatedCountPaginator
+
     save_on_top = True
 
     search_fields = [
@@ -222,6 +435,16 @@ class MaintenanceRecordAdmin(admin.ModelAdmin):
         'problems',
     ]
 
+    search_record_type = 'maintenance'
+
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # Used by both the changelist (which ignores `list_select_related`
+        # once a queryset has joins) and autocomplete results
+        return super().get_queryset(request).select_related(
+            'maintenance_type', 'sys_admin__user', 'system')
+
 
 @admin.register(MaintenanceType)
 class MaintenanceTypeAdmin(admin.ModelAdmin):
@@ -232,8 +455,37 @@ class MaintenanceTypeAdmin(admin.ModelAdmin):
     ]
 
 
+@admin.register(RenderJob)
+class RenderJobAdmin(admin.ModelAdmin):
+
+    list_display = [
+        '__str__',
+        'queued_at',
+        'attempts',
+        'error',
+    ]
+
+    list_filter = [
+        'record_type',
+    ]
+
+    readonly_fields = [
+        'record_type',
+        'record_id',
+        'field_name',
+        'queued_at',
+        'attempts',
+        'error',
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(Software)
-class SoftwareAdmin(admin.ModelAdmin):
+class SoftwareAdmin(MaintenanceRecordsLinkMixin, admin.ModelAdmin):
+
+    maintenance_records_field = 'software'
 
     search_fields = ['name']
 
@@ -247,4 +499,16 @@ class SystemAdmin(admin.ModelAdmin):
     ]
 
 
-admin.site.register(SysAdmin)
+@admin.register(SysAdmin)
+class SysAdminAdmin(admin.ModelAdmin):
+
+    search_fields = [
+        'user__username',
+        'user__first_name',
+        'user__last_name',
+    ]
+
+    def get_queryset(self, request):
+        # Changelist rows and autocomplete results are labelled with each
+        # sysadmin's name
+        return super().get_queryset(request).select_related('user')
@@ -0,0 +1,390 @@
+"""
+Read-only JSON API.
+
+Each resource is listed at `api/<resource>/`:
+
+- `?fields=id,name`: include only these fields (markup fields, e.g.
+  `description`, are only loaded and included when requested)
+- `?ids=1,2,3`: fetch these records, in this order, instead of a page
+- `?cursor=...`: fetch the next or previous page (see `next` and
+  `previous` in each response)
+- `?limit=100`: page size
+"""
+
+from functools import wraps
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+from django.http import Http404, JsonResponse
+from django.urls import reverse
+
+from .app_settings import SYSTEM_MAINTENANCE_PAGINATE_BY
+from .caching import VERSIONED_MODELS
+from .forms import MaintenanceRecordFilterForm
+from .models import (DocumentationRecord, Hardware, MaintenanceRecord,
+    MaintenanceType, Software, System)
+from .pagination import InvalidCursor, KeysetPaginator
+from .views import request_sysadmin_check, versioned_condition
+
+
+MAX_LIMIT = 1000
+
+
+class BadRequest(Exception):
+    pass
+
+
+class Column:
+
+    """
+    A model field stored in a single column.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def get_columns(self):
+        return [self.name]
+
+    def prepare(self, queryset):
+        return queryset
+
+    def serialize(self, obj):
+        return getattr(obj, self.name)
+
+
+class Markup(Column):
+
+    """
+    A `MarkupField`, serialized as its raw text, markup type and rendered
+    HTML.
+    """
+
+    def get_columns(self):
+        return [
+            self.name,
+            '{}_markup_type'.format(self.name),
+            '_{}_rendered'.format(self.name),
+        ]
+
+    def serialize(self, obj):
+        markup = getattr(obj, self.name)
+        return {
+            'markup_type': markup.markup_type,
+            'raw': markup.raw,
+            'rendered': markup.rendered,
+        }
+
+
+class Related(Column):
+
+    """
+    A foreign key, serialized as the related object's id and name. The
+    related object is joined; `columns` are the fields its name is built
+    from.
+    """
+
+    def __init__(self, name, columns):
+        super().__init__(name)
+        self.columns = columns
+
+    def get_columns(self):
+        columns = [self.name]
+        for column in self.columns:
+            # Traversed relations (e.g., 'user__username') must be included
+            # along with their fields
+            parts = column.split('__')
+            columns.extend(
+                '__'.join([self.name] + parts[:i + 1])
+                for i in range(len(parts)))
+        return columns
+
+    def prepare(self, queryset):
+        related = [
+            '__'.join([self.name] + column.split('__')[:-1])
+            for column in self.columns]
+        return queryset.select_related(*related)
+
+    def serialize(self, obj):
+        related = getattr(obj, self.name)
+        return {'id': related.pk, 'name': str(related)}
+
+
+class ManyRelated(Related):
+
+    """
+    A many-to-many relation, serialized as a list of the related objects'
+    ids and names. The related objects are prefetched with one query.
+    """
+
+    def get_columns(self):
+        return []
+
+    def prepare(self, queryset):
+        model = queryset.model._meta.get_field(self.name).related_model
+        return queryset.prefetch_related(Prefetch(
+            self.name, queryset=model.objects.only('pk', *self.columns)))
+
+    def serialize(self, obj):
+        return [
+            {'id': related.pk, 'name': str(related)}
+            for related in getattr(obj, self.name).all()]
+
+
+class Resource:
+
+    """
+    A model exposed by the API.
+
+    `fields` maps field names to `Column`s; fields in `default_fields` are
+    included unless `?fields=` is given. `ordering` must identify records
+    uniquely, for keyset pagination.
+    """
+
+    model = None
+    fields = {}
+    default_fields = []
+    ordering = ['pk']
+
+    def get_queryset(self, request):
+        return self.model.objects.all()
+
+    def get_fields(self, request):
+        """
+        Return the requested fields as a list of `(name, Column)` tuples.
+        """
+        names = request.GET.get('fields')
+        if not names:
+            names = self.default_fields
+        else:
+            names = [name.strip() for name in names.split(',')]
+            unknown = [name for name in names if name not in self.fields]
+            if unknown:
+                raise BadRequest('Unknown fields: {}'.format(
+                    ', '.join(unknown)))
+        return [(name, self.fields[name]) for name in names]
+
+    def prepare_queryset(self, queryset, fields):
+        """
+        Load only the columns needed for `fields` and for the ordering, and
+        join or prefetch related objects.
+        """
+        columns = ['pk'] + [
+            name.lstrip('-') for name in self.ordering if name != 'pk']
+        for name, field in fields:
+            columns.extend(field.get_columns())
+            queryset = field.prepare(queryset)
+        return queryset.only(*columns)
+
+    def serialize(self, obj, fields):
+        return {name: field.serialize(obj) for name, field in fields}
+
+
+class DocumentationRecordResource(Resource):
+    model = DocumentationRecord
+    fields = {
+        'id': Column('id'),
+        'title': Column('title'),
+        'maintenance_type': Related('maintenance_type', ['maintenance_type']),
+        'documentation': Markup('documentation'),
+        'created_at': Column('created_at'),
+        'updated_at': Column('updated_at'),
+    }
+    default_fields = [
+        'id',
+        'title',
+        'maintenance_type',
+        'created_at',
+        'updated_at',
+    ]
+    ordering = ['title']
+
+
+class MaintenanceRecordResource(Resource):
+    model = MaintenanceRecord
+    fields = {
+        'id': Column('id'),
+        'system': Related('system', ['name']),
+        'sys_admin': Related(
+            'sys_admin',
+            ['user__first_name', 'user__last_name', 'user__username']),
+        'maintenance_type': Related('maintenance_type', ['maintenance_type']),
+        'hardware': ManyRelated('hardware', ['name']),
+        'software': ManyRelated('software', ['name']),
+        'documentation_records': ManyRelated(
+            'documentation_records', ['title']),
+        'datetime': Column('datetime'),
+        'status': Column('status'),
+        'description': Markup('description'),
+        'procedure': Markup('procedure'),
+        'problems': Markup('problems'),
+        'updated_at': Column('updated_at'),
+    }
+    default_fields = [
+        'id',
+        'system',
+        'sys_admin',
+        'maintenance_type',
+        'hardware',
+        'software',
+        'documentation_records',
+        'datetime',
+        'status',
+        'updated_at',
+    ]
+    ordering = ['-datetime', 'pk']
+
+    def get_queryset(self, request):
+        """
+        Apply the same query-string filters as the maintenance record list
+        (e.g., `?system=1&status=Failed`).
+        """
+        filter_form = MaintenanceRecordFilterForm(request.GET)
+        if not filter_form.is_valid():
+            raise BadRequest('Invalid filter.')
+        return filter_form.filter(super().get_queryset(request))
+
+
+class MaintenanceTypeResource(Resource):
+    model = MaintenanceType
+    fields = {
+        'id': Column('id'),
+        'maintenance_type': Column('maintenance_type'),
+        'description': Column('description'),
+    }
+    default_fields = ['id', 'maintenance_type', 'description']
+
+
+class NamedResource(Resource):
+    fields = {
+        'id': Column('id'),
+        'name': Column('name'),
+    }
+    default_fields = ['id', 'name']
+
+
+class HardwareResource(NamedResource):
+    model = Hardware
+
+
+class SoftwareResource(NamedResource):
+    model = Software
+
+
+class SystemResource(NamedResource):
+    model = System
+    fields = dict(NamedResource.fields, description=Column('description'))
+    default_fields = ['id', 'name', 'description']
+
+
+RESOURCES = {
+    'documentation': DocumentationRecordResource(),
+    'hardware': HardwareResource(),
+    'maintenance-types': MaintenanceTypeResource(),
+    'records': MaintenanceRecordResource(),
+    'software': SoftwareResource(),
+    'systems': SystemResource(),
+}
+
+
+def parse_ids(value):
+    try:
+        ids = [int(pk) for pk in value.split(',') if pk.strip()]
+    except ValueError:
+        raise BadRequest('Invalid ids.')
+    if len(ids) > MAX_LIMIT:
+        raise BadRequest('Too many ids (the maximum is {}).'.format(
+            MAX_LIMIT))
+    return ids
+
+
+def parse_limit(value):
+    if value is None:
+        return SYSTEM_MAINTENANCE_PAGINATE_BY
+    try:
+        limit = int(value)
+    except ValueError:
+        raise BadRequest('Invalid limit.')
+    if not 1 <= limit <= MAX_LIMIT:
+        raise BadRequest('Limit must be between 1 and {}.'.format(MAX_LIMIT))
+    return limit
+
+
+def get_page_url(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query.pop('cursor', None)
+    query['cursor'] = cursor
+    return request.build_absolute_uri('{}?{}'.format(
+        request.path, query.urlencode()))
+
+
+def get_response_data(request, resource):
+    fields = resource.get_fields(request)
+    queryset = resource.prepare_queryset(
+        resource.get_queryset(request), fields)
+
+    if 'ids' in request.GET:
+        ids = parse_ids(request.GET['ids'])
+        objects = queryset.in_bulk(ids)
+        return {
+            'results': [
+                resource.serialize(objects[pk], fields)
+                for pk in ids if pk in objects],
+        }
+
+    paginator = KeysetPaginator(
+        queryset, parse_limit(request.GET.get('limit')), resource.ordering)
+    try:
+        page = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor:
+        raise BadRequest('Invalid cursor.')
+    return {
+        'results': [resource.serialize(obj, fields) for obj in page],
+        'next': get_page_url(request, page.next_cursor),
+        'previous': get_page_url(request, page.previous_cursor),
+    }
+
+
+def api_view(view):
+    """
+    Decorate an API view to return 403 Forbidden (as JSON) to users who
+    aren't active sysadmins.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request_sysadmin_check(request):
+            return JsonResponse({'error': 'Permission denied.'}, status=403)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+@api_view
+def index_view(request):
+    """
+    List the URLs of the API's resources.
+    """
+    return JsonResponse({
+        name: request.build_absolute_uri(reverse(
+            'system_maintenance:api_resource', args=[name]))
+        for name in sorted(RESOURCES)
+    })
+
+
+@api_view
+@versioned_condition(VERSIONED_MODELS)
+def resource_view(request, resource_name):
+    """
+    List a resource's records as JSON.
+    """
+    try:
+        resource = RESOURCES[resource_name]
+    except KeyError:
+        raise Http404('Unknown resource.')
+
+    try:
+        data = get_response_data(request, resource)
+    except BadRequest as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(data, encoder=DjangoJSONEncoder)
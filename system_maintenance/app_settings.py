@@ -2,3 +2,16 @@ from django.conf import settings
 
 
 SYSTEM_MAINTENANCE_PAGINATE_BY = getattr(settings, 'SYSTEM_MAINTENANCE_PAGINATE_BY', 30)
+SYSTEM_MAINTENANCE_PAGINATION = getattr(settings, 'SYSTEM_MAINTENANCE_PAGINATION', 'keyset')
+SYSTEM_MAINTENANCE_CHAIN_MAX_DEPTH = getattr(settings, 'SYSTEM_MAINTENANCE_CHAIN_MAX_DEPTH', 10)
+SYSTEM_MAINTENANCE_SYSADMIN_SESSION_TTL = getattr(settings, 'SYSTEM_MAINTENANCE_SYSADMIN_SESSION_TTL', 60)
+SYSTEM_MAINTENANCE_CACHE = getattr(settings, 'SYSTEM_MAINTENANCE_CACHE', 'default')
+SYSTEM_MAINTENANCE_STATE_TIMEOUT = getattr(settings, 'SYSTEM_MAINTENANCE_STATE_TIMEOUT', 60)
+SYSTEM_MAINTENANCE_FRAGMENT_TIMEOUT = getattr(settings, 'SYSTEM_MAINTENANCE_FRAGMENT_TIMEOUT', 60 * 60 * 24)
+SYSTEM_MAINTENANCE_SEARCH_CONFIG = getattr(settings, 'SYSTEM_MAINTENANCE_SEARCH_CONFIG', 'english')
+SYSTEM_MAINTENANCE_SEARCH_LIMIT = getattr(settings, 'SYSTEM_MAINTENANCE_SEARCH_LIMIT', 500)
+SYSTEM_MAINTENANCE_METRICS_IPS = getattr(settings, 'SYSTEM_MAINTENANCE_METRICS_IPS', [])
+SYSTEM_MAINTENANCE_SLOW_QUERY_COUNT = getattr(settings, 'SYSTEM_MAINTENANCE_SLOW_QUERY_COUNT', 5)
+SYSTEM_MAINTENANCE_ASYNC_RENDERING = getattr(settings, 'SYSTEM_MAINTENANCE_ASYNC_RENDERING', None)
+SYSTEM_MAINTENANCE_ASYNC_RENDERING_MIN_SIZE = getattr(settings, 'SYSTEM_MAINTENANCE_ASYNC_RENDERING_MIN_SIZE', 20000)
+SYSTEM_MAINTENANCE_RENDER_WORKERS = getattr(settings, 'SYSTEM_MAINTENANCE_RENDER_WORKERS', 2)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SystemMaintenanceConfig(AppConfig):
     name = 'system_maintenance'
     verbose_name = 'System Maintenance'
+
+    def ready(self):
+        from . import signals  # noqa: F401
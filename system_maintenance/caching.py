@@ -0,0 +1,214 @@
+import hashlib
+import time
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+
+from .app_settings import (SYSTEM_MAINTENANCE_CACHE,
+    SYSTEM_MAINTENANCE_FRAGMENT_TIMEOUT, SYSTEM_MAINTENANCE_STATE_TIMEOUT)
+from .models import (DocumentationRecord, Hardware, MaintenanceRecord,
+    MaintenanceRecordRelationship, MaintenanceType, Software, SysAdmin,
+    System)
+
+
+KEY_PREFIX = 'system_maintenance'
+
+DASHBOARD_COUNT_MODELS = {
+    'documentation_record_count': DocumentationRecord,
+    'hardware_count': Hardware,
+    'maintenance_record_count': MaintenanceRecord,
+    'maintenance_type_count': MaintenanceType,
+    'software_count': Software,
+    'sys_admin_count': SysAdmin,
+    'system_count': System,
+}
+
+# Models whose saves and deletes bump a version timestamp, used to answer
+# conditional GET requests (see `views.versioned_condition`)
+VERSIONED_MODELS = [
+    DocumentationRecord,
+    Hardware,
+    MaintenanceRecord,
+    MaintenanceRecordRelationship,
+    MaintenanceType,
+    Software,
+    SysAdmin,
+    System,
+    get_user_model(),
+]
+
+# Fragment cache hits and misses in this process
+fragment_cache_stats = Counter()
+
+
+def get_cache():
+    """
+    Return the cache used by System Maintenance
+    (`SYSTEM_MAINTENANCE_CACHE`, 'default' by default).
+    """
+    return caches[SYSTEM_MAINTENANCE_CACHE]
+
+
+def _count_key(model):
+    return '{}:count:{}'.format(KEY_PREFIX, model._meta.label_lower)
+
+
+def count_rows(models):
+    """
+    Count the rows of each model's table in a single round-trip.
+    Returns a list of counts in the same order as `models`.
+    """
+    subqueries = [
+        '(SELECT COUNT(*) FROM {})'.format(
+            connection.ops.quote_name(model._meta.db_table))
+        for model in models]
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT {}'.format(', '.join(subqueries)))
+        return list(cursor.fetchone())
+
+
+def rebuild_dashboard_counts():
+    """
+    Recount every dashboard model and store the counts in the counter cache
+    for `SYSTEM_MAINTENANCE_STATE_TIMEOUT` seconds. Returns a dict of counts
+    keyed by context variable name.
+    """
+    names = sorted(DASHBOARD_COUNT_MODELS)
+    models = [DASHBOARD_COUNT_MODELS[name] for name in names]
+    counts = count_rows(models)
+
+    get_cache().set_many(
+        {_count_key(model): count for model, count in zip(models, counts)},
+        timeout=SYSTEM_MAINTENANCE_STATE_TIMEOUT)
+    return dict(zip(names, counts))
+
+
+def get_dashboard_counts():
+    """
+    Return a dict of dashboard counts keyed by context variable name,
+    rebuilding the counter cache if any count is missing from it.
+    """
+    keys = {
+        name: _count_key(model)
+        for name, model in DASHBOARD_COUNT_MODELS.items()}
+    cached = get_cache().get_many(keys.values())
+
+    if len(cached) < len(keys):
+        return rebuild_dashboard_counts()
+    return {name: cached[key] for name, key in keys.items()}
+
+
+def adjust_dashboard_count(model, delta):
+    """
+    Add `delta` to a model's cached count. A count that isn't cached is left
+    alone; it gets rebuilt the next time the dashboard counts are read.
+    """
+    try:
+        get_cache().incr(_count_key(model), delta)
+    except ValueError:
+        pass
+
+
+def _version_key(model):
+    return '{}:version:{}'.format(KEY_PREFIX, model._meta.label_lower)
+
+
+def get_model_versions(models):
+    """
+    Return a list of the times (as timestamps) that each model last changed.
+
+    A model whose version isn't cached is treated as having just changed,
+    so conditional requests never match an unknown version. Versions are
+    kept for `SYSTEM_MAINTENANCE_STATE_TIMEOUT` seconds, so a change bumped
+    in another process's cache (e.g., with the per-process `LocMemCache`) is
+    noticed once they expire.
+    """
+    cache = get_cache()
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+
+    missing = {key: time.time() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=SYSTEM_MAINTENANCE_STATE_TIMEOUT)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump_model_versions(models):
+    """
+    Record that the models' tables just changed.
+    """
+    now = time.time()
+    get_cache().set_many(
+        {_version_key(model): now for model in models},
+        timeout=SYSTEM_MAINTENANCE_STATE_TIMEOUT)
+
+
+def _fragment_key(name, obj, vary_on):
+    return '{}:fragment:{}:{}:{}:{}:{}'.format(
+        KEY_PREFIX, name, obj._meta.label_lower, obj.pk,
+        ':'.join(str(value) for value in vary_on),
+        obj.updated_at.isoformat())
+
+
+def get_fragment(name, obj, render, vary_on=()):
+    """
+    Return a fragment of HTML for `obj` from the cache, calling `render()`
+    to create and cache it on a miss.
+
+    Keys include `obj.updated_at`, so a fragment is invalidated as soon as
+    its object is saved; stale fragments expire after
+    `SYSTEM_MAINTENANCE_FRAGMENT_TIMEOUT` seconds.
+    """
+    cache = get_cache()
+    key = _fragment_key(name, obj, vary_on)
+    fragment = cache.get(key)
+    if fragment is None:
+        fragment_cache_stats['misses'] += 1
+        fragment = render()
+        cache.set(key, fragment, SYSTEM_MAINTENANCE_FRAGMENT_TIMEOUT)
+    else:
+        fragment_cache_stats['hits'] += 1
+    return fragment
+
+
+def _versioned_fragment_key(name, models, vary_on):
+    parts = [repr(version) for version in get_model_versions(models)]
+    parts += [str(value) for value in vary_on]
+    return '{}:versioned:{}:{}'.format(
+        KEY_PREFIX, name, hashlib.md5(':'.join(parts).encode()).hexdigest())
+
+
+def get_versioned_fragment(name, models, render, vary_on=()):
+    """
+    Return a fragment of HTML (e.g., a whole page) built from `models` from
+    the cache, calling `render()` to create and cache it on a miss.
+
+    Keys include the models' version timestamps, so a fragment is
+    invalidated as soon as one of the models changes (see
+    `bump_model_versions()`); stale fragments expire after
+    `SYSTEM_MAINTENANCE_FRAGMENT_TIMEOUT` seconds. Hits and misses are
+    counted along with those of `get_fragment()`.
+    """
+    cache = get_cache()
+    key = _versioned_fragment_key(name, models, vary_on)
+    fragment = cache.get(key)
+    if fragment is None:
+        fragment_cache_stats['misses'] += 1
+        fragment = render()
+        cache.set(key, fragment, SYSTEM_MAINTENANCE_FRAGMENT_TIMEOUT)
+    else:
+        fragment_cache_stats['hits'] += 1
+    return fragment
+
+
+def get_fragment_cache_stats():
+    """
+    Return a dict of the fragment cache hits and misses in this process.
+    """
+    return {
+        'hits': fragment_cache_stats['hits'],
+        'misses': fragment_cache_stats['misses'],
+    }
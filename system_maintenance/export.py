@@ -0,0 +1,187 @@
+"""
+Stream maintenance records as CSV or JSON Lines.
+
+Exported columns match those read by the `import_maintenance_records`
+management command, so an export can be imported into another database.
+"""
+
+import csv
+import json
+import re
+from collections import defaultdict
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.http import StreamingHttpResponse
+
+from .models import MaintenanceRecord, MaintenanceRecordRelationship
+
+
+EXPORT_CHUNK_SIZE = 1000
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+LIST_SEPARATOR = ';'
+
+MARKUP_FIELDS = ['description', 'procedure', 'problems']
+
+EXPORT_FIELDS = [
+    'id',
+    'system',
+    'sys_admin',
+    'maintenance_type',
+    'datetime',
+    'status',
+    'description',
+    'description_markup_type',
+    'procedure',
+    'procedure_markup_type',
+    'problems',
+    'problems_markup_type',
+    'hardware',
+    'software',
+    'references',
+]
+
+
+def _group_names(through_rows):
+    names = defaultdict(list)
+    for record_id, name in through_rows:
+        names[record_id].append(name)
+    return names
+
+
+def join_list(values, separator=LIST_SEPARATOR):
+    """
+    Join list values (e.g., hardware names) into a string, escaping
+    backslashes and separators within them with a backslash.
+    """
+    return separator.join(
+        str(value).replace('\\', '\\\\').replace(separator, '\\' + separator)
+        for value in values)
+
+
+def split_list(value, separator=LIST_SEPARATOR):
+    """
+    Split a string joined by `join_list()` into its stripped, non-empty
+    items.
+    """
+    items = []
+    item = []
+    position = 0
+    pattern = r'\\(\\|{0})|{0}'.format(re.escape(separator))
+    for match in re.finditer(pattern, value):
+        item.append(value[position:match.start()])
+        if match.group(1) is None:
+            items.append(''.join(item))
+            item = []
+        else:
+            item.append(match.group(1))
+        position = match.end()
+    item.append(value[position:])
+    items.append(''.join(item))
+    return [item.strip() for item in items if item.strip()]
+
+
+def export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield a dict of `EXPORT_FIELDS` for each maintenance record in
+    `queryset`, newest first.
+
+    Records are read with a chunked `.iterator()` that joins their system,
+    maintenance type and sysadmin; hardware, software and references are
+    fetched with one query each per chunk. Only one chunk is held in memory
+    at a time.
+    """
+    username = 'sys_admin__user__{}'.format(get_user_model().USERNAME_FIELD)
+    values = queryset.order_by('-datetime', 'pk').values_list(
+        'pk',
+        'system__name',
+        username,
+        'maintenance_type__maintenance_type',
+        'datetime',
+        'status',
+        *[
+            column for field in MARKUP_FIELDS
+            for column in [field, '{}_markup_type'.format(field)]
+        ]
+    ).iterator(chunk_size=chunk_size)
+
+    while True:
+        chunk = list(islice(values, chunk_size))
+        if not chunk:
+            break
+
+        pks = [row[0] for row in chunk]
+        hardware = _group_names(
+            MaintenanceRecord.hardware.through.objects.filter(
+                maintenancerecord__in=pks,
+            ).order_by('hardware__name').values_list(
+                'maintenancerecord', 'hardware__name'))
+        software = _group_names(
+            MaintenanceRecord.software.through.objects.filter(
+                maintenancerecord__in=pks,
+            ).order_by('software__name').values_list(
+                'maintenancerecord', 'software__name'))
+        references = _group_names(
+            MaintenanceRecordRelationship.objects.filter(
+                referencing_record__in=pks,
+            ).order_by('referenced_record').values_list(
+                'referencing_record', 'referenced_record'))
+
+        for row in chunk:
+            record = dict(zip(EXPORT_FIELDS, row))
+            record['datetime'] = record['datetime'].isoformat()
+            record['hardware'] = hardware[record['id']]
+            record['software'] = software[record['id']]
+            record['references'] = references[record['id']]
+            yield record
+
+
+class Echo:
+
+    """
+    A file-like object that returns what is written to it, so that
+    `csv.writer` can produce lines for a streaming response.
+    """
+
+    def write(self, value):
+        return value
+
+
+def export_csv(rows):
+    """
+    Yield CSV lines for exported rows, joining list values with
+    `join_list()`.
+    """
+    writer = csv.DictWriter(Echo(), fieldnames=EXPORT_FIELDS)
+    yield writer.writerow(dict(zip(EXPORT_FIELDS, EXPORT_FIELDS)))
+    for row in rows:
+        for field in ['hardware', 'software', 'references']:
+            row[field] = join_list(row[field])
+        yield writer.writerow(row)
+
+
+def export_jsonl(rows):
+    """
+    Yield a line of JSON for each exported row.
+    """
+    for row in rows:
+        yield json.dumps(row) + '\n'
+
+
+def export_response(queryset, export_format, filename='maintenance-records'):
+    """
+    Return a `StreamingHttpResponse` of maintenance records as CSV or JSON
+    Lines (`export_format` is 'csv' or 'jsonl').
+    """
+    serialize = export_csv if export_format == 'csv' else export_jsonl
+    response = StreamingHttpResponse(
+        serialize(export_rows(queryset)),
+        content_type=EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = 'attachment; filename="{}.{}"'.format(
+        filename, export_format)
+    return response
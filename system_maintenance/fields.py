@@ -0,0 +1,78 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import models
+from markupfield_helpers import helpers
+
+from .app_settings import (SYSTEM_MAINTENANCE_ASYNC_RENDERING,
+    SYSTEM_MAINTENANCE_ASYNC_RENDERING_MIN_SIZE)
+
+
+# Stored in place of a markup field's HTML until it has been rendered
+RENDERING_PLACEHOLDER = \
+    '<p class="text-muted rendering-placeholder">Rendering…</p>'
+
+_local = threading.local()
+
+
+@contextmanager
+def rendering_inline():
+    """
+    Render every markup field as it's saved, whatever
+    `SYSTEM_MAINTENANCE_ASYNC_RENDERING` is (e.g., for bulk inserts, which
+    don't send the signals that queue render jobs).
+    """
+    previous = getattr(_local, 'inline', False)
+    _local.inline = True
+    try:
+        yield
+    finally:
+        _local.inline = previous
+
+
+def defers_rendering(raw):
+    """
+    Return whether markup is large enough to be rendered off-request.
+    """
+    return bool(
+        SYSTEM_MAINTENANCE_ASYNC_RENDERING and raw and
+        len(raw) >= SYSTEM_MAINTENANCE_ASYNC_RENDERING_MIN_SIZE and
+        not getattr(_local, 'inline', False))
+
+
+class MarkupField(helpers.MarkupField):
+
+    """
+    A markup field whose large bodies can be rendered after the record is
+    saved, instead of while it's saved (see `rendering.py`).
+
+    Saves store `RENDERING_PLACEHOLDER` as the HTML of a deferred field and
+    list the field in the record's `_deferred_renders`, for `post_save` to
+    queue a render job.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # markupfield's `MarkupField.contribute_to_class()` gives the markup
+        # type and rendered fields this field's creation counter + 1 and + 2,
+        # which would otherwise equal the next fields' counters. Fields
+        # compare by creation counter, so equal counters make `defer()` and
+        # `only()` pick the wrong columns. Reserve both counters (tested by
+        # `MarkupFieldCreationCounterTest`).
+        models.Field.creation_counter += 2
+
+    def pre_save(self, model_instance, add):
+        value = getattr(model_instance, self.attname)
+        if not defers_rendering(value.raw):
+            return super().pre_save(model_instance, add)
+
+        if value.markup_type not in self.markup_choices_list:
+            raise ValueError(
+                'Invalid markup type ({}), allowed values: {}'.format(
+                    value.markup_type, ', '.join(self.markup_choices_list)))
+        setattr(
+            model_instance, '_{}_rendered'.format(self.attname),
+            RENDERING_PLACEHOLDER)
+        model_instance.__dict__.setdefault(
+            '_deferred_renders', []).append(self.name)
+        return value.raw
@@ -0,0 +1,141 @@
+import datetime
+
+from django import forms
+from django.forms.forms import pretty_name
+
+from .activity import (INTERVALS, TREND_GROUPS, get_activity_today,
+    get_period_start, get_periods)
+from .models import (STATUS_CHOICES, Hardware, MaintenanceType, Software,
+    SysAdmin, System)
+
+
+class MaintenanceRecordFilterForm(forms.Form):
+
+    """
+    Validate query-string filters for maintenance records
+    (e.g., `?system=1&status=Failed`).
+
+    Filters are matched by the `MaintenanceRecord` indexes on
+    `(<field>, -datetime, id)`, so filtered lists stay index-ordered.
+    """
+
+    hardware = forms.ModelChoiceField(Hardware.objects.all(), required=False)
+    maintenance_type = forms.ModelChoiceField(
+        MaintenanceType.objects.all(), required=False)
+    software = forms.ModelChoiceField(Software.objects.all(), required=False)
+    status = forms.ChoiceField(choices=STATUS_CHOICES, required=False)
+    sys_admin = forms.ModelChoiceField(
+        SysAdmin.objects.select_related('user'), required=False)
+    system = forms.ModelChoiceField(System.objects.all(), required=False)
+
+    def __init__(self, data=None, *args, **kwargs):
+        # Only bind the filters present in the query string, so that
+        # unfiltered lists don't validate (and query) every field
+        if data is not None:
+            data = {
+                name: data[name] for name in self.base_fields
+                if data.get(name)}
+        super().__init__(data, *args, **kwargs)
+
+    def get_filters(self):
+        """
+        Return a dict of the filters in use, keyed by field name.
+        Call only after `is_valid()` returns `True`.
+        """
+        return {
+            name: value for name, value in self.cleaned_data.items()
+            if value}
+
+    def get_active_filters(self):
+        """
+        Return a list of `(label, value)` tuples for the filters in use.
+        """
+        return [
+            (pretty_name(name), value)
+            for name, value in sorted(self.get_filters().items())]
+
+    def filter(self, queryset):
+        """
+        Apply the filters in use to a maintenance record queryset.
+        """
+        return queryset.filter(**self.get_filters())
+
+
+class ActivityTrendForm(forms.Form):
+
+    """
+    Validate query-string parameters for maintenance activity trends
+    (e.g., `?group_by=status&interval=week&system=1`).
+
+    By default, trends cover the last `DEFAULT_PERIODS` months (or weeks or
+    days) up to today.
+    """
+
+    DEFAULT_PERIODS = 12
+    MAX_PERIODS = 1000
+
+    end = forms.DateField(required=False)
+    group_by = forms.ChoiceField(
+        choices=[(group, group) for group in sorted(TREND_GROUPS)],
+        required=False)
+    interval = forms.ChoiceField(
+        choices=[(interval, interval) for interval in INTERVALS],
+        required=False)
+    maintenance_type = forms.ModelChoiceField(
+        MaintenanceType.objects.all(), required=False)
+    start = forms.DateField(required=False)
+    status = forms.ChoiceField(choices=STATUS_CHOICES, required=False)
+    system = forms.ModelChoiceField(System.objects.all(), required=False)
+
+    def __init__(self, data=None, *args, **kwargs):
+        # As with `MaintenanceRecordFilterForm`, only bind the parameters
+        # present in the query string
+        if data is not None:
+            data = {
+                name: data[name] for name in self.base_fields
+                if data.get(name)}
+        super().__init__(data, *args, **kwargs)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        cleaned_data['group_by'] = cleaned_data.get('group_by') or 'system'
+        interval = cleaned_data.get('interval') or 'month'
+        cleaned_data['interval'] = interval
+
+        end = cleaned_data.get('end') or get_activity_today()
+        start = cleaned_data.get('start')
+        if not start:
+            start = get_period_start(end, interval)
+            for _ in range(self.DEFAULT_PERIODS - 1):
+                start = get_period_start(
+                    start - datetime.timedelta(days=1), interval)
+        cleaned_data['end'] = end
+        cleaned_data['start'] = start
+
+        if start > end:
+            raise forms.ValidationError('The start is after the end.')
+        # Checked arithmetically first, so huge ranges aren't enumerated
+        days_per_period = {'day': 1, 'week': 7, 'month': 31}[interval]
+        if (end - start).days > self.MAX_PERIODS * days_per_period or len(
+                get_periods(start, end, interval)) > self.MAX_PERIODS:
+            raise forms.ValidationError(
+                'Trends are limited to {} periods.'.format(self.MAX_PERIODS))
+        return cleaned_data
+
+    def get_filters(self):
+        """
+        Return a dict of the `MaintenanceActivity` filters in use.
+        Call only after `is_valid()` returns `True`.
+        """
+        return {
+            name: self.cleaned_data[name]
+            for name in ['maintenance_type', 'status', 'system']
+            if self.cleaned_data.get(name)}
+
+    def get_active_filters(self):
+        """
+        Return a list of `(label, value)` tuples for the filters in use.
+        """
+        return [
+            (pretty_name(name), value)
+            for name, value in sorted(self.get_filters().items())]
@@ -0,0 +1,153 @@
+"""
+Follow `MaintenanceRecordRelationship`s transitively.
+
+Relationships form a directed graph (referencing record ➤ referenced
+record). A record's chain is the set of records reachable from it within a
+number of hops, found with a single recursive CTE.
+"""
+
+from collections import namedtuple
+
+from django.db import connection
+
+from .app_settings import SYSTEM_MAINTENANCE_CHAIN_MAX_DEPTH
+from .models import MaintenanceRecordRelationship
+
+
+DIRECTIONS = ['both', 'referenced', 'referencing']
+
+RecordChain = namedtuple(
+    'RecordChain', ['depths', 'edges', 'cycles', 'truncated'])
+RecordChain.__doc__ = """
+A record's chain of related records.
+
+- `depths`: dict of hops from the root record, keyed by record pk
+- `edges`: list of `(referencing pk, referenced pk)` tuples between them
+- `cycles`: list of sets of pks that reference each other in a cycle
+- `truncated`: whether more records lie beyond the depth limit
+"""
+
+
+def _chain_sql(direction):
+    """
+    Return SQL selecting `(id, depth)` for each record within a number of
+    hops of a root record (the two query parameters), with the minimum depth
+    at which it was found.
+
+    The recursive term is a `UNION` of `(id, depth)` pairs, so cycles can't
+    recurse forever: each record appears at most once per depth.
+    """
+    table = connection.ops.quote_name(
+        MaintenanceRecordRelationship._meta.db_table)
+    if direction == 'referenced':
+        step = (
+            'SELECT r.referenced_record_id, c.depth + 1 FROM chain c '
+            'JOIN {table} r ON r.referencing_record_id = c.id')
+    elif direction == 'referencing':
+        step = (
+            'SELECT r.referencing_record_id, c.depth + 1 FROM chain c '
+            'JOIN {table} r ON r.referenced_record_id = c.id')
+    else:
+        step = (
+            'SELECT CASE WHEN r.referencing_record_id = c.id '
+            'THEN r.referenced_record_id ELSE r.referencing_record_id END, '
+            'c.depth + 1 FROM chain c '
+            'JOIN {table} r ON r.referencing_record_id = c.id '
+            'OR r.referenced_record_id = c.id')
+
+    return (
+        'WITH RECURSIVE chain(id, depth) AS ('
+        'SELECT CAST(%s AS INTEGER), 0 '
+        'UNION ' + step + ' WHERE c.depth < %s'
+        ') SELECT id, MIN(depth) FROM chain GROUP BY id'
+    ).format(table=table)
+
+
+def find_cycles(nodes, edges):
+    """
+    Return a list of sets of nodes that lie on directed cycles (the
+    strongly connected components with more than one node), using an
+    iterative version of Tarjan's algorithm.
+    """
+    successors = {node: [] for node in nodes}
+    for source, target in edges:
+        successors[source].append(target)
+
+    index = {}
+    lowlink = {}
+    stack = []
+    on_stack = set()
+    cycles = []
+
+    for start in nodes:
+        if start in index:
+            continue
+        work = [(start, iter(successors[start]))]
+        index[start] = lowlink[start] = len(index)
+        stack.append(start)
+        on_stack.add(start)
+
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if child not in index:
+                    index[child] = lowlink[child] = len(index)
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(successors[child])))
+                    break
+                elif child in on_stack:
+                    lowlink[node] = min(lowlink[node], index[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = set()
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.add(member)
+                        if member == node:
+                            break
+                    if len(component) > 1:
+                        cycles.append(component)
+
+    return cycles
+
+
+def get_record_chain(
+        pk, depth=SYSTEM_MAINTENANCE_CHAIN_MAX_DEPTH, direction='both'):
+    """
+    Return the `RecordChain` of records within `depth` hops of record `pk`,
+    following references in `direction` ('both', 'referenced' or
+    'referencing').
+
+    Costs two queries: one for the records' pks and one for the edges
+    between them. Records themselves aren't loaded.
+    """
+    if direction not in DIRECTIONS:
+        raise ValueError('Invalid direction {!r}'.format(direction))
+
+    # Look one hop past the limit to find out whether the chain goes on
+    with connection.cursor() as cursor:
+        cursor.execute(_chain_sql(direction), [pk, depth + 1])
+        depths = dict(cursor.fetchall())
+
+    truncated = any(hops > depth for hops in depths.values())
+    depths = {
+        record_pk: hops for record_pk, hops in depths.items()
+        if hops <= depth}
+
+    edges = list(MaintenanceRecordRelationship.objects.filter(
+        referencing_record__in=list(depths),
+        referenced_record__in=list(depths),
+    ).order_by('pk').values_list('referencing_record', 'referenced_record'))
+
+    return RecordChain(
+        depths=depths,
+        edges=edges,
+        cycles=find_cycles(sorted(depths), edges),
+        truncated=truncated,
+    )
@@ -0,0 +1,295 @@
+"""
+Per-request query and timing instrumentation.
+
+`profile()` records the number of SQL queries, the time spent in the
+database and in template rendering, and the slowest SQL statements while a
+block of code runs. `instrument()` (or `InstrumentationMiddleware`, for
+whole requests to System Maintenance views) also adds each profile to
+in-process metrics, served in Prometheus' text format by `metrics_view`,
+and logs it as a line of JSON to the 'system_maintenance.instrumentation'
+logger.
+
+Template rendering is timed by wrapping `django.template.base.Template.render`
+the first time a profile starts. Metrics are kept per process.
+"""
+
+import heapq
+import json
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+
+from django.db import connections
+from django.template.base import Template
+
+from .app_settings import SYSTEM_MAINTENANCE_SLOW_QUERY_COUNT
+from .caching import get_fragment_cache_stats
+
+
+logger = logging.getLogger('system_maintenance.instrumentation')
+
+# Upper bounds (in seconds) of the request duration histogram's buckets
+DURATION_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+# Logged SQL statements are truncated to this many characters
+MAX_SQL_LENGTH = 1000
+
+_local = threading.local()
+
+
+class Profile:
+
+    """
+    Queries and timings recorded while a block of code runs. Times are in
+    seconds.
+    """
+
+    def __init__(self, slow_query_count=SYSTEM_MAINTENANCE_SLOW_QUERY_COUNT):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.duration = 0.0
+        self.slow_query_count = slow_query_count
+        # A min-heap of `(duration, sql)` tuples
+        self._slowest = []
+
+    def add_query(self, sql, duration):
+        self.queries += 1
+        self.db_time += duration
+        if len(self._slowest) < self.slow_query_count:
+            heapq.heappush(self._slowest, (duration, sql))
+        elif self._slowest and duration > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, (duration, sql))
+
+    def get_slowest_queries(self):
+        """
+        Return a list of dicts of the slowest SQL statements (without their
+        parameters) and their durations, slowest first.
+        """
+        return [
+            {'sql': sql[:MAX_SQL_LENGTH], 'seconds': duration}
+            for duration, sql in sorted(self._slowest, reverse=True)]
+
+    def as_dict(self):
+        return {
+            'db_seconds': self.db_time,
+            'queries': self.queries,
+            'seconds': self.duration,
+            'slowest_queries': self.get_slowest_queries(),
+            'template_seconds': self.template_time,
+        }
+
+
+def _get_active_profiles():
+    if not hasattr(_local, 'profiles'):
+        _local.profiles = []
+        _local.template_depth = 0
+    return _local.profiles
+
+
+def _time_query(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        for active in _get_active_profiles():
+            active.add_query(sql, duration)
+
+
+def _install_template_timer():
+    """
+    Wrap `Template.render` to add the time spent rendering templates to the
+    active profiles. Only the outermost render is timed, so included
+    templates aren't counted twice.
+    """
+    if getattr(Template.render, '_system_maintenance_timer', False):
+        return
+    render = Template.render
+
+    @wraps(render)
+    def timed_render(self, context):
+        profiles = _get_active_profiles()
+        if not profiles or _local.template_depth:
+            return render(self, context)
+
+        _local.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            _local.template_depth -= 1
+            duration = time.perf_counter() - started
+            for active in profiles:
+                active.template_time += duration
+
+    timed_render._system_maintenance_timer = True
+    Template.render = timed_render
+
+
+@contextmanager
+def profile():
+    """
+    Record the queries (on every database) and the template rendering time
+    of a block of code in a `Profile`:
+
+        with profile() as request_profile:
+            ...
+        print(request_profile.queries)
+    """
+    _install_template_timer()
+    profiles = _get_active_profiles()
+    current = Profile()
+    profiles.append(current)
+    started = time.perf_counter()
+    try:
+        with ExitStack() as stack:
+            # Nested profiles share the outer profile's wrappers
+            for connection in connections.all():
+                if _time_query not in connection.execute_wrappers:
+                    stack.enter_context(
+                        connection.execute_wrapper(_time_query))
+            yield current
+    finally:
+        current.duration = time.perf_counter() - started
+        profiles.remove(current)
+
+
+class Metrics:
+
+    """
+    Totals of recorded profiles, by view.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            # Keyed by `(view, status)`
+            self.requests = {}
+            # Keyed by view
+            self.buckets = {}
+            self.duration = {}
+            self.db_time = {}
+            self.queries = {}
+            self.template_time = {}
+
+    def add(self, view, current, status):
+        with self.lock:
+            key = (view, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            buckets = self.buckets.setdefault(
+                view, [0] * len(DURATION_BUCKETS))
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if current.duration <= bound:
+                    buckets[i] += 1
+            for totals, value in [
+                    (self.duration, current.duration),
+                    (self.db_time, current.db_time),
+                    (self.queries, current.queries),
+                    (self.template_time, current.template_time)]:
+                totals[view] = totals.get(view, 0) + value
+
+    def render(self):
+        """
+        Return the metrics in Prometheus' text exposition format.
+        """
+        with self.lock:
+            lines = []
+
+            def metric(name, metric_type, help_text, samples):
+                lines.append('# HELP {} {}'.format(name, help_text))
+                lines.append('# TYPE {} {}'.format(name, metric_type))
+                for suffix, labels, value in samples:
+                    lines.append('{}{}{} {}'.format(
+                        name, suffix, _format_labels(labels), value))
+
+            metric(
+                'system_maintenance_requests_total', 'counter',
+                'Requests to System Maintenance views.', [
+                    ('', [('view', view), ('status', status)], count)
+                    for (view, status), count in sorted(
+                        self.requests.items())])
+
+            samples = []
+            for view in sorted(self.buckets):
+                for bound, count in zip(DURATION_BUCKETS, self.buckets[view]):
+                    samples.append(
+                        ('_bucket', [('view', view), ('le', bound)], count))
+                count = sum(
+                    count for (name, _), count in self.requests.items()
+                    if name == view)
+                samples.extend([
+                    ('_bucket', [('view', view), ('le', '+Inf')], count),
+                    ('_sum', [('view', view)], self.duration[view]),
+                    ('_count', [('view', view)], count),
+                ])
+            metric(
+                'system_maintenance_request_duration_seconds', 'histogram',
+                'Time spent handling requests to System Maintenance views.',
+                samples)
+
+            for name, totals, help_text in [
+                    ('system_maintenance_db_queries_total', self.queries,
+                     'SQL queries run by System Maintenance views.'),
+                    ('system_maintenance_db_duration_seconds_total',
+                     self.db_time,
+                     'Time spent in the database by System Maintenance '
+                     'views.'),
+                    ('system_maintenance_template_duration_seconds_total',
+                     self.template_time,
+                     'Time spent rendering templates by System Maintenance '
+                     'views.')]:
+                metric(name, 'counter', help_text, [
+                    ('', [('view', view)], value)
+                    for view, value in sorted(totals.items())])
+
+        fragment_cache_stats = get_fragment_cache_stats()
+        for outcome in ['hits', 'misses']:
+            metric(
+                'system_maintenance_fragment_cache_{}_total'.format(outcome),
+                'counter', 'Rendered fragment cache {}.'.format(outcome),
+                [('', [], fragment_cache_stats[outcome])])
+
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{{{}}}'.format(','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace(
+            '"', '\\"').replace('\n', '\\n'))
+        for name, value in labels))
+
+
+metrics = Metrics()
+
+
+def record(view, current, status=None, **fields):
+    """
+    Add a `Profile` to the metrics of `view` (e.g., a URL name) and log it,
+    along with any extra `fields`.
+    """
+    metrics.add(view, current, status)
+    data = dict(current.as_dict(), view=view, **fields)
+    if status is not None:
+        data['status'] = status
+    logger.info(json.dumps(data, sort_keys=True), extra={'profile': data})
+
+
+@contextmanager
+def instrument(view):
+    """
+    Profile a block of code and record it under the label `view`:
+
+        with instrument('nightly_report'):
+            ...
+    """
+    with profile() as current:
+        yield current
+    record(view, current)
@@ -0,0 +1,278 @@
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+
+import django
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import NoReverseMatch, reverse
+from django.utils import timezone
+
+from system_maintenance import urls
+from system_maintenance.api import RESOURCES
+from system_maintenance.caching import get_dashboard_counts
+from system_maintenance.models import DocumentationRecord, MaintenanceRecord
+from system_maintenance.views import RAW_FIELDS
+
+
+# URL names that aren't benchmarked
+SKIPPED_URLS = ['logout']
+
+# URLs of a single maintenance record, benchmarked with the newest one
+MAINTENANCE_RECORD_URLS = [
+    'maintenance_record_chain',
+    'maintenance_record_chain_json',
+    'maintenance_record_detail',
+]
+
+# Extra query strings to benchmark for some URLs
+URL_VARIANTS = {
+    'activity_trend': ['', '?group_by=status&interval=week'],
+    'maintenance_record_export': ['?format=csv', '?format=jsonl'],
+    'maintenance_record_list': ['', '?status=Failed'],
+    'search': ['?q=backup', '?q=kernel+upgrade&type=maintenance'],
+}
+
+
+def get_version():
+    try:
+        from importlib.metadata import PackageNotFoundError, version
+    except ImportError:
+        return None
+    try:
+        return version('django-system-maintenance')
+    except PackageNotFoundError:
+        return None
+
+
+def read_content(response):
+    if response.streaming:
+        return b''.join(response.streaming_content)
+    return response.content
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the latency, query count and peak memory of every System '
+        'Maintenance URL and admin changelist, and write the results as '
+        'JSON. Run against a database filled by generate_benchmark_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', default=5, type=int,
+            help='Number of timed requests per URL (default: 5).')
+        parser.add_argument(
+            '--username',
+            help='Sysadmin to make requests as (default: the first active '
+                 'staff sysadmin).')
+        parser.add_argument(
+            '--output',
+            help='File to write results to (default: standard output).')
+        parser.add_argument(
+            '--compare',
+            help='Results from an earlier run to compare against.')
+        parser.add_argument(
+            '--skip-admin', action='store_true',
+            help="Don't benchmark admin changelists.")
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1.')
+
+        user = self.get_user(options['username'])
+        if not user.is_staff and not options['skip_admin']:
+            self.stderr.write(
+                'Skipping admin changelists: {} is not staff.'.format(user))
+            options['skip_admin'] = True
+        client = Client()
+        client.force_login(user)
+
+        results = []
+        # The test client's requests are to 'testserver'
+        with override_settings(ALLOWED_HOSTS=['*']):
+            for name, url in self.get_urls(options['skip_admin']):
+                result = self.benchmark(client, url, options['repeat'])
+                result['name'] = name
+                results.append(result)
+                self.stderr.write(
+                    '{name}: {median_ms:.1f} ms, {queries} queries, '
+                    '{peak_memory_kb:.0f} KiB'.format(**result))
+
+        report = {
+            'version': get_version(),
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'created_at': timezone.now().isoformat(),
+            'repeat': options['repeat'],
+            'counts': get_dashboard_counts(),
+            'results': results,
+        }
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                self.compare(json.load(f), report)
+
+    def get_user(self, username):
+        users = get_user_model().objects.filter(
+            is_active=True, sysadmin__isnull=False)
+        if username:
+            users = users.filter(username=username)
+        else:
+            users = users.order_by('-is_staff', 'pk')
+        user = users.first()
+        if user is None:
+            raise CommandError('No active sysadmin found.')
+        return user
+
+    def get_sample_kwargs(self, name):
+        """
+        Return a list of `(label, kwargs, query)` tuples to benchmark a URL
+        with.
+        """
+        record_pk = MaintenanceRecord.objects.order_by(
+            '-datetime', 'pk').values_list('pk', flat=True).first()
+        documentation_pk = DocumentationRecord.objects.order_by(
+            'title').values_list('pk', flat=True).first()
+
+        if name == 'api_resource':
+            return [
+                (resource_name, {'resource_name': resource_name}, '')
+                for resource_name in sorted(RESOURCES)]
+        if name in ('fragment_view', 'raw_view'):
+            samples = []
+            for type_of_record, (model, fields, _) in sorted(
+                    RAW_FIELDS.items()):
+                pk = documentation_pk if model is DocumentationRecord \
+                    else record_pk
+                for field in fields:
+                    kwargs = {
+                        'type_of_record': type_of_record,
+                        'type_of_field': field,
+                        'record_pk': pk,
+                    }
+                    samples.append((field, kwargs, ''))
+                    if name == 'raw_view':
+                        samples.append((field, kwargs, '?format=text'))
+            return samples
+        if name == 'documentation_record_detail':
+            return [('', {'pk': documentation_pk}, '')]
+        if name in MAINTENANCE_RECORD_URLS:
+            return [('', {'pk': record_pk}, '')]
+        return None
+
+    def get_urls(self, skip_admin=False):
+        """
+        Return a list of `(name, url)` tuples to benchmark: every URL in
+        `system_maintenance.urls` and every admin changelist.
+        """
+        benchmark_urls = []
+        for pattern in urls.urlpatterns:
+            if pattern.name in SKIPPED_URLS:
+                continue
+            namespaced = '{}:{}'.format(urls.app_name, pattern.name)
+
+            if not pattern.pattern.converters:
+                benchmark_urls.extend(
+                    (pattern.name + query, reverse(namespaced) + query)
+                    for query in URL_VARIANTS.get(pattern.name, ['']))
+                continue
+
+            samples = self.get_sample_kwargs(pattern.name)
+            if samples is None or any(
+                    None in kwargs.values() for _, kwargs, _ in samples):
+                self.stderr.write('Skipping {}: no sample records.'.format(
+                    pattern.name))
+                continue
+            for label, kwargs, query in samples:
+                benchmark_urls.append((
+                    ' '.join(filter(None, [pattern.name, label])) + query,
+                    reverse(namespaced, kwargs=kwargs) + query))
+
+        if not skip_admin:
+            for model in admin.site._registry:
+                if model._meta.app_label != 'system_maintenance':
+                    continue
+                name = 'admin:{}_{}_changelist'.format(
+                    model._meta.app_label, model._meta.model_name)
+                try:
+                    benchmark_urls.append((name, reverse(name)))
+                except NoReverseMatch:
+                    pass
+
+        return sorted(benchmark_urls)
+
+    def benchmark(self, client, url, repeat):
+        # The first request fills caches (e.g., rendered markup fragments)
+        started = time.perf_counter()
+        response = client.get(url)
+        size = len(read_content(response))
+        first_ms = (time.perf_counter() - started) * 1000
+
+        with CaptureQueriesContext(connection) as queries:
+            read_content(client.get(url))
+        # Later requests reset the connection's query log
+        query_count = len(queries)
+
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            read_content(client.get(url))
+            timings.append((time.perf_counter() - started) * 1000)
+
+        # Traced separately, since tracing slows requests down
+        tracemalloc.start()
+        try:
+            read_content(client.get(url))
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'url': url,
+            'status': response.status_code,
+            'bytes': size,
+            'queries': query_count,
+            'first_ms': first_ms,
+            'min_ms': min(timings),
+            'median_ms': statistics.median(timings),
+            'mean_ms': statistics.mean(timings),
+            'max_ms': max(timings),
+            'peak_memory_kb': peak_memory / 1024,
+        }
+
+    def compare(self, previous, current):
+        """
+        Print each URL's median latency, query count and peak memory next to
+        those of an earlier run.
+        """
+        before = {result['name']: result for result in previous['results']}
+        self.stderr.write('Compared with {} ({}):'.format(
+            previous.get('version') or 'unknown version',
+            previous.get('created_at')))
+        for result in current['results']:
+            old = before.get(result['name'])
+            if old is None:
+                self.stderr.write('{}: new'.format(result['name']))
+                continue
+            change = (result['median_ms'] - old['median_ms']) / \
+                old['median_ms'] * 100 if old['median_ms'] else 0
+            self.stderr.write(
+                '{}: {:.1f} ➤ {:.1f} ms ({:+.0f}%), {} ➤ {} queries, '
+                '{:.0f} ➤ {:.0f} KiB'.format(
+                    result['name'], old['median_ms'], result['median_ms'],
+                    change, old['queries'], result['queries'],
+                    old['peak_memory_kb'], result['peak_memory_kb']))
@@ -0,0 +1,317 @@
+import datetime
+import random
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from system_maintenance import search
+from system_maintenance.activity import rebuild_maintenance_activity
+from system_maintenance.caching import (VERSIONED_MODELS,
+    bump_model_versions, rebuild_dashboard_counts)
+from system_maintenance.fields import rendering_inline
+from system_maintenance.management.commands.import_maintenance_records \
+    import bulk_create_records
+from system_maintenance.models import (DocumentationRecord, Hardware,
+    MaintenanceRecord, MaintenanceRecordRelationship, MaintenanceType,
+    Software, SysAdmin, System)
+from system_maintenance.rendering import set_markup_hash
+
+
+NAME_PREFIX = 'Benchmark'
+
+# Most maintenance is routine
+STATUS_WEIGHTS = [('Complete', 85), ('In Progress', 10), ('Failed', 5)]
+
+WORDS = (
+    'backup cluster config cron daemon disk driver firmware kernel log '
+    'memory mount network node package partition patch permission process '
+    'queue raid reboot restore rollback service snapshot storage swap '
+    'upgrade user volume'
+).split()
+
+# Number of distinct bodies per markup field; records draw from this pool
+BODY_POOL_SIZE = 100
+
+
+def make_body(rng, size):
+    """
+    Return roughly `size` characters of Markdown: headings, paragraphs,
+    numbered steps and shell blocks.
+    """
+    parts = []
+    length = 0
+    while length < size:
+        kind = rng.random()
+        if kind < 0.15:
+            part = '## {}'.format(' '.join(rng.choices(WORDS, k=3)).title())
+        elif kind < 0.45:
+            part = '\n'.join(
+                '{}. {}'.format(i, ' '.join(rng.choices(WORDS, k=8)))
+                for i in range(1, rng.randint(3, 8)))
+        elif kind < 0.6:
+            part = '```\n{}\n```'.format('\n'.join(
+                '$ sudo {} {}'.format(*rng.choices(WORDS, k=2))
+                for _ in range(rng.randint(1, 5))))
+        else:
+            part = ' '.join(rng.choices(WORDS, k=rng.randint(20, 60))) + '.'
+        parts.append(part)
+        length += len(part) + 2
+    return '\n\n'.join(parts)
+
+
+@contextmanager
+def cached_markup_rendering(*models):
+    """
+    Memoize the markup renderers of `models`' markup fields, so that bodies
+    drawn from a pool are each rendered once rather than once per record.
+    """
+    fields = [
+        field for model in models for field in model._meta.fields
+        if hasattr(field, 'markup_choices_dict')]
+    originals = [field.markup_choices_dict for field in fields]
+    for field in fields:
+        field.markup_choices_dict = {
+            name: lru_cache(maxsize=None)(render)
+            for name, render in field.markup_choices_dict.items()}
+    try:
+        yield
+    finally:
+        for field, original in zip(fields, originals):
+            field.markup_choices_dict = original
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a large synthetic dataset for benchmarking: systems, '
+        'hardware, software, sysadmins, documentation and maintenance '
+        'records with relationship fan-out and large Markdown bodies. '
+        'Generated names start with "{}".'.format(NAME_PREFIX)
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--records', default=10000, type=int,
+            help='Number of maintenance records (default: 10000).')
+        parser.add_argument(
+            '--documentation', default=1000, type=int,
+            help='Number of documentation records (default: 1000).')
+        parser.add_argument(
+            '--systems', default=50, type=int,
+            help='Number of systems (default: 50).')
+        parser.add_argument(
+            '--hardware', default=500, type=int,
+            help='Number of hardware types (default: 500).')
+        parser.add_argument(
+            '--software', default=2000, type=int,
+            help='Number of software packages (default: 2000).')
+        parser.add_argument(
+            '--maintenance-types', default=20, type=int,
+            help='Number of maintenance types (default: 20).')
+        parser.add_argument(
+            '--sysadmins', default=20, type=int,
+            help='Number of system administrators (default: 20).')
+        parser.add_argument(
+            '--hardware-per-record', default=3, type=int,
+            help='Maximum hardware per record (default: 3).')
+        parser.add_argument(
+            '--software-per-record', default=5, type=int,
+            help='Maximum software per record (default: 5).')
+        parser.add_argument(
+            '--documentation-per-record', default=2, type=int,
+            help='Maximum documentation records per record (default: 2).')
+        parser.add_argument(
+            '--references-per-record', default=3, type=int,
+            help='Maximum earlier records referenced per record '
+                 '(default: 3).')
+        parser.add_argument(
+            '--body-size', default=2000, type=int,
+            help='Approximate characters per markup body (default: 2000).')
+        parser.add_argument(
+            '--years', default=10, type=float,
+            help='Years of history to spread records over (default: 10).')
+        parser.add_argument(
+            '--batch-size', default=1000, type=int,
+            help='Number of records to insert at a time (default: 1000).')
+        parser.add_argument(
+            '--seed', default=0, type=int,
+            help='Random seed, for reproducible datasets (default: 0).')
+        parser.add_argument(
+            '--skip-search-index', action='store_true',
+            help="Don't add the generated records to the search index.")
+
+    def handle(self, *args, **options):
+        if options['records'] and not all(
+                options[name] > 0 for name in [
+                    'systems', 'maintenance_types', 'sysadmins']):
+            raise CommandError(
+                'Maintenance records need at least one system, maintenance '
+                'type and sysadmin.')
+
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.started = time.time()
+
+        with cached_markup_rendering(DocumentationRecord, MaintenanceRecord):
+            self.bodies = [
+                make_body(self.rng, options['body_size'])
+                for _ in range(BODY_POOL_SIZE)]
+
+            with transaction.atomic():
+                self.create_lookups()
+                self.create_documentation()
+            self.create_records()
+
+        # bulk_create() doesn't send the signals that keep these current
+        rebuild_dashboard_counts()
+        rebuild_maintenance_activity()
+        bump_model_versions(VERSIONED_MODELS)
+        self.stdout.write(self.style.SUCCESS(
+            'Generated {} maintenance records in {:.0f}s.'.format(
+                options['records'], time.time() - self.started)))
+
+    def create_named(self, model, field, count):
+        """
+        Create `count` objects named '<prefix> <model> <n>' (skipping any
+        that already exist) and return their primary keys.
+        """
+        names = [
+            '{} {} {:06d}'.format(
+                NAME_PREFIX, model._meta.verbose_name, i)
+            for i in range(1, count + 1)]
+        model.objects.bulk_create(
+            [model(**{field: name}) for name in names], ignore_conflicts=True)
+        return list(model.objects.filter(
+            **{'{}__in'.format(field): names}).values_list('pk', flat=True))
+
+    def create_lookups(self):
+        self.systems = self.create_named(
+            System, 'name', self.options['systems'])
+        self.hardware = self.create_named(
+            Hardware, 'name', self.options['hardware'])
+        self.software = self.create_named(
+            Software, 'name', self.options['software'])
+        self.maintenance_types = self.create_named(
+            MaintenanceType, 'maintenance_type',
+            self.options['maintenance_types'])
+
+        User = get_user_model()
+        usernames = [
+            '{}-sysadmin-{:04d}'.format(NAME_PREFIX.lower(), i)
+            for i in range(1, self.options['sysadmins'] + 1)]
+        User.objects.bulk_create([
+            User(username=username, password='!')
+            for username in usernames], ignore_conflicts=True)
+        users = User.objects.filter(username__in=usernames)
+        SysAdmin.objects.bulk_create([
+            SysAdmin(user_id=pk)
+            for pk in users.filter(sysadmin=None).values_list(
+                'pk', flat=True)])
+        self.sysadmins = list(SysAdmin.objects.filter(
+            user__in=users).values_list('pk', flat=True))
+
+    def create_documentation(self):
+        titles = [
+            '{} documentation {:06d}'.format(NAME_PREFIX, i)
+            for i in range(1, self.options['documentation'] + 1)]
+        records = [
+            DocumentationRecord(
+                title=title,
+                maintenance_type_id=self.rng.choice(self.maintenance_types),
+                documentation=self.rng.choice(self.bodies),
+            )
+            for title in titles]
+        for record in records:
+            set_markup_hash(record)
+        with rendering_inline():
+            DocumentationRecord.objects.bulk_create(
+                records, ignore_conflicts=True)
+        self.documentation = list(DocumentationRecord.objects.filter(
+            title__in=titles).values_list('pk', flat=True))
+        if not self.options['skip_search_index']:
+            search.index_records('documentation', self.documentation)
+
+    def sample(self, population, maximum):
+        return self.rng.sample(
+            population, self.rng.randint(0, min(maximum, len(population))))
+
+    def create_records(self):
+        options = self.options
+        now = timezone.now()
+        history = datetime.timedelta(days=365.25 * options['years'])
+        statuses, weights = zip(*STATUS_WEIGHTS)
+
+        # Records reference earlier records
+        self.record_pks = []
+        created = 0
+        while created < options['records']:
+            count = min(options['batch_size'], options['records'] - created)
+            records = [
+                MaintenanceRecord(
+                    system_id=self.rng.choice(self.systems),
+                    sys_admin_id=self.rng.choice(self.sysadmins),
+                    maintenance_type_id=self.rng.choice(
+                        self.maintenance_types),
+                    datetime=now - history * self.rng.random(),
+                    status=self.rng.choices(statuses, weights)[0],
+                    description=self.rng.choice(self.bodies),
+                    procedure=self.rng.choice(self.bodies),
+                    problems=self.rng.choice(self.bodies)
+                    if self.rng.random() < 0.3 else '',
+                )
+                for _ in range(count)]
+
+            with transaction.atomic():
+                pks = bulk_create_records(records)
+                self.create_relations(pks)
+                MaintenanceRecord.objects.filter(
+                    pk__in=pks).refresh_display_columns()
+            if not options['skip_search_index']:
+                search.index_records('maintenance', pks)
+
+            self.record_pks.extend(pks)
+            created += count
+            elapsed = time.time() - self.started
+            self.stdout.write('Generated {} records ({:.0f} records/s)'.format(
+                created, created / elapsed if elapsed else 0))
+
+    def create_relations(self, pks):
+        options = self.options
+        hardware = []
+        software = []
+        documentation = []
+        references = []
+        for pk in pks:
+            hardware.extend(
+                MaintenanceRecord.hardware.through(
+                    maintenancerecord_id=pk, hardware_id=hardware_pk)
+                for hardware_pk in self.sample(
+                    self.hardware, options['hardware_per_record']))
+            software.extend(
+                MaintenanceRecord.software.through(
+                    maintenancerecord_id=pk, software_id=software_pk)
+                for software_pk in self.sample(
+                    self.software, options['software_per_record']))
+            documentation.extend(
+                MaintenanceRecord.documentation_records.through(
+                    maintenancerecord_id=pk, documentationrecord_id=doc_pk)
+                for doc_pk in self.sample(
+                    self.documentation, options['documentation_per_record']))
+            if self.record_pks:
+                references.extend(
+                    MaintenanceRecordRelationship(
+                        referencing_record_id=pk, referenced_record_id=ref_pk)
+                    for ref_pk in {
+                        self.rng.choice(self.record_pks)
+                        for _ in range(self.rng.randint(
+                            0, options['references_per_record']))})
+
+        MaintenanceRecord.hardware.through.objects.bulk_create(hardware)
+        MaintenanceRecord.software.through.objects.bulk_create(software)
+        MaintenanceRecord.documentation_records.through.objects.bulk_create(
+            documentation)
+        MaintenanceRecordRelationship.objects.bulk_create(references)
@@ -0,0 +1,349 @@
+import csv
+import datetime
+import json
+import sys
+import time
+import uuid
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from system_maintenance import search
+from system_maintenance.activity import rebuild_maintenance_activity
+from system_maintenance.caching import (bump_model_versions,
+    rebuild_dashboard_counts)
+from system_maintenance.export import split_list
+from system_maintenance.fields import rendering_inline
+from system_maintenance.models import (STATUS_CHOICES, Hardware,
+    MaintenanceRecord, MaintenanceRecordRelationship, MaintenanceType,
+    Software, SysAdmin, System)
+from system_maintenance.rendering import set_markup_hash
+
+
+MARKUP_FIELDS = ['description', 'procedure', 'problems']
+
+
+class LookupCache:
+
+    """
+    Resolve names to primary keys from an in-memory copy of a lookup table,
+    optionally creating missing rows.
+    """
+
+    def __init__(self, model, field, create_missing=False):
+        self.model = model
+        self.field = field
+        self.create_missing = create_missing
+        self.pks = dict(model.objects.values_list(field, 'pk'))
+
+    def __call__(self, name):
+        name = name.strip()
+        if name not in self.pks:
+            if not self.create_missing:
+                raise ValueError('Unknown {} {!r}'.format(
+                    self.model._meta.verbose_name, name))
+            self.pks[name] = self.model.objects.create(
+                **{self.field: name}).pk
+        return self.pks[name]
+
+
+def bulk_create_records(records):
+    """
+    Insert maintenance records and return their primary keys, in order.
+    Call inside a transaction.
+
+    On databases that can't return ids from bulk inserts, the records are
+    found again by a batch token stored in their display labels, which
+    callers must refresh afterwards (bulk_create() doesn't fill them anyway).
+    """
+    # bulk_create() renders markup, but doesn't send the signals that hash
+    # it or queue render jobs
+    for record in records:
+        set_markup_hash(record)
+    # Rows inserted concurrently by other connections can't carry the token
+    token = 'import:{}:'.format(uuid.uuid4().hex)
+    for index, record in enumerate(records):
+        record.display_label = '{}{}'.format(token, index)
+    with rendering_inline():
+        MaintenanceRecord.objects.bulk_create(records)
+    if all(record.pk for record in records):
+        return [record.pk for record in records]
+
+    # Databases that can't return ids from bulk inserts (e.g., SQLite)
+    pks = dict(MaintenanceRecord.objects.filter(
+        display_label__startswith=token).values_list('display_label', 'pk'))
+    for record in records:
+        record.pk = pks[record.display_label]
+    return [record.pk for record in records]
+
+
+def read_csv(stream):
+    for row in csv.DictReader(stream):
+        yield row
+
+
+def read_jsonl(stream):
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            raise CommandError('Line {}: {}'.format(number, e))
+        if not isinstance(row, dict):
+            raise CommandError('Line {}: expected a JSON object'.format(
+                number))
+        yield row
+
+
+class Command(BaseCommand):
+    help = (
+        'Import maintenance records from CSV or JSON Lines.\n\n'
+        'Columns: system, sys_admin (username), maintenance_type, datetime, '
+        'status, description, procedure, problems, <field>_markup_type, '
+        'hardware, software, id and references. hardware, software and '
+        'references (ids of other imported records) are lists: JSON arrays '
+        'or strings separated by --list-separator (escaped within items '
+        'with a backslash, as are backslashes).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help="File to import ('-' for standard input).")
+        parser.add_argument(
+            '--format', choices=['csv', 'jsonl'],
+            help='Input format (default: guessed from the file extension).')
+        parser.add_argument(
+            '--batch-size', default=1000, type=int,
+            help='Number of records to insert at a time (default: 1000).')
+        parser.add_argument(
+            '--create-missing', action='store_true',
+            help='Create missing systems, maintenance types, hardware and '
+                 'software instead of failing.')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Validate and import the records, then roll back.')
+        parser.add_argument(
+            '--list-separator', default=';',
+            help="Separator for list values in strings (default: ';').")
+
+    def handle(self, *args, **options):
+        self.options = options
+        input_format = options['format'] or (
+            'jsonl' if options['path'].endswith(('.jsonl', '.json')) else 'csv')
+        reader = read_jsonl if input_format == 'jsonl' else read_csv
+
+        if options['path'] == '-':
+            stream = sys.stdin
+        else:
+            try:
+                stream = open(options['path'], newline='', encoding='utf-8')
+            except OSError as e:
+                raise CommandError('Unable to read {!r}: {}'.format(
+                    options['path'], e.strerror))
+
+        try:
+            with transaction.atomic():
+                self.import_rows(reader(stream))
+                if options['dry_run']:
+                    transaction.set_rollback(True)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(
+                'Dry run: rolled back {} records.'.format(self.imported)))
+        else:
+            # bulk_create() doesn't send the signals that keep these current
+            rebuild_dashboard_counts()
+            rebuild_maintenance_activity()
+            bump_model_versions([
+                Hardware,
+                MaintenanceRecord,
+                MaintenanceRecordRelationship,
+                MaintenanceType,
+                Software,
+                System,
+            ])
+            self.stdout.write(self.style.SUCCESS(
+                'Imported {} records.'.format(self.imported)))
+
+    def import_rows(self, rows):
+        create_missing = self.options['create_missing']
+        self.lookups = {
+            'hardware': LookupCache(Hardware, 'name', create_missing),
+            'maintenance_type': LookupCache(
+                MaintenanceType, 'maintenance_type', create_missing),
+            'software': LookupCache(Software, 'name', create_missing),
+            'sys_admin': LookupCache(SysAdmin, 'user__{}'.format(
+                get_user_model().USERNAME_FIELD)),
+            'system': LookupCache(System, 'name', create_missing),
+        }
+
+        # Maps ids from the input to primary keys of imported records
+        self.imported_pks = {}
+        self.pending_references = []
+        self.imported = 0
+        self.started = time.time()
+
+        batch_size = self.options['batch_size']
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            self.import_batch(batch)
+
+        # References to records that appeared later in the input
+        references = self.resolve_references(self.pending_references)
+        MaintenanceRecordRelationship.objects.bulk_create(
+            references, batch_size=batch_size)
+
+        unresolved = len(self.pending_references) - len(references)
+        if unresolved:
+            self.stderr.write(
+                'Skipped {} references to unknown records.'.format(
+                    unresolved))
+
+    def import_batch(self, rows):
+        records = []
+        relations = []
+        for number, row in enumerate(rows, start=self.imported + 1):
+            try:
+                record, hardware, software, references = self.parse_row(row)
+            except (KeyError, ValueError) as e:
+                raise CommandError('Record {}: {}'.format(number, e))
+            records.append(record)
+            relations.append((row.get('id'), hardware, software, references))
+
+        pks = bulk_create_records(records)
+
+        hardware_rows = []
+        software_rows = []
+        references = []
+        for pk, (input_id, hardware, software, referenced_ids) in zip(
+                pks, relations):
+            if input_id not in (None, ''):
+                self.imported_pks[str(input_id)] = pk
+            hardware_rows.extend(
+                MaintenanceRecord.hardware.through(
+                    maintenancerecord_id=pk, hardware_id=hardware_pk)
+                for hardware_pk in hardware)
+            software_rows.extend(
+                MaintenanceRecord.software.through(
+                    maintenancerecord_id=pk, software_id=software_pk)
+                for software_pk in software)
+            references.extend(
+                (pk, str(referenced_id)) for referenced_id in referenced_ids)
+
+        MaintenanceRecord.hardware.through.objects.bulk_create(hardware_rows)
+        MaintenanceRecord.software.through.objects.bulk_create(software_rows)
+
+        # References to records that haven't been imported yet are resolved
+        # after the last batch
+        resolvable = []
+        for reference in references:
+            if reference[1] in self.imported_pks:
+                resolvable.append(reference)
+            else:
+                self.pending_references.append(reference)
+        MaintenanceRecordRelationship.objects.bulk_create(
+            self.resolve_references(resolvable))
+
+        # bulk_create() doesn't send the signals that fill these
+        MaintenanceRecord.objects.filter(
+            pk__in=pks).refresh_display_columns()
+        search.index_records('maintenance', pks)
+
+        self.imported += len(pks)
+        elapsed = time.time() - self.started
+        self.stdout.write('Imported {} records ({:.0f} records/s)'.format(
+            self.imported, self.imported / elapsed if elapsed else 0))
+
+    def resolve_references(self, references):
+        """
+        Return unsaved relationships for the `(referencing pk, referenced
+        input id)` pairs whose referenced record has been imported.
+        """
+        return [
+            MaintenanceRecordRelationship(
+                referencing_record_id=pk,
+                referenced_record_id=self.imported_pks[referenced_id])
+            for pk, referenced_id in references
+            if self.imported_pks.get(referenced_id, pk) != pk]
+
+    def parse_list(self, value):
+        if value is None:
+            return []
+        if isinstance(value, list):
+            return [str(item).strip() for item in value]
+        return split_list(str(value), self.options['list_separator'])
+
+    def parse_datetime(self, value):
+        if not value:
+            return timezone.now()
+        parsed = parse_datetime(value)
+        if parsed is None:
+            date = parse_date(value)
+            if date is None:
+                raise ValueError('Invalid datetime {!r}'.format(value))
+            parsed = datetime.datetime.combine(date, datetime.time())
+        if settings.USE_TZ and timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+    def get_string(self, row, field, required=False):
+        """
+        Return a row's value for `field`, which must be a string (JSON Lines
+        values can be of any type).
+        """
+        value = row[field] if required else row.get(field)
+        if value is not None and not isinstance(value, str):
+            raise ValueError('Invalid {} {!r}: expected a string'.format(
+                field, value))
+        return value
+
+    def parse_row(self, row):
+        status = self.get_string(row, 'status') or \
+            MaintenanceRecord._meta.get_field('status').default
+        if status not in dict(STATUS_CHOICES):
+            raise ValueError('Invalid status {!r}'.format(status))
+
+        record = MaintenanceRecord(
+            datetime=self.parse_datetime(self.get_string(row, 'datetime')),
+            maintenance_type_id=self.lookups['maintenance_type'](
+                self.get_string(row, 'maintenance_type', required=True)),
+            status=status,
+            sys_admin_id=self.lookups['sys_admin'](
+                self.get_string(row, 'sys_admin', required=True)),
+            system_id=self.lookups['system'](
+                self.get_string(row, 'system', required=True)),
+        )
+        for field in MARKUP_FIELDS:
+            setattr(record, field, self.get_string(row, field) or '')
+            markup_type = self.get_string(
+                row, '{}_markup_type'.format(field))
+            if markup_type:
+                choices = MaintenanceRecord._meta.get_field(
+                    field).markup_choices_list
+                if markup_type not in choices:
+                    raise ValueError('Invalid markup type {!r}'.format(
+                        markup_type))
+                getattr(record, field).markup_type = markup_type
+
+        # dict.fromkeys() drops duplicates but keeps the order
+        hardware = dict.fromkeys(
+            self.lookups['hardware'](name)
+            for name in self.parse_list(row.get('hardware')))
+        software = dict.fromkeys(
+            self.lookups['software'](name)
+            for name in self.parse_list(row.get('software')))
+        references = dict.fromkeys(self.parse_list(row.get('references')))
+
+        return record, hardware, software, references
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from system_maintenance.models import RenderJob
+from system_maintenance.rendering import (MAX_RENDER_ATTEMPTS,
+    process_render_jobs)
+
+
+class Command(BaseCommand):
+    help = (
+        'Render markup fields queued for rendering after their records were '
+        'saved (see SYSTEM_MAINTENANCE_ASYNC_RENDERING).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep waiting for new jobs instead of exiting once the '
+                 'queue is empty.')
+        parser.add_argument(
+            '--interval', default=5, type=float,
+            help='Seconds to wait between checks for new jobs with --loop '
+                 '(default: 5).')
+
+    def handle(self, *args, **options):
+        while options['loop']:
+            count = process_render_jobs()
+            if count:
+                self.stdout.write('Ran {} render jobs.'.format(count))
+            else:
+                time.sleep(options['interval'])
+
+        count = process_render_jobs()
+        failed = RenderJob.objects.filter(
+            attempts__gte=MAX_RENDER_ATTEMPTS).count()
+        if failed:
+            self.stderr.write(
+                'Skipped {} render jobs that failed {} times.'.format(
+                    failed, MAX_RENDER_ATTEMPTS))
+        self.stdout.write(self.style.SUCCESS(
+            'Ran {} render jobs.'.format(count)))
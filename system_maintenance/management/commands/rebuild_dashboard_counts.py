@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from system_maintenance.caching import rebuild_dashboard_counts
+
+
+class Command(BaseCommand):
+    help = 'Recount the records shown on the System Maintenance home page.'
+
+    def handle(self, *args, **options):
+        counts = rebuild_dashboard_counts()
+        for name, count in sorted(counts.items()):
+            self.stdout.write('{}: {}'.format(name, count))
+        self.stdout.write(self.style.SUCCESS('Rebuilt dashboard counts.'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from system_maintenance.models import MaintenanceRecord
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every maintenance record's denormalized display label "
+        'and hardware and software names, e.g., after upgrading or after '
+        'bulk changes that bypass signals.'
+    )
+
+    def handle(self, *args, **options):
+        updated = MaintenanceRecord.objects.all().refresh_display_columns()
+        self.stdout.write(self.style.SUCCESS(
+            'Updated the display columns of {} maintenance records.'.format(
+                updated)))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from system_maintenance.activity import rebuild_maintenance_activity
+
+
+class Command(BaseCommand):
+    help = (
+        'Recount the daily maintenance activity rollup from every '
+        'maintenance record.'
+    )
+
+    def handle(self, *args, **options):
+        rows = rebuild_maintenance_activity()
+        self.stdout.write(self.style.SUCCESS(
+            'Rebuilt maintenance activity ({} rows).'.format(rows)))
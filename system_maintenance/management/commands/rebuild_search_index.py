@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from system_maintenance.search import get_backend, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of System Maintenance records.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', default=500, type=int,
+            help='Number of records to index at a time (default: 500).')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            'Search backend: {}'.format(type(get_backend()).__name__))
+        counts = rebuild_index(chunk_size=options['chunk_size'])
+        for record_type, count in sorted(counts.items()):
+            self.stdout.write('{} records: {}'.format(record_type, count))
+        self.stdout.write(self.style.SUCCESS('Rebuilt search index.'))
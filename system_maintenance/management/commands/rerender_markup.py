@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from system_maintenance.rendering import (MARKUP_FIELDS,
+    RERENDER_BATCH_SIZE, rerender_markup)
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-render the stored HTML of maintenance and documentation '
+        "records' markup fields, e.g., after upgrading markdown2 or docutils. "
+        'Records whose markup and renderers are unchanged since they were '
+        'last rendered are skipped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int,
+            help='Number of worker processes to render with (default: one '
+                 'per CPU; 1 renders without a pool).')
+        parser.add_argument(
+            '--batch-size', default=RERENDER_BATCH_SIZE, type=int,
+            help='Number of records to read, render and write at a time '
+                 '(default: {}).'.format(RERENDER_BATCH_SIZE))
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Re-render every record, e.g., after changing a renderer '
+                 'without upgrading its package.')
+        parser.add_argument(
+            '--model', action='append', choices=sorted(
+                model._meta.model_name for model in MARKUP_FIELDS),
+            help='Only re-render records of this model (may be repeated).')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        if options['processes'] is not None and options['processes'] < 1:
+            raise CommandError('--processes must be at least 1.')
+
+        models = [
+            model for model in MARKUP_FIELDS
+            if model._meta.model_name in options['model']
+        ] if options['model'] else None
+
+        def progress(stats):
+            self.stdout.write(
+                'Checked {} records, rendered {} ({:.0f} records/s)'.format(
+                    stats.checked, stats.rendered, stats.get_rate()))
+
+        stats = rerender_markup(
+            models, processes=options['processes'],
+            batch_size=options['batch_size'], force=options['force'],
+            progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            'Checked {} records: {} re-rendered, {} unchanged but rehashed, '
+            '{} skipped.'.format(
+                stats.checked, stats.rerendered, stats.rehashed,
+                stats.checked - stats.rendered)))
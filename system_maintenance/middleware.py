@@ -0,0 +1,31 @@
+from .instrumentation import profile, record
+
+
+APP_NAME = 'system_maintenance'
+
+
+class InstrumentationMiddleware:
+
+    """
+    Profile requests to System Maintenance views (see `instrumentation`),
+    labelled by URL name (e.g., 'system_maintenance:maintenance_record_list').
+    Requests to other apps aren't recorded.
+
+    Place first in `MIDDLEWARE` to include the queries of other middleware
+    (e.g., loading the session and user).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with profile() as current:
+            response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        if match is not None and APP_NAME in match.app_names:
+            record(
+                '{}:{}'.format(APP_NAME, match.url_name), current,
+                status=response.status_code, method=request.method,
+                path=request.path)
+        return response
@@ -0,0 +1,46 @@
+from django.db import migrations
+
+
+SEARCH_TABLE = 'system_maintenance_search'
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+
+    if connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE TABLE {} ('
+            'record_type varchar(20) NOT NULL, '
+            'record_id integer NOT NULL, '
+            'document tsvector NOT NULL, '
+            'PRIMARY KEY (record_type, record_id))'.format(SEARCH_TABLE))
+        schema_editor.execute(
+            'CREATE INDEX {0}_document ON {0} USING GIN (document)'.format(
+                SEARCH_TABLE))
+
+    elif connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA compile_options')
+            compile_options = [row[0] for row in cursor.fetchall()]
+        # Without FTS5, searches fall back to `icontains` lookups
+        if 'ENABLE_FTS5' in compile_options:
+            schema_editor.execute(
+                'CREATE VIRTUAL TABLE {} USING fts5('
+                "title, body, tokenize = 'porter unicode61')".format(
+                    SEARCH_TABLE))
+
+
+def drop_search_index(apps, schema_editor):
+    if SEARCH_TABLE in schema_editor.connection.introspection.table_names():
+        schema_editor.execute('DROP TABLE {}'.format(SEARCH_TABLE))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system_maintenance', '0002_auto_20181214_2122'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 2.2.28 on 2026-10-18 07:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system_maintenance', '0003_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='maintenancerecord',
+            index=models.Index(fields=['-datetime', 'id'], name='sm_record_datetime'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancerecord',
+            index=models.Index(fields=['maintenance_type', '-datetime', 'id'], name='sm_record_type_datetime'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancerecord',
+            index=models.Index(fields=['status', '-datetime', 'id'], name='sm_record_status_datetime'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancerecord',
+            index=models.Index(fields=['sys_admin', '-datetime', 'id'], name='sm_record_sysadmin_datetime'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancerecord',
+            index=models.Index(fields=['system', '-datetime', 'id'], name='sm_record_system_datetime'),
+        ),
+    ]
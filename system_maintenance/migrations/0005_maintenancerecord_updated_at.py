@@ -0,0 +1,20 @@
+# Generated by Django 2.2.28 on 2026-10-18 09:12
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system_maintenance', '0004_maintenance_record_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='maintenancerecord',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
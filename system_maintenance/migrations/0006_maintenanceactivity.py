@@ -0,0 +1,31 @@
+# Generated by Django 2.2.28 on 2026-10-18 08:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system_maintenance', '0005_maintenancerecord_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaintenanceActivity',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('Complete', 'Complete'), ('In Progress', 'In Progress'), ('Failed', 'Failed')], max_length=15)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('maintenance_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='system_maintenance.MaintenanceType')),
+                ('system', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='system_maintenance.System')),
+            ],
+            options={
+                'verbose_name': 'maintenance activity',
+                'verbose_name_plural': 'maintenance activity',
+                'ordering': ['date'],
+                'unique_together': {('date', 'system', 'maintenance_type', 'status')},
+            },
+        ),
+    ]
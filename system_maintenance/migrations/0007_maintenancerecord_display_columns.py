@@ -0,0 +1,28 @@
+# Generated by Django 2.2.28 on 2026-10-18 08:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system_maintenance', '0006_maintenanceactivity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='maintenancerecord',
+            name='display_label',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='maintenancerecord',
+            name='hardware_names',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='maintenancerecord',
+            name='software_names',
+            field=models.TextField(blank=True, editable=False),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.28 on 2026-10-18 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system_maintenance', '0007_maintenancerecord_display_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentationrecord',
+            name='markup_hash',
+            field=models.CharField(blank=True, editable=False, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='maintenancerecord',
+            name='markup_hash',
+            field=models.CharField(blank=True, editable=False, max_length=40),
+        ),
+    ]
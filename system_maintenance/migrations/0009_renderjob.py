@@ -0,0 +1,51 @@
+# Generated by Django 2.2.28 on 2026-10-18 08:45
+
+from django.db import migrations, models
+import django.utils.timezone
+import system_maintenance.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system_maintenance', '0008_markup_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='documentationrecord',
+            name='documentation',
+            field=system_maintenance.fields.MarkupField(blank=True, help_text='Document how to perform a task.', null=True, rendered_field=True),
+        ),
+        migrations.AlterField(
+            model_name='maintenancerecord',
+            name='description',
+            field=system_maintenance.fields.MarkupField(blank=True, help_text='Enter a description of the system maintenance performed.', null=True, rendered_field=True),
+        ),
+        migrations.AlterField(
+            model_name='maintenancerecord',
+            name='problems',
+            field=system_maintenance.fields.MarkupField(blank=True, help_text='Describe problems that arose during system maintenance.', null=True, rendered_field=True),
+        ),
+        migrations.AlterField(
+            model_name='maintenancerecord',
+            name='procedure',
+            field=system_maintenance.fields.MarkupField(blank=True, help_text='Enter details of how the system maintenance was performed.', null=True, rendered_field=True),
+        ),
+        migrations.CreateModel(
+            name='RenderJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('record_type', models.CharField(choices=[('documentation', 'documentation'), ('maintenance', 'maintenance')], max_length=20)),
+                ('record_id', models.PositiveIntegerField()),
+                ('field_name', models.CharField(max_length=50)),
+                ('queued_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+            ],
+            options={
+                'ordering': ['queued_at'],
+                'unique_together': {('record_type', 'record_id', 'field_name')},
+            },
+        ),
+    ]
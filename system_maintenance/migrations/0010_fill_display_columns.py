@@ -0,0 +1,59 @@
+from django.db import migrations
+
+from system_maintenance.models import DISPLAY_BATCH_SIZE, get_display_label
+
+
+def get_related_names(MaintenanceRecord, field_name, pks):
+    names = {}
+    name = '{}__name'.format(field_name)
+    through = MaintenanceRecord._meta.get_field(field_name).remote_field.through
+    for record_pk, related_name in through.objects.filter(
+            maintenancerecord__in=pks).order_by(name).values_list(
+                'maintenancerecord', name):
+        names.setdefault(record_pk, []).append(related_name)
+    return {pk: ', '.join(related) for pk, related in names.items()}
+
+
+def fill_display_columns(apps, schema_editor):
+    """
+    Fill the display columns added by 0007 for records saved before them,
+    like `MaintenanceRecordQuerySet.refresh_display_columns()`.
+    """
+    MaintenanceRecord = apps.get_model(
+        'system_maintenance', 'MaintenanceRecord')
+    records = MaintenanceRecord.objects.using(
+        schema_editor.connection.alias).order_by('pk')
+
+    last_pk = 0
+    while True:
+        chunk = list(records.filter(pk__gt=last_pk).values_list(
+            'pk', 'system__name', 'maintenance_type__maintenance_type',
+            'datetime')[:DISPLAY_BATCH_SIZE])
+        if not chunk:
+            return
+        last_pk = chunk[-1][0]
+
+        pks = [row[0] for row in chunk]
+        hardware = get_related_names(MaintenanceRecord, 'hardware', pks)
+        software = get_related_names(MaintenanceRecord, 'software', pks)
+        MaintenanceRecord.objects.using(
+            schema_editor.connection.alias).bulk_update([
+                MaintenanceRecord(
+                    pk=pk,
+                    display_label=get_display_label(
+                        system, maintenance_type, value),
+                    hardware_names=hardware.get(pk, ''),
+                    software_names=software.get(pk, ''))
+                for pk, system, maintenance_type, value in chunk
+            ], ['display_label', 'hardware_names', 'software_names'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system_maintenance', '0009_renderjob'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_display_columns, migrations.RunPython.noop),
+    ]
@@ -1,12 +1,23 @@
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Length
 from django.utils import timezone
 from django.utils.html import escape, linebreaks, urlize
 
-from markupfield_helpers.helpers import MarkupField
+from .fields import MarkupField
 
 
+# Denormalized columns that label maintenance records without joins
+DISPLAY_FIELDS = ['display_label', 'hardware_names', 'software_names']
+
+# Number of records whose display columns are refreshed at a time
+DISPLAY_BATCH_SIZE = 500
+
+# Markup fields shown in panels on maintenance record detail pages
+MAINTENANCE_MARKUP_FIELDS = ['description', 'procedure', 'problems']
+
 STATUS_CHOICES = [
     ('Complete', 'Complete'),
     ('In Progress', 'In Progress'),
@@ -30,6 +41,19 @@ class Hardware(models.Model):
         return self.name
 
 
+class DocumentationRecordQuerySet(models.QuerySet):
+
+    def summaries(self):
+        """
+        Load only what documentation records are listed with, joining their
+        maintenance type but leaving out their `documentation` markup and
+        the type's description, which lists never show.
+        """
+        return self.select_related('maintenance_type').defer(
+            'maintenance_type__description',
+            *get_markup_columns(['documentation'], markup_types=True))
+
+
 class DocumentationRecord(models.Model):
 
     title = models.CharField(
@@ -53,6 +77,11 @@ class DocumentationRecord(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Hash of the markup and its renderers (see `rendering.py`)
+    markup_hash = models.CharField(max_length=40, blank=True, editable=False)
+
+    objects = DocumentationRecordQuerySet.as_manager()
+
     class Meta:
         ordering = ['title']
 
@@ -60,6 +89,153 @@ class DocumentationRecord(models.Model):
         return self.title
 
 
+def _relation_count(model, field_name):
+    """
+    Return a subquery that counts the rows of `model` whose `field_name`
+    points at the outer maintenance record.
+    """
+    counts = model.objects.filter(
+        **{field_name: OuterRef('pk')}
+    ).order_by().values(field_name).annotate(count=Count('*')).values('count')
+    return Coalesce(
+        Subquery(counts, output_field=models.IntegerField()), 0)
+
+
+def get_display_label(system, maintenance_type, value):
+    """
+    Return a maintenance record's label, e.g., 'System 1 - Upgrade
+    (2018-12-14)'.
+    """
+    # Aware datetimes are labelled with their UTC date, as they are when
+    # loaded from the database
+    if timezone.is_aware(value):
+        value = value.astimezone(timezone.utc)
+    return '{} - {} ({})'.format(system, maintenance_type, value.date())
+
+
+def get_markup_columns(fields, markup_types=False):
+    """
+    Return the columns that store markup `fields`: each field's raw text and
+    rendered HTML, and, if `markup_types`, its markup type.
+    """
+    columns = []
+    for field in fields:
+        columns += [field, '_{}_rendered'.format(field)]
+        if markup_types:
+            columns.append('{}_markup_type'.format(field))
+    return columns
+
+
+def get_related_names(field_name, pks):
+    """
+    Return a dict of the comma-separated names of each maintenance record's
+    hardware or software (`field_name`), in name order. Records without any
+    are left out.
+    """
+    names = {}
+    name = '{}__name'.format(field_name)
+    for record_pk, related_name in getattr(
+            MaintenanceRecord, field_name).through.objects.filter(
+                maintenancerecord__in=pks).order_by(name).values_list(
+                    'maintenancerecord', name):
+        names.setdefault(record_pk, []).append(related_name)
+    return {pk: ', '.join(related) for pk, related in names.items()}
+
+
+class MaintenanceRecordQuerySet(models.QuerySet):
+
+    def with_related(self):
+        """
+        Join everything needed to render maintenance records as list items,
+        so that a page of records costs a single query. Hardware and
+        software are listed from the denormalized `hardware_names` and
+        `software_names`.
+        """
+        return self.select_related(
+            'maintenance_type',
+            'sys_admin__user',
+            'system',
+        )
+
+    def refresh_display_columns(self, batch_size=DISPLAY_BATCH_SIZE):
+        """
+        Recompute the records' denormalized `DISPLAY_FIELDS`, e.g., after
+        `bulk_create()` or a renamed system. Only records whose columns
+        changed are written. Return the number of records updated.
+        """
+        updated = 0
+        last_pk = None
+        while True:
+            chunk = self.order_by('pk')
+            if last_pk is not None:
+                chunk = chunk.filter(pk__gt=last_pk)
+            chunk = list(chunk.values_list(
+                'pk', 'system__name', 'maintenance_type__maintenance_type',
+                'datetime', *DISPLAY_FIELDS)[:batch_size])
+            if not chunk:
+                return updated
+            last_pk = chunk[-1][0]
+
+            pks = [row[0] for row in chunk]
+            hardware = get_related_names('hardware', pks)
+            software = get_related_names('software', pks)
+            records = []
+            for pk, system, maintenance_type, value, *current in chunk:
+                columns = [
+                    get_display_label(system, maintenance_type, value),
+                    hardware.get(pk, ''),
+                    software.get(pk, ''),
+                ]
+                if columns != current:
+                    records.append(MaintenanceRecord(
+                        pk=pk, **dict(zip(DISPLAY_FIELDS, columns))))
+            MaintenanceRecord.objects.bulk_update(records, DISPLAY_FIELDS)
+            updated += len(records)
+
+    def summaries(self):
+        """
+        Load only what maintenance records are listed with: the joins of
+        `with_related()`, but none of the columns of
+        `MAINTENANCE_MARKUP_FIELDS` or the joined descriptions, which lists
+        never show.
+        """
+        return self.with_related().defer(
+            'maintenance_type__description',
+            'system__description',
+            *get_markup_columns(MAINTENANCE_MARKUP_FIELDS, markup_types=True))
+
+    def with_markup_lengths(self):
+        """
+        Annotate the length of each record's raw `MAINTENANCE_MARKUP_FIELDS`
+        (e.g., `procedure_length`), so pages can tell which panels to show
+        without loading the markup itself.
+        """
+        return self.annotate(**{
+            '{}_length'.format(field): Length(field)
+            for field in MAINTENANCE_MARKUP_FIELDS})
+
+    def with_relation_counts(self):
+        """
+        Annotate the number of hardware, software, documentation records,
+        referenced records and referencing records for each record.
+
+        Each count is a correlated subquery, so the counts don't multiply
+        each other the way joined `Count()` aggregates would.
+        """
+        return self.annotate(
+            hardware_count=_relation_count(
+                MaintenanceRecord.hardware.through, 'maintenancerecord'),
+            software_count=_relation_count(
+                MaintenanceRecord.software.through, 'maintenancerecord'),
+            documentation_record_count=_relation_count(
+                MaintenanceRecord.documentation_records.through,
+                'maintenancerecord'),
+            referenced_record_count=_relation_count(
+                MaintenanceRecordRelationship, 'referencing_record'),
+            referencing_record_count=_relation_count(
+                MaintenanceRecordRelationship, 'referenced_record'),
+        )
+
 
 class MaintenanceRecord(models.Model):
     system = models.ForeignKey(
@@ -138,14 +314,57 @@ class MaintenanceRecord(models.Model):
                   'performed.',
     )
 
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Denormalized for labels and list items; kept current by signals (see
+    # `signals.py`) and rebuilt by `refresh_display_columns()`
+    display_label = models.TextField(blank=True, editable=False)
+    hardware_names = models.TextField(blank=True, editable=False)
+    software_names = models.TextField(blank=True, editable=False)
+
+    # Hash of the markup and its renderers (see `rendering.py`)
+    markup_hash = models.CharField(max_length=40, blank=True, editable=False)
+
+    objects = MaintenanceRecordQuerySet.as_manager()
+
     class Meta:
+        indexes = [
+            models.Index(
+                fields=['-datetime', 'id'],
+                name='sm_record_datetime'),
+            models.Index(
+                fields=['maintenance_type', '-datetime', 'id'],
+                name='sm_record_type_datetime'),
+            models.Index(
+                fields=['status', '-datetime', 'id'],
+                name='sm_record_status_datetime'),
+            models.Index(
+                fields=['sys_admin', '-datetime', 'id'],
+                name='sm_record_sysadmin_datetime'),
+            models.Index(
+                fields=['system', '-datetime', 'id'],
+                name='sm_record_system_datetime'),
+        ]
         ordering = ['-datetime']
         verbose_name = 'maintenance record'
         verbose_name_plural = 'maintenance records'
 
     def __str__(self):
-        return '{} - {} ({})'.format(
-            self.system, self.maintenance_type, self.datetime.date())
+        return self.display_label or self.get_display_label()
+
+    def get_display_label(self):
+        return get_display_label(
+            self.system, self.maintenance_type, self.datetime)
+
+    def refresh_related_names(self):
+        """
+        Reload `hardware_names` and `software_names` from the record's
+        hardware and software.
+        """
+        for field_name in ['hardware', 'software']:
+            setattr(
+                self, '{}_names'.format(field_name),
+                get_related_names(field_name, [self.pk]).get(self.pk, ''))
 
 
 class MaintenanceRecordRelationship(models.Model):
@@ -175,6 +394,46 @@ class MaintenanceRecordRelationship(models.Model):
             self.referencing_record, self.referenced_record)
 
 
+class MaintenanceActivity(models.Model):
+
+    """
+    The number of maintenance records per day, system, maintenance type and
+    status. Kept current as records change (see `activity.py`).
+    """
+
+    date = models.DateField()
+
+    system = models.ForeignKey(
+        'System',
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+
+    maintenance_type = models.ForeignKey(
+        'MaintenanceType',
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+
+    status = models.CharField(
+        choices=STATUS_CHOICES,
+        max_length=15,
+    )
+
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['date']
+        unique_together = ('date', 'system', 'maintenance_type', 'status')
+        verbose_name = 'maintenance activity'
+        verbose_name_plural = 'maintenance activity'
+
+    def __str__(self):
+        return '{} - {} - {} ({}): {}'.format(
+            self.date, self.system, self.maintenance_type, self.status,
+            self.count)
+
+
 class MaintenanceType(models.Model):
 
     maintenance_type = models.CharField(
@@ -196,6 +455,40 @@ class MaintenanceType(models.Model):
         return self.maintenance_type
 
 
+class RenderJob(models.Model):
+
+    """
+    A markup field waiting to be rendered after its record was saved (see
+    `rendering.py`). Saving the record again requeues the job.
+    """
+
+    record_type = models.CharField(
+        choices=[
+            ('documentation', 'documentation'),
+            ('maintenance', 'maintenance'),
+        ],
+        max_length=20,
+    )
+
+    record_id = models.PositiveIntegerField()
+
+    field_name = models.CharField(max_length=50)
+
+    queued_at = models.DateTimeField(default=timezone.now)
+
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['queued_at']
+        unique_together = ('record_type', 'record_id', 'field_name')
+
+    def __str__(self):
+        return '{} {} {}'.format(
+            self.record_type, self.record_id, self.field_name)
+
+
 class Software(models.Model):
 
     name = models.CharField(
@@ -0,0 +1,221 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class KeysetPage:
+
+    """
+    A page of results from a `KeysetPaginator`.
+
+    Quacks enough like `django.core.paginator.Page` for templates and
+    `ListView`, but only knows about its neighbours, not its page number.
+    """
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<KeysetPage of {} objects>'.format(len(self))
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if self.has_next():
+            return self.paginator.encode_cursor(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous():
+            return self.paginator.encode_cursor(
+                self.object_list[0], backwards=True)
+
+    @property
+    def last_cursor(self):
+        return self.paginator.encode_cursor(None, backwards=True)
+
+
+class KeysetPaginator:
+
+    """
+    Paginate a queryset by seeking past the last row of the previous page
+    (`WHERE (datetime, pk) < (...)`) instead of using `OFFSET`.
+
+    `ordering` must identify rows uniquely (e.g., `['-datetime', 'pk']`) so
+    that every row appears on exactly one page. Cursors are opaque tokens
+    encoding the ordering values of the row to seek past and the direction.
+    """
+
+    is_keyset = True
+
+    def __init__(self, queryset, per_page, ordering):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = [
+            (name.lstrip('-'), name.startswith('-')) for name in ordering]
+
+    def _get_field(self, name):
+        opts = self.queryset.model._meta
+        return opts.pk if name == 'pk' else opts.get_field(name)
+
+    def encode_cursor(self, obj, backwards=False):
+        """
+        Return a cursor token for the rows after (or, if `backwards`, before)
+        `obj`. If `obj` is `None`, the cursor points at the end of the
+        results in the given direction.
+        """
+        if obj is None:
+            values = None
+        else:
+            values = [
+                self._get_field(name).value_to_string(obj)
+                for name, descending in self.ordering]
+
+        payload = json.dumps({'b': backwards, 'v': values}).encode()
+        return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """
+        Return a `(values, backwards)` tuple for a cursor token.
+        Raise `InvalidCursor` if the token is malformed.
+        """
+        try:
+            padding = '=' * (-len(cursor) % 4)
+            payload = json.loads(
+                base64.urlsafe_b64decode(cursor + padding).decode())
+            backwards = bool(payload['b'])
+            values = payload['v']
+            if values is not None:
+                if len(values) != len(self.ordering):
+                    raise InvalidCursor('Cursor does not match ordering.')
+                values = [
+                    self._get_field(name).to_python(value)
+                    for (name, descending), value
+                    in zip(self.ordering, values)]
+        except (binascii.Error, KeyError, TypeError, UnicodeDecodeError,
+                ValidationError, ValueError) as e:
+            raise InvalidCursor('Invalid cursor.') from e
+
+        return values, backwards
+
+    def _seek_filter(self, values, backwards):
+        """
+        Build a filter matching rows that come after `values` in the
+        ordering (or before them, if `backwards`).
+        """
+        seek = Q()
+        for i, (name, descending) in enumerate(self.ordering):
+            lookup = 'lt' if descending != backwards else 'gt'
+            condition = Q(**{'{}__{}'.format(name, lookup): values[i]})
+            for j, (previous_name, _) in enumerate(self.ordering[:i]):
+                condition &= Q(**{previous_name: values[j]})
+            seek |= condition
+        return seek
+
+    def _order_by(self, backwards):
+        return [
+            '{}{}'.format('-' if descending != backwards else '', name)
+            for name, descending in self.ordering]
+
+    def page(self, cursor=None):
+        """
+        Return the `KeysetPage` for a cursor token (or the first page, if no
+        cursor is given).
+        """
+        values, backwards = (None, False)
+        if cursor:
+            values, backwards = self.decode_cursor(cursor)
+
+        queryset = self.queryset.order_by(*self._order_by(backwards))
+        if values is not None:
+            queryset = queryset.filter(self._seek_filter(values, backwards))
+
+        # Fetch one extra row to find out whether there is another page
+        object_list = list(queryset[:self.per_page + 1])
+        has_more = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+
+        if backwards:
+            object_list.reverse()
+            return KeysetPage(
+                object_list, self, has_next=values is not None,
+                has_previous=has_more)
+
+        return KeysetPage(
+            object_list, self, has_next=has_more,
+            has_previous=values is not None)
+
+
+class EstimatedCountPaginator(Paginator):
+
+    """
+    A `Paginator` that estimates the size of large, unfiltered tables from
+    database statistics (PostgreSQL's `pg_class.reltuples`) instead of
+    counting every row.
+
+    Filtered querysets, tables with fewer than `estimate_threshold` rows and
+    databases without statistics are counted exactly.
+    """
+
+    estimate_threshold = 10000
+
+    def get_table_estimate(self, queryset):
+        """
+        Return the estimated number of rows in the queryset's table, or
+        `None` if the database has no estimate.
+        """
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [connection.ops.quote_name(queryset.model._meta.db_table)])
+            row = cursor.fetchone()
+        # Tables that have never been analyzed have no (or a -1) estimate
+        if row is None or row[0] < 0:
+            return None
+        return int(row[0])
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = getattr(queryset, 'query', None)
+        unfiltered = (
+            query is not None and query.can_filter() and
+            not query.where and not query.distinct)
+        if unfiltered:
+            estimate = self.get_table_estimate(queryset)
+            if estimate is not None and estimate >= self.estimate_threshold:
+                return estimate
+        return super().count
@@ -0,0 +1,420 @@
+"""
+Off-request and bulk rendering of markup fields.
+
+Markup fields store their rendered HTML, which goes stale when the markup
+renderers are upgraded or reconfigured. Each record also stores a
+`markup_hash` of its markup fields' raw text and markup types and of the
+installed renderers' versions, so `rerender_markup()` can skip records
+whose renders are current. Records are rendered in chunks across a process
+pool and written back with `bulk_update()`.
+
+With `SYSTEM_MAINTENANCE_ASYNC_RENDERING` set, markup bodies of at least
+`SYSTEM_MAINTENANCE_ASYNC_RENDERING_MIN_SIZE` characters are saved with a
+placeholder instead of their HTML (see `fields.MarkupField`), and a
+`RenderJob` is queued for each of them. Jobs are run:
+
+- 'sync': right away, as the record is saved (e.g., for tests)
+- 'thread': by a pool of `SYSTEM_MAINTENANCE_RENDER_WORKERS` threads in the
+  web server's process, once the save is committed
+- 'database': by `manage.py process_render_jobs`
+
+`process_render_jobs` also runs jobs left over in the other modes (e.g., by
+a restarted web server).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+
+import django
+from django.apps import apps
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.html import escape
+
+from .app_settings import (SYSTEM_MAINTENANCE_ASYNC_RENDERING,
+    SYSTEM_MAINTENANCE_RENDER_WORKERS)
+from .caching import bump_model_versions
+from .models import DocumentationRecord, MaintenanceRecord, RenderJob
+
+
+# Markup fields of each model with a `markup_hash`
+MARKUP_FIELDS = {
+    DocumentationRecord: ['documentation'],
+    MaintenanceRecord: ['description', 'procedure', 'problems'],
+}
+
+# Packages whose upgrades can change rendered markup
+RENDERER_PACKAGES = [
+    'django-markupfield',
+    'django-markupfield-helpers',
+    'docutils',
+    'markdown2',
+]
+
+# Number of records read, rendered and written at a time
+RERENDER_BATCH_SIZE = 200
+
+RECORD_TYPES = {
+    'documentation': DocumentationRecord,
+    'maintenance': MaintenanceRecord,
+}
+
+# Failing render jobs are retried this many times
+MAX_RENDER_ATTEMPTS = 3
+
+logger = logging.getLogger('system_maintenance.rendering')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_package_version(name):
+    try:
+        from importlib.metadata import PackageNotFoundError, version
+    except ImportError:
+        return None
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return None
+
+
+@lru_cache(maxsize=None)
+def get_renderer_signature():
+    """
+    Return a string that changes when the markup renderers (or the markup
+    types they're registered under) change.
+    """
+    field = MaintenanceRecord._meta.get_field('description')
+    return json.dumps([
+        [(name, get_package_version(name)) for name in RENDERER_PACKAGES],
+        field.markup_choices_list,
+        field.escape_html,
+    ])
+
+
+def get_markup_hash(markups):
+    """
+    Return the hash of a list of a record's `(raw, markup_type)` markup
+    field values, which changes when they or the renderers change.
+    """
+    return hashlib.sha1(json.dumps(
+        [get_renderer_signature(), markups]).encode()).hexdigest()
+
+
+def set_markup_hash(record):
+    """
+    Set `markup_hash` from the record's current markup field values, e.g.,
+    before it's saved (and rendered).
+    """
+    record.markup_hash = get_markup_hash([
+        [getattr(record, name).raw, getattr(record, name).markup_type]
+        for name in MARKUP_FIELDS[type(record)]])
+
+
+def _get_columns(model):
+    """
+    Return the raw, markup type and rendered columns of a model's markup
+    fields.
+    """
+    fields = [model._meta.get_field(name) for name in MARKUP_FIELDS[model]]
+    return (
+        [field.attname for field in fields],
+        ['{}_markup_type'.format(field.attname) for field in fields],
+        ['_{}_rendered'.format(field.attname) for field in fields],
+    )
+
+
+def render_markup(field, raw, markup_type):
+    """
+    Render raw markup the way `MarkupField.pre_save()` does.
+    """
+    if raw is None:
+        return None
+    if markup_type not in field.markup_choices_dict:
+        raise ValueError('Invalid markup type ({})'.format(markup_type))
+    if field.escape_html:
+        raw = escape(raw)
+    return field.markup_choices_dict[markup_type](raw)
+
+
+def _init_worker():
+    # Worker processes that were spawned rather than forked import Django
+    # from scratch
+    if not apps.ready:
+        django.setup()
+
+
+def render_rows(model_label, rows):
+    """
+    Render `(pk, [(raw, markup_type), ...])` rows of a model's markup
+    fields. Return a list of `(pk, [rendered, ...])` tuples. Runs in worker
+    processes, so it doesn't touch the database.
+    """
+    model = apps.get_model(model_label)
+    fields = [model._meta.get_field(name) for name in MARKUP_FIELDS[model]]
+    return [
+        (pk, [
+            render_markup(field, raw, markup_type)
+            for field, (raw, markup_type) in zip(fields, markups)])
+        for pk, markups in rows]
+
+
+class RerenderStats:
+
+    """
+    Counts of records checked, re-rendered (whose HTML changed) and
+    rehashed (whose HTML was current, but whose hash wasn't).
+    """
+
+    def __init__(self):
+        self.checked = 0
+        self.rerendered = 0
+        self.rehashed = 0
+        self.started = time.time()
+
+    @property
+    def rendered(self):
+        return self.rerendered + self.rehashed
+
+    def get_rate(self):
+        elapsed = time.time() - self.started
+        return self.rendered / elapsed if elapsed else 0
+
+
+def _get_stale_chunks(model, batch_size, force):
+    """
+    Read records `batch_size` at a time, yielding the number read and a list
+    of `(pk, markups, new hash, rendered)` tuples of those whose markup hash
+    is stale.
+    """
+    raw_columns, type_columns, rendered_columns = _get_columns(model)
+    last_pk = None
+    while True:
+        records = model.objects.order_by('pk')
+        if last_pk is not None:
+            records = records.filter(pk__gt=last_pk)
+        chunk = list(records.values_list(
+            'pk', 'markup_hash', *raw_columns, *type_columns,
+            *rendered_columns)[:batch_size])
+        if not chunk:
+            return
+        last_pk = chunk[-1][0]
+
+        count = len(raw_columns)
+        stale = []
+        for pk, markup_hash, *values in chunk:
+            markups = [
+                [raw, markup_type] for raw, markup_type in zip(
+                    values[:count], values[count:2 * count])]
+            new_hash = get_markup_hash(markups)
+            if force or new_hash != markup_hash:
+                stale.append((pk, markups, new_hash, values[2 * count:]))
+        yield len(chunk), stale
+
+
+def _save_renders(model, stale, renders, stats):
+    """
+    Write the renders of stale records. Records whose HTML changed get a new
+    `updated_at` (invalidating their cached fragments); the others only get
+    their new hash.
+    """
+    _, _, rendered_columns = _get_columns(model)
+    now = timezone.now()
+    rerendered = []
+    rehashed = []
+    for (pk, _, new_hash, old_rendered), (_, rendered) in zip(
+            stale, renders):
+        record = model(pk=pk, markup_hash=new_hash, updated_at=now)
+        if rendered != list(old_rendered):
+            for column, html in zip(rendered_columns, rendered):
+                setattr(record, column, html)
+            rerendered.append(record)
+        else:
+            rehashed.append(record)
+
+    with transaction.atomic():
+        model.objects.bulk_update(
+            rerendered, ['markup_hash', 'updated_at'] + rendered_columns)
+        model.objects.bulk_update(rehashed, ['markup_hash'])
+    stats.rerendered += len(rerendered)
+    stats.rehashed += len(rehashed)
+
+
+def rerender_markup(models=None, processes=None,
+                    batch_size=RERENDER_BATCH_SIZE, force=False,
+                    progress=None):
+    """
+    Re-render the markup fields of every record of `models` (by default,
+    every model in `MARKUP_FIELDS`) whose markup hash is stale, or of every
+    record if `force`. Chunks are rendered across `processes` worker
+    processes (by default, one per CPU), or in this process if `processes`
+    is 1. `progress(stats)` is called after each chunk is written.
+    Return a `RerenderStats`.
+    """
+    processes = processes or os.cpu_count() or 1
+    stats = RerenderStats()
+    executor = ProcessPoolExecutor(
+        processes, initializer=_init_worker) if processes > 1 else None
+    try:
+        for model in models or MARKUP_FIELDS:
+            # A few chunks are kept in flight per worker, so that reading
+            # and writing overlap with rendering
+            pending = deque()
+            for count, stale in _get_stale_chunks(model, batch_size, force):
+                stats.checked += count
+                if not stale:
+                    continue
+                args = (
+                    model._meta.label,
+                    [(pk, markups) for pk, markups, _, _ in stale])
+                if executor is None:
+                    _save_renders(model, stale, render_rows(*args), stats)
+                    _report(stats, progress)
+                    continue
+
+                pending.append((stale, executor.submit(render_rows, *args)))
+                if len(pending) > 2 * processes:
+                    stale, renders = pending.popleft()
+                    _save_renders(model, stale, renders.result(), stats)
+                    _report(stats, progress)
+
+            while pending:
+                stale, renders = pending.popleft()
+                _save_renders(model, stale, renders.result(), stats)
+                _report(stats, progress)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    # Conditional GET requests compare model versions
+    if stats.rerendered:
+        bump_model_versions(list(models or MARKUP_FIELDS))
+    return stats
+
+
+def _report(stats, progress):
+    if progress is not None:
+        progress(stats)
+
+
+def get_record_type(model):
+    return next(
+        record_type for record_type, record_model in RECORD_TYPES.items()
+        if record_model is model)
+
+
+def queue_render_jobs(record, field_names):
+    """
+    Queue render jobs for a saved record's deferred markup fields, and run
+    them as `SYSTEM_MAINTENANCE_ASYNC_RENDERING` says.
+    """
+    jobs = [
+        RenderJob.objects.update_or_create(
+            record_type=get_record_type(type(record)),
+            record_id=record.pk,
+            field_name=field_name,
+            defaults={
+                'attempts': 0,
+                'error': '',
+                'queued_at': timezone.now(),
+            })[0]
+        for field_name in field_names]
+
+    if SYSTEM_MAINTENANCE_ASYNC_RENDERING == 'sync':
+        for job in jobs:
+            rendered = run_render_job(job)
+            if rendered is not None:
+                setattr(
+                    record, '_{}_rendered'.format(job.field_name), rendered)
+    elif SYSTEM_MAINTENANCE_ASYNC_RENDERING == 'thread':
+        pks = [job.pk for job in jobs]
+        transaction.on_commit(lambda: _submit(pks))
+
+
+def _submit(pks):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                SYSTEM_MAINTENANCE_RENDER_WORKERS,
+                thread_name_prefix='system_maintenance_render')
+    for pk in pks:
+        _executor.submit(_run_in_thread, pk)
+
+
+def _run_in_thread(pk):
+    try:
+        job = RenderJob.objects.filter(pk=pk).first()
+        if job is not None:
+            run_render_job(job)
+    except Exception:
+        logger.exception('Render job %s failed.', pk)
+    finally:
+        # Each worker thread has its own connection
+        connection.close()
+
+
+def run_render_job(job):
+    """
+    Render a job's markup field from its record's current markup, then
+    delete the job. Return the rendered HTML, or None if the job failed or
+    its record no longer exists.
+
+    If the record was saved again meanwhile, its markup isn't overwritten
+    and the requeued job is left for later.
+    """
+    model = RECORD_TYPES[job.record_type]
+    field = model._meta.get_field(job.field_name)
+    markup_type_column = '{}_markup_type'.format(field.attname)
+    same_job = RenderJob.objects.filter(pk=job.pk, queued_at=job.queued_at)
+
+    values = model.objects.filter(pk=job.record_id).values_list(
+        field.attname, markup_type_column).first()
+    if values is None:
+        same_job.delete()
+        return None
+
+    raw, markup_type = values
+    try:
+        rendered = render_markup(field, raw, markup_type)
+    except Exception as e:
+        logger.exception('Rendering %s failed.', job)
+        same_job.update(attempts=F('attempts') + 1, error=str(e))
+        return None
+
+    with transaction.atomic():
+        updated = model.objects.filter(**{
+            'pk': job.record_id,
+            field.attname: raw,
+            markup_type_column: markup_type,
+        }).update(**{
+            '_{}_rendered'.format(field.attname): rendered,
+            # Invalidates the record's cached fragments
+            'updated_at': timezone.now(),
+        })
+        same_job.delete()
+    if updated:
+        transaction.on_commit(lambda: bump_model_versions([model]))
+    return rendered
+
+
+def process_render_jobs(limit=None):
+    """
+    Run queued render jobs, oldest first, skipping jobs that have failed
+    `MAX_RENDER_ATTEMPTS` times. Return the number of jobs run.
+    """
+    jobs = RenderJob.objects.filter(attempts__lt=MAX_RENDER_ATTEMPTS)
+    count = 0
+    for job in jobs[:limit] if limit else jobs:
+        run_render_job(job)
+        count += 1
+    return count
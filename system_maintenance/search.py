@@ -0,0 +1,350 @@
+"""
+Full-text search over maintenance and documentation records.
+
+The search index lives in the `system_maintenance_search` table, created by
+migration `0003_search_index`:
+
+- PostgreSQL: a `tsvector` column with a GIN index
+- SQLite: an FTS5 virtual table
+- Other databases (or SQLite without FTS5): no index; searches fall back to
+  `icontains` lookups on the records themselves
+
+Records are reindexed as they (or the objects they mention) are saved.
+"""
+
+import re
+from collections import namedtuple
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .app_settings import (SYSTEM_MAINTENANCE_SEARCH_CONFIG,
+    SYSTEM_MAINTENANCE_SEARCH_LIMIT)
+from .models import DocumentationRecord, MaintenanceRecord
+
+
+SEARCH_TABLE = 'system_maintenance_search'
+
+RECORD_TYPES = {
+    'documentation': DocumentationRecord,
+    'maintenance': MaintenanceRecord,
+}
+
+SearchHit = namedtuple('SearchHit', ['record_type', 'record_id', 'rank'])
+
+
+def get_terms(query):
+    """
+    Split a search query into words, dropping any search syntax.
+    """
+    return re.findall(r'\w+', query)
+
+
+def get_documents(record_type, pks):
+    """
+    Yield a `(pk, title, body)` tuple of searchable text for each record.
+    Titles are weighted above bodies when ranking results.
+    """
+    if record_type == 'maintenance':
+        records = MaintenanceRecord.objects.filter(
+            pk__in=pks).select_related(
+                'maintenance_type', 'system').prefetch_related(
+                    'hardware', 'software')
+        for record in records:
+            title = ' '.join([
+                record.system.name, record.maintenance_type.maintenance_type])
+            body = [
+                record.description.raw,
+                record.procedure.raw,
+                record.problems.raw,
+            ]
+            body.extend(hardware.name for hardware in record.hardware.all())
+            body.extend(software.name for software in record.software.all())
+            yield record.pk, title, '\n'.join(filter(None, body))
+
+    elif record_type == 'documentation':
+        records = DocumentationRecord.objects.filter(
+            pk__in=pks).select_related('maintenance_type')
+        for record in records:
+            body = [
+                record.documentation.raw,
+                record.maintenance_type.maintenance_type,
+            ]
+            yield record.pk, record.title, '\n'.join(filter(None, body))
+
+
+class FallbackSearchBackend:
+
+    """
+    Search without an index, using `icontains` lookups on the records.
+    """
+
+    search_fields = {
+        'documentation': [
+            'title',
+            'documentation',
+            'maintenance_type__maintenance_type',
+        ],
+        'maintenance': [
+            'description',
+            'procedure',
+            'problems',
+            'system__name',
+            'maintenance_type__maintenance_type',
+            'hardware__name',
+            'software__name',
+        ],
+    }
+
+    def index(self, record_type, pks):
+        pass
+
+    def remove(self, record_type, pks):
+        pass
+
+    def clear(self):
+        pass
+
+    def _term_filter(self, record_type, terms):
+        matches = Q()
+        for term in terms:
+            term_matches = Q()
+            for field in self.search_fields[record_type]:
+                term_matches |= Q(**{'{}__icontains'.format(field): term})
+            matches &= term_matches
+        return matches
+
+    def filter(self, record_type, terms, field='pk'):
+        matching = RECORD_TYPES[record_type].objects.filter(
+            self._term_filter(record_type, terms))
+        return Q(**{'{}__in'.format(field): matching.values('pk')})
+
+    def search(self, record_type, terms, limit):
+        model = RECORD_TYPES[record_type]
+        pks = model.objects.filter(
+            self._term_filter(record_type, terms)
+        ).values_list('pk', flat=True).distinct()[:limit]
+        return [SearchHit(record_type, pk, None) for pk in pks]
+
+
+class PostgresSearchBackend:
+
+    """
+    Search a `tsvector` column with a GIN index.
+    """
+
+    def index(self, record_type, pks):
+        rows = [
+            (record_type, pk,
+             SYSTEM_MAINTENANCE_SEARCH_CONFIG, title,
+             SYSTEM_MAINTENANCE_SEARCH_CONFIG, body)
+            for pk, title, body in get_documents(record_type, pks)]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                'INSERT INTO {} (record_type, record_id, document) '
+                'VALUES (%s, %s, '
+                "setweight(to_tsvector(%s::regconfig, %s), 'A') || "
+                "setweight(to_tsvector(%s::regconfig, %s), 'B')) "
+                'ON CONFLICT (record_type, record_id) '
+                'DO UPDATE SET document = EXCLUDED.document'.format(
+                    SEARCH_TABLE),
+                rows)
+
+    def remove(self, record_type, pks):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM {} '
+                'WHERE record_type = %s AND record_id = ANY(%s)'.format(
+                    SEARCH_TABLE),
+                [record_type, list(pks)])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM {}'.format(SEARCH_TABLE))
+
+    def _tsquery(self, terms):
+        # Terms are \w+ only, so they are safe to quote as lexemes
+        return ' & '.join("'{}':*".format(term) for term in terms)
+
+    def filter(self, record_type, terms, field='pk'):
+        sql = (
+            'SELECT record_id FROM {} WHERE record_type = %s '
+            'AND document @@ to_tsquery(%s::regconfig, %s)'.format(
+                SEARCH_TABLE))
+        params = [
+            record_type, SYSTEM_MAINTENANCE_SEARCH_CONFIG,
+            self._tsquery(terms)]
+        return Q(**{'{}__in'.format(field): RawSQL(sql, params)})
+
+    def search(self, record_type, terms, limit):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT record_id, ts_rank(document, query) AS rank '
+                'FROM {}, to_tsquery(%s::regconfig, %s) query '
+                'WHERE record_type = %s AND document @@ query '
+                'ORDER BY rank DESC, record_id DESC LIMIT %s'.format(
+                    SEARCH_TABLE),
+                [SYSTEM_MAINTENANCE_SEARCH_CONFIG, self._tsquery(terms),
+                 record_type, limit])
+            return [
+                SearchHit(record_type, record_id, rank)
+                for record_id, rank in cursor.fetchall()]
+
+
+class SQLiteSearchBackend:
+
+    """
+    Search an FTS5 virtual table.
+
+    Documentation records are stored under negative rowids and maintenance
+    records under positive ones, so that rows can be replaced by rowid
+    without scanning the index.
+    """
+
+    def _rowid(self, record_type, pk):
+        return -pk if record_type == 'documentation' else pk
+
+    def _rowid_filter(self, record_type):
+        return 'rowid < 0' if record_type == 'documentation' else 'rowid > 0'
+
+    def _record_id(self, record_type):
+        return '-rowid' if record_type == 'documentation' else 'rowid'
+
+    def index(self, record_type, pks):
+        rows = [
+            (self._rowid(record_type, pk), title, body)
+            for pk, title, body in get_documents(record_type, pks)]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                'DELETE FROM {} WHERE rowid = %s'.format(SEARCH_TABLE),
+                [(rowid, ) for rowid, title, body in rows])
+            cursor.executemany(
+                'INSERT INTO {} (rowid, title, body) '
+                'VALUES (%s, %s, %s)'.format(SEARCH_TABLE),
+                rows)
+
+    def remove(self, record_type, pks):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                'DELETE FROM {} WHERE rowid = %s'.format(SEARCH_TABLE),
+                [(self._rowid(record_type, pk), ) for pk in pks])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM {}'.format(SEARCH_TABLE))
+
+    def _match(self, terms):
+        # Terms are \w+ only, so they are safe to quote as FTS5 strings
+        return ' '.join('"{}"*'.format(term) for term in terms)
+
+    def filter(self, record_type, terms, field='pk'):
+        sql = 'SELECT {} FROM {} WHERE {} MATCH %s AND {}'.format(
+            self._record_id(record_type), SEARCH_TABLE, SEARCH_TABLE,
+            self._rowid_filter(record_type))
+        return Q(**{
+            '{}__in'.format(field): RawSQL(sql, [self._match(terms)])})
+
+    def search(self, record_type, terms, limit):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT {}, bm25({}, 10.0, 1.0) AS rank FROM {} '
+                'WHERE {} MATCH %s AND {} '
+                'ORDER BY rank LIMIT %s'.format(
+                    self._record_id(record_type), SEARCH_TABLE, SEARCH_TABLE,
+                    SEARCH_TABLE, self._rowid_filter(record_type)),
+                [self._match(terms), limit])
+            # bm25() scores better matches lower
+            return [
+                SearchHit(record_type, record_id, -rank)
+                for record_id, rank in cursor.fetchall()]
+
+
+_backend = None
+
+
+def get_backend():
+    """
+    Return the search backend for the default database.
+    """
+    global _backend
+    if _backend is None:
+        if connection.vendor == 'postgresql':
+            _backend = PostgresSearchBackend()
+        elif (connection.vendor == 'sqlite' and
+                SEARCH_TABLE in connection.introspection.table_names()):
+            _backend = SQLiteSearchBackend()
+        else:
+            _backend = FallbackSearchBackend()
+    return _backend
+
+
+def index_records(record_type, pks, chunk_size=500):
+    """
+    Add records to the search index (or refresh them if already indexed).
+    """
+    pks = list(pks)
+    for i in range(0, len(pks), chunk_size):
+        get_backend().index(record_type, pks[i:i + chunk_size])
+
+
+def remove_records(record_type, pks):
+    """
+    Remove records from the search index.
+    """
+    pks = list(pks)
+    if pks:
+        get_backend().remove(record_type, pks)
+
+
+def rebuild_index(chunk_size=500):
+    """
+    Clear and repopulate the search index.
+    Returns a dict of the number of records indexed by record type.
+    """
+    backend = get_backend()
+    backend.clear()
+
+    counts = {}
+    for record_type, model in sorted(RECORD_TYPES.items()):
+        counts[record_type] = 0
+        last_pk = 0
+        while True:
+            pks = list(model.objects.filter(pk__gt=last_pk).order_by(
+                'pk').values_list('pk', flat=True)[:chunk_size])
+            if not pks:
+                break
+            backend.index(record_type, pks)
+            counts[record_type] += len(pks)
+            last_pk = pks[-1]
+    return counts
+
+
+def search_filter(record_type, query, field='pk'):
+    """
+    Return a `Q` object matching objects whose `field` refers to a record of
+    `record_type` that matches the search query.
+    """
+    terms = get_terms(query)
+    if not terms:
+        return Q(**{'{}__in'.format(field): []})
+    return get_backend().filter(record_type, terms, field)
+
+
+def search(query, record_types=None, limit=SYSTEM_MAINTENANCE_SEARCH_LIMIT):
+    """
+    Return a list of `SearchHit`s for records matching every word in the
+    query, best matches first.
+    """
+    terms = get_terms(query)
+    if not terms:
+        return []
+
+    backend = get_backend()
+    hits = []
+    for record_type in record_types or sorted(RECORD_TYPES):
+        hits.extend(backend.search(record_type, terms, limit))
+
+    if all(hit.rank is not None for hit in hits):
+        hits.sort(key=lambda hit: hit.rank, reverse=True)
+    return hits[:limit]
@@ -0,0 +1,226 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_init,
+    post_save, pre_delete, pre_save)
+from django.dispatch import receiver
+
+from . import activity, rendering, search
+from .caching import (DASHBOARD_COUNT_MODELS, VERSIONED_MODELS,
+    adjust_dashboard_count, bump_model_versions)
+from .models import (DocumentationRecord, Hardware, MaintenanceRecord,
+    MaintenanceType, RenderJob, Software, System)
+
+
+@receiver(post_save)
+def increment_dashboard_count(sender, created, **kwargs):
+    if created and sender in DASHBOARD_COUNT_MODELS.values():
+        transaction.on_commit(lambda: adjust_dashboard_count(sender, 1))
+
+
+@receiver(post_delete)
+def decrement_dashboard_count(sender, **kwargs):
+    if sender in DASHBOARD_COUNT_MODELS.values():
+        transaction.on_commit(lambda: adjust_dashboard_count(sender, -1))
+
+
+@receiver(user_logged_in)
+def remember_sysadmin_role(sender, request, user, **kwargs):
+    """
+    Look up a user's sysadmin role when they log in, so that their page
+    views don't have to.
+    """
+    from .views import session_sysadmin_check
+    if request is not None and hasattr(request, 'session'):
+        session_sysadmin_check(request.session, user)
+
+
+@receiver(post_delete)
+@receiver(post_save)
+def bump_model_version(sender, update_fields=None, **kwargs):
+    # Logins only update `last_login`, which no page shows, and shouldn't
+    # invalidate every cached page that lists users
+    if update_fields == frozenset(['last_login']):
+        return
+    if sender in VERSIONED_MODELS:
+        transaction.on_commit(lambda: bump_model_versions([sender]))
+
+
+@receiver(m2m_changed)
+def bump_m2m_model_versions(sender, instance, model, action, **kwargs):
+    """
+    Bump the versions of the models on both sides of a changed
+    many-to-many relationship (e.g., a maintenance record's hardware).
+    """
+    models = [type(instance), model]
+    if action.startswith('post_') and all(
+            model in VERSIONED_MODELS for model in models):
+        transaction.on_commit(lambda: bump_model_versions(models))
+
+
+@receiver(post_init, sender=MaintenanceRecord)
+def remember_activity_key(sender, instance, **kwargs):
+    """
+    Remember which rollup row a saved record counts towards, so that a later
+    save can tell whether it moved to another day, system, type or status.
+    """
+    instance._activity_key = activity.get_activity_key(instance) \
+        if instance.pk else None
+
+
+@receiver(pre_save, sender=MaintenanceRecord)
+def fetch_activity_key(sender, instance, raw=False, **kwargs):
+    # Records loaded with deferred fields (or created with a pk) are looked
+    # up instead
+    if not raw and instance.pk and instance._activity_key is None:
+        instance._activity_key = activity.fetch_activity_key(instance.pk)
+
+
+@receiver(post_save, sender=MaintenanceRecord)
+def update_activity(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    old_key = instance._activity_key
+    new_key = activity.get_activity_key(instance) or \
+        activity.fetch_activity_key(instance.pk)
+    if new_key != old_key:
+        if old_key is not None:
+            activity.adjust_activity(old_key, -1)
+        activity.adjust_activity(new_key, 1)
+    instance._activity_key = new_key
+
+
+@receiver(post_delete, sender=MaintenanceRecord)
+def remove_activity(sender, instance, **kwargs):
+    key = instance._activity_key or activity.get_activity_key(instance)
+    if key is not None:
+        activity.adjust_activity(key, -1)
+    instance._activity_key = None
+
+
+@receiver(pre_save, sender=MaintenanceRecord)
+def update_display_columns(sender, instance, raw=False, **kwargs):
+    if raw or 'display_label' in instance.get_deferred_fields():
+        return
+    instance.display_label = instance.get_display_label()
+    # A new record's hardware and software are added after it's saved
+    if not instance._state.adding:
+        instance.refresh_related_names()
+
+
+@receiver(pre_save, sender=DocumentationRecord)
+@receiver(pre_save, sender=MaintenanceRecord)
+def update_markup_hash(sender, instance, raw=False, **kwargs):
+    # Saves render every markup field
+    if not raw and 'markup_hash' not in instance.get_deferred_fields():
+        rendering.set_markup_hash(instance)
+
+
+@receiver(post_save, sender=DocumentationRecord)
+@receiver(post_save, sender=MaintenanceRecord)
+def queue_render_jobs(sender, instance, raw=False, **kwargs):
+    # Set by `fields.MarkupField.pre_save()`
+    field_names = instance.__dict__.pop('_deferred_renders', None)
+    if field_names and not raw:
+        rendering.queue_render_jobs(instance, field_names)
+
+
+@receiver(post_delete, sender=DocumentationRecord)
+@receiver(post_delete, sender=MaintenanceRecord)
+def delete_render_jobs(sender, instance, **kwargs):
+    RenderJob.objects.filter(
+        record_type=rendering.get_record_type(sender),
+        record_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=DocumentationRecord)
+@receiver(post_save, sender=MaintenanceRecord)
+def index_record(sender, instance, raw=False, **kwargs):
+    if not raw:
+        record_type = 'maintenance' if sender is MaintenanceRecord \
+            else 'documentation'
+        search.index_records(record_type, [instance.pk])
+
+
+@receiver(post_delete, sender=DocumentationRecord)
+@receiver(post_delete, sender=MaintenanceRecord)
+def unindex_record(sender, instance, **kwargs):
+    record_type = 'maintenance' if sender is MaintenanceRecord \
+        else 'documentation'
+    search.remove_records(record_type, [instance.pk])
+
+
+def update_maintenance_records(pks):
+    """
+    Reindex maintenance records and refresh their display columns after
+    something they mention changed.
+    """
+    search.index_records('maintenance', pks)
+    MaintenanceRecord.objects.filter(pk__in=pks).refresh_display_columns()
+
+
+@receiver(post_save, sender=Hardware)
+@receiver(post_save, sender=MaintenanceType)
+@receiver(post_save, sender=Software)
+@receiver(post_save, sender=System)
+def reindex_records_mentioning(sender, instance, created, raw=False,
+                               **kwargs):
+    """
+    Reindex (and relabel) records that mention a renamed system,
+    maintenance type, hardware or software. This is done as part of the save,
+    so its cost grows with the number of records that mention the instance.
+    """
+    if created or raw:
+        return
+
+    lookup = {
+        Hardware: 'hardware',
+        MaintenanceType: 'maintenance_type',
+        Software: 'software',
+        System: 'system',
+    }[sender]
+    update_maintenance_records(list(MaintenanceRecord.objects.filter(
+        **{lookup: instance}).values_list('pk', flat=True)))
+    if sender is MaintenanceType:
+        search.index_records(
+            'documentation', DocumentationRecord.objects.filter(
+                maintenance_type=instance).values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Hardware)
+@receiver(pre_delete, sender=Software)
+def remember_records_mentioning(sender, instance, **kwargs):
+    # Their relations are deleted without sending `m2m_changed`
+    instance._maintenance_record_pks = list(
+        instance.maintenancerecord_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Hardware)
+@receiver(post_delete, sender=Software)
+def update_records_mentioning(sender, instance, **kwargs):
+    update_maintenance_records(
+        instance.__dict__.pop('_maintenance_record_pks', []))
+
+
+@receiver(m2m_changed, sender=MaintenanceRecord.hardware.through)
+@receiver(m2m_changed, sender=MaintenanceRecord.software.through)
+def update_maintenance_record_m2m(sender, instance, action, reverse, pk_set,
+                                  **kwargs):
+    if not reverse:
+        if action in ['post_add', 'post_remove', 'post_clear']:
+            search.index_records('maintenance', [instance.pk])
+            # Keep the instance current, so a later save doesn't undo this
+            instance.refresh_related_names()
+            MaintenanceRecord.objects.filter(pk=instance.pk).update(
+                hardware_names=instance.hardware_names,
+                software_names=instance.software_names)
+        return
+
+    # `instance` is hardware or software; `pk_set` is maintenance records
+    if action == 'pre_clear':
+        instance._cleared_maintenance_record_pks = list(
+            instance.maintenancerecord_set.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        update_maintenance_records(instance.__dict__.pop(
+            '_cleared_maintenance_record_pks', []))
+    elif action in ['post_add', 'post_remove']:
+        update_maintenance_records(list(pk_set))
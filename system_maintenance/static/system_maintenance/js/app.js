@@ -1,2 +1,47 @@
 // Make Markdown-generated tables Bootstrap-friendly
 $('table').addClass('table');
+
+// Reload pages whose markup is still being rendered, until it's ready
+if ($('.rendering-placeholder').length) {
+  setTimeout(function () {
+    window.location.reload();
+  }, 5000);
+}
+
+// Load a lazy panel body from its fragment URL, replacing the link to the
+// page with every panel inlined (left in place if loading fails)
+function loadFragment(element) {
+  var $element = $(element);
+  $.get($element.data('fragment-url')).done(function (html) {
+    $element.html(html);
+    $element.find('table').addClass('table');
+
+    // Markup that is still being rendered is loaded again until it's ready
+    if ($element.find('.rendering-placeholder').length) {
+      setTimeout(function () {
+        loadFragment(element);
+      }, 5000);
+    }
+  });
+}
+
+// Load lazy panel bodies as they're scrolled near (or right away, in
+// browsers without IntersectionObserver)
+var $lazyFragments = $('.lazy-fragment[data-fragment-url]');
+if ('IntersectionObserver' in window) {
+  var fragmentObserver = new IntersectionObserver(function (entries) {
+    entries.forEach(function (entry) {
+      if (entry.isIntersecting) {
+        fragmentObserver.unobserve(entry.target);
+        loadFragment(entry.target);
+      }
+    });
+  }, {rootMargin: '500px 0px'});
+  $lazyFragments.each(function () {
+    fragmentObserver.observe(this);
+  });
+} else {
+  $lazyFragments.each(function () {
+    loadFragment(this);
+  });
+}
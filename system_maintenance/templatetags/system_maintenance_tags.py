@@ -0,0 +1,70 @@
+from django import template
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.safestring import mark_safe
+from django.utils.timezone import get_current_timezone_name
+from django.utils.translation import get_language
+
+from ..caching import get_fragment
+
+
+register = template.Library()
+
+
+def get_fragment_url(type_of_record, type_of_field, record):
+    return reverse('system_maintenance:fragment_view', kwargs={
+        'type_of_record': type_of_record,
+        'type_of_field': type_of_field,
+        'record_pk': record.pk,
+    })
+
+
+@register.simple_tag
+def markup_panel(type_of_record, record, type_of_field, panel_type,
+                 lazy=False):
+    """
+    Render a panel for one of a record's markup fields, cached until the
+    record is next saved. A `lazy` panel's body is left for app.js to load
+    from `fragment_view`, so the field's markup needn't be loaded.
+
+    Usage: {% markup_panel 'maintenance' object 'description' 'info' %}
+    """
+    def render():
+        field = getattr(record, type_of_field)
+        return render_to_string('system_maintenance/_panel.html', {
+            'content': None if lazy else field,
+            'fragment_url': get_fragment_url(
+                type_of_record, type_of_field, record) if lazy else None,
+            'markup_type': field.markup_type,
+            'panel_type': panel_type,
+            'record_pk': record.pk,
+            'type_of_field': type_of_field,
+            'type_of_record': type_of_record,
+        })
+
+    return mark_safe(get_fragment(
+        'panel', record, render, [type_of_field, panel_type, lazy]))
+
+
+@register.simple_tag
+def documentation_record_inline(documentation, lazy=False):
+    """
+    Render a documentation record's title and body for inlining in another
+    page, cached until the documentation record is next saved. A `lazy`
+    record's body is left for app.js to load from `fragment_view`.
+
+    Usage: {% documentation_record_inline documentation %}
+    """
+    def render():
+        return render_to_string(
+            'system_maintenance/_documentation_record_inline.html', {
+                'documentation': documentation,
+                'fragment_url': get_fragment_url(
+                    'documentation', 'documentation',
+                    documentation) if lazy else None,
+            })
+
+    # Timestamps are rendered in the active language and time zone
+    return mark_safe(get_fragment(
+        'documentation', documentation, render,
+        [get_language(), get_current_timezone_name(), lazy]))
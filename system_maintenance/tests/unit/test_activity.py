@@ -0,0 +1,218 @@
+import datetime
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from system_maintenance.activity import (get_activity_date,
+    get_activity_today, get_activity_trend, get_periods, rebuild_maintenance_activity)
+from system_maintenance.caching import get_cache
+from system_maintenance.models import (MaintenanceActivity, MaintenanceRecord,
+    System)
+from system_maintenance.tests.utilities import (
+    login_sysadmin_user, populate_test_db)
+
+
+def get_counts():
+    return {
+        (row.date, row.system_id, row.maintenance_type_id, row.status):
+            row.count
+        for row in MaintenanceActivity.objects.all()}
+
+
+def recount():
+    """
+    Return the rollup counts computed from scratch.
+    """
+    counts = {}
+    for record in MaintenanceRecord.objects.all():
+        key = (
+            get_activity_date(record.datetime), record.system_id,
+            record.maintenance_type_id, record.status)
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+class MaintenanceActivityTest(TestCase):
+
+    def setUp(self):
+        self.db_objects = populate_test_db()
+        self.record = self.db_objects['maintenance_record_1']
+
+    def test_creates_are_counted(self):
+        self.assertEqual(sum(get_counts().values()), 3)
+        self.assertEqual(get_counts(), recount())
+
+    def test_status_change(self):
+        self.record.status = 'Failed'
+        self.record.save()
+        self.assertEqual(get_counts(), recount())
+
+    def test_date_and_system_change(self):
+        self.record.datetime -= datetime.timedelta(days=40)
+        self.record.system = System.objects.create(name='System 2')
+        self.record.save()
+        self.assertEqual(get_counts(), recount())
+        self.assertEqual(MaintenanceActivity.objects.count(), 3)
+
+    def test_unchanged_save_does_not_write_rollup(self):
+        record = MaintenanceRecord.objects.get(pk=self.record.pk)
+        record.description = 'Changed'
+        with CaptureQueriesContext(connection) as queries:
+            record.save()
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if MaintenanceActivity._meta.db_table in query['sql']])
+        self.assertEqual(get_counts(), recount())
+
+    def test_save_with_deferred_fields(self):
+        record = MaintenanceRecord.objects.only('pk', 'status').get(
+            pk=self.record.pk)
+        record.status = 'Complete'
+        record.save()
+        self.assertEqual(get_counts(), recount())
+
+    def test_queryset_update_needs_rebuild(self):
+        MaintenanceRecord.objects.update(status='Complete')
+        self.assertNotEqual(get_counts(), recount())
+        self.assertEqual(rebuild_maintenance_activity(), 2)
+        self.assertEqual(get_counts(), recount())
+
+    def test_delete(self):
+        self.record.delete()
+        MaintenanceRecord.objects.filter(status='Failed').delete()
+        self.assertEqual(get_counts(), recount())
+        self.assertEqual(sum(get_counts().values()), 1)
+
+    def test_rebuild_command(self):
+        MaintenanceActivity.objects.all().delete()
+        call_command('rebuild_maintenance_activity', stdout=StringIO())
+        self.assertEqual(get_counts(), recount())
+
+
+class ActivityTrendTest(TestCase):
+
+    def setUp(self):
+        self.db_objects = populate_test_db()
+        self.today = timezone.localdate()
+        record = self.db_objects['maintenance_record_1']
+        record.datetime -= datetime.timedelta(days=70)
+        record.save()
+
+    def test_periods(self):
+        self.assertEqual(
+            get_periods(datetime.date(2020, 1, 31), datetime.date(2020, 3, 1),
+                        'month'),
+            [datetime.date(2020, 1, 1), datetime.date(2020, 2, 1),
+             datetime.date(2020, 3, 1)])
+        self.assertEqual(
+            get_periods(datetime.date(2020, 1, 1), datetime.date(2020, 1, 13),
+                        'week'),
+            [datetime.date(2019, 12, 30), datetime.date(2020, 1, 6),
+             datetime.date(2020, 1, 13)])
+
+    def test_trend_by_status(self):
+        start = self.today - datetime.timedelta(days=100)
+        with self.assertNumQueries(1):
+            trend = get_activity_trend(
+                start, self.today, interval='day', group_by='status')
+
+        self.assertEqual(len(trend.periods), 101)
+        self.assertEqual(
+            [label for label, counts in trend.series],
+            ['Complete', 'Failed', 'In Progress'])
+        self.assertEqual(sum(trend.totals), 3)
+        self.assertEqual(trend.totals[-1], 2)
+        self.assertEqual(trend.totals[-71], 1)
+
+    def test_trend_by_week_and_month(self):
+        start = self.today - datetime.timedelta(days=100)
+        for interval in ['week', 'month']:
+            trend = get_activity_trend(start, self.today, interval=interval)
+            self.assertEqual(trend.series[0][0], 'System 1')
+            self.assertEqual(sum(trend.totals), 3)
+            self.assertEqual(trend.totals[-1], 2)
+
+    def test_filters(self):
+        trend = get_activity_trend(
+            self.today, self.today, interval='day', group_by='system',
+            filters={'status': 'Failed'})
+        self.assertEqual(trend.series, [('System 1', [1])])
+
+
+class ActivityTrendViewTest(TestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        self.db_objects = populate_test_db()
+        login_sysadmin_user(self)
+
+    def test_view(self):
+        response = self.client.get(
+            reverse('system_maintenance:activity_trend'),
+            {'group_by': 'maintenance_type'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Maintenance Type 1')
+        self.assertEqual(len(response.context['rows']), 12)
+
+    def test_json_view(self):
+        today = timezone.localdate()
+        response = self.client.get(
+            reverse('system_maintenance:activity_trend_json'),
+            {'interval': 'day', 'start': today.isoformat(),
+             'system': self.db_objects['system'].pk})
+        data = json.loads(response.content.decode())
+        self.assertEqual(data['periods'], [today.isoformat()])
+        self.assertEqual(data['series'], [
+            {'label': 'System 1', 'counts': [3]}])
+        self.assertEqual(data['totals'], [3])
+
+    def test_query_count_does_not_grow_with_history(self):
+        url = reverse('system_maintenance:activity_trend_json')
+        for _ in range(20):
+            MaintenanceRecord.objects.create(
+                system=self.db_objects['system'],
+                sys_admin=self.db_objects['sysadmin'],
+                maintenance_type=self.db_objects['maintenance_type_1'],
+            )
+        # Session, user and the rollup
+        with self.assertNumQueries(3):
+            self.client.get(url)
+
+    def test_invalid_parameters(self):
+        url = reverse('system_maintenance:activity_trend')
+        for params in [
+                {'interval': 'year'},
+                {'group_by': 'hardware'},
+                {'start': '2020-02-01', 'end': '2020-01-01'},
+                {'start': '0001-01-01', 'interval': 'day'},
+                {'system': 0}]:
+            self.assertEqual(self.client.get(url, params).status_code, 404)
+
+
+@override_settings(USE_TZ=False)
+class ActivityWithoutTimeZoneTest(TestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        self.db_objects = populate_test_db()
+        login_sysadmin_user(self)
+
+    def test_rollup(self):
+        self.assertEqual(get_counts(), recount())
+        self.assertEqual(rebuild_maintenance_activity(), 3)
+        self.assertEqual(get_counts(), recount())
+
+    def test_json_view_defaults_to_today(self):
+        response = self.client.get(
+            reverse('system_maintenance:activity_trend_json'),
+            {'interval': 'day'})
+        data = json.loads(response.content.decode())
+        self.assertEqual(
+            data['periods'][-1], get_activity_today().isoformat())
+        self.assertEqual(data['totals'][-1], 3)
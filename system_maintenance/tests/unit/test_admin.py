@@ -0,0 +1,285 @@
+from unittest import mock
+
+from django.db import connection
+from django.forms import modelform_factory
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from system_maintenance.admin import DocumentationRecordAdminForm
+from system_maintenance.models import (
+    DocumentationRecord, Hardware, MaintenanceRecord,
+    MaintenanceRecordRelationship)
+from system_maintenance.pagination import EstimatedCountPaginator
+from system_maintenance.tests.utilities import (
+    CustomAssertions, add_maintenance_records, login_sysadmin_superuser,
+    populate_test_db)
+
+
+class DocumentationRecordAdminFormTest(TestCase):
+
+    def setUp(self):
+        self.db_objects = populate_test_db()
+        self.documentation = self.db_objects['documentation_record_1']
+        self.through_table = \
+            self.documentation.maintenance_records.through._meta.db_table
+
+    def get_form(self, records):
+        # Like the admin, which adds the model to the form
+        form_class = modelform_factory(
+            DocumentationRecord, form=DocumentationRecordAdminForm,
+            fields=[
+                'title', 'maintenance_type', 'documentation',
+                'documentation_markup_type', 'maintenance_records'])
+        return form_class(
+            instance=self.documentation,
+            data={
+                'title': self.documentation.title,
+                'maintenance_type': self.documentation.maintenance_type.pk,
+                'documentation': '',
+                'documentation_markup_type': 'Markdown',
+                'maintenance_records': [record.pk for record in records],
+            })
+
+    def save_form(self, records, commit=True):
+        form = self.get_form(records)
+        self.assertTrue(form.is_valid(), form.errors)
+        with CaptureQueriesContext(connection) as queries:
+            form.save(commit=commit)
+            if not commit:
+                form.instance.save()
+                form.save_m2m()
+        return [
+            query['sql'].split()[0] for query in queries
+            if self.through_table in query['sql']
+            and not query['sql'].startswith('SELECT')]
+
+    def assertLinkedRecords(self, records):
+        self.assertEqual(
+            set(self.documentation.maintenance_records.all()), set(records))
+
+    def test_only_changes_are_saved(self):
+        record_1 = self.db_objects['maintenance_record_1']
+        record_2 = self.db_objects['maintenance_record_2']
+
+        self.assertEqual(self.save_form([record_1, record_2]), ['INSERT'])
+        self.assertLinkedRecords([record_1, record_2])
+
+        self.assertEqual(self.save_form([record_1, record_2]), [])
+
+        self.assertEqual(self.save_form([record_1]), ['DELETE'])
+        self.assertLinkedRecords([record_1])
+
+    def test_save_m2m_after_commit_false(self):
+        record_3 = self.db_objects['maintenance_record_3']
+        self.save_form([record_3], commit=False)
+        self.assertLinkedRecords([record_3])
+
+    def test_widget_renders_selected_records_in_constant_queries(self):
+        records = add_maintenance_records(self.db_objects, 20)
+
+        def count_queries(selected):
+            form = self.get_form(selected)
+            with CaptureQueriesContext(connection) as queries:
+                html = str(form['maintenance_records'])
+            self.assertEqual(html.count('selected'), len(selected))
+            return len(queries)
+
+        self.assertEqual(count_queries(records[:1]), count_queries(records))
+
+    def test_widget_uses_maintenance_record_autocomplete(self):
+        html = str(self.get_form([])['maintenance_records'])
+        self.assertIn(
+            'data-ajax--url="{}"'.format(reverse(
+                'admin:system_maintenance_maintenancerecord_autocomplete')),
+            html)
+
+
+class MaintenanceRecordAutocompleteTest(TestCase):
+
+    def test_autocomplete_is_paginated(self):
+        db_objects = populate_test_db()
+        add_maintenance_records(db_objects, 25)
+        login_sysadmin_superuser(self)
+
+        response = self.client.get(reverse(
+            'admin:system_maintenance_maintenancerecord_autocomplete'))
+        data = response.json()
+
+        self.assertEqual(len(data['results']), 20)
+        self.assertTrue(data['pagination']['more'])
+        self.assertIn(
+            'System 1 - Maintenance Type 1', data['results'][0]['text'])
+
+
+class ChangelistQueryCountTest(TestCase):
+
+    """
+    Test that changelist pages cost a constant number of queries, however
+    many rows they show.
+    """
+
+    def setUp(self):
+        self.db_objects = populate_test_db()
+        login_sysadmin_superuser(self)
+
+    def get_query_count(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assertConstantQueries(self, url, add_rows):
+        query_count = self.get_query_count(url)
+        add_rows()
+        self.assertEqual(self.get_query_count(url), query_count)
+
+    def test_maintenance_record_changelist(self):
+        self.assertConstantQueries(
+            reverse('admin:system_maintenance_maintenancerecord_changelist'),
+            lambda: add_maintenance_records(self.db_objects, 20))
+
+    def test_maintenance_record_relationship_changelist(self):
+        def add_relationships():
+            referenced_record = self.db_objects['maintenance_record_3']
+            for record in add_maintenance_records(self.db_objects, 20):
+                MaintenanceRecordRelationship.objects.create(
+                    referencing_record=record,
+                    referenced_record=referenced_record)
+
+        self.assertConstantQueries(
+            reverse(
+                'admin:system_maintenance_maintenancerecordrelationship_'
+                'changelist'),
+            add_relationships)
+
+    def test_maintenance_record_change_form(self):
+        """
+        Each relationship row costs one query, to label its autocomplete
+        widget's selected record.
+        """
+        record = self.db_objects['maintenance_record_3']
+        url = reverse(
+            'admin:system_maintenance_maintenancerecord_change',
+            args=[record.pk])
+
+        def add_relationships(count):
+            for other in add_maintenance_records(self.db_objects, count):
+                MaintenanceRecordRelationship.objects.create(
+                    referencing_record=other, referenced_record=record)
+
+        add_relationships(5)
+        self.get_query_count(url)  # Warm up the content type cache
+        query_count = self.get_query_count(url)
+        add_relationships(10)
+        self.assertEqual(self.get_query_count(url), query_count + 10)
+
+
+class ChangelistHardwareFilterTest(TestCase):
+
+    """
+    Test that maintenance records can be filtered by hardware without
+    listing every hardware row.
+    """
+
+    def setUp(self):
+        self.db_objects = populate_test_db()
+        login_sysadmin_superuser(self)
+        Hardware.objects.create(name='Hardware 2')
+        self.url = reverse(
+            'admin:system_maintenance_maintenancerecord_changelist')
+
+    def get_hardware_filters(self, response):
+        return [
+            spec for spec in response.context['cl'].filter_specs
+            if spec.field_path == 'hardware']
+
+    def test_filter_by_hardware(self):
+        hardware = self.db_objects['hardware']
+        response = self.client.get(
+            self.url, {'hardware__id__exact': hardware.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {record.pk for record in response.context['cl'].result_list},
+            {record.pk for record in hardware.maintenancerecord_set.all()})
+        self.assertEqual(
+            self.get_hardware_filters(response)[0].lookup_choices,
+            [(hardware.pk, 'Hardware 1')])
+
+    def test_unfiltered_changelist_lists_no_hardware(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(self.get_hardware_filters(response), [])
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if '"system_maintenance_hardware"' in query['sql']])
+
+    def test_hardware_changelist_links_to_filtered_records(self):
+        hardware = self.db_objects['hardware']
+        response = self.client.get(reverse(
+            'admin:system_maintenance_hardware_changelist'))
+        self.assertContains(
+            response, '{}?hardware__id__exact={}'.format(
+                self.url, hardware.pk))
+
+
+class ChangelistColumnsTest(TestCase, CustomAssertions):
+
+    """
+    Test that changelists load records without their markup columns.
+    """
+
+    def setUp(self):
+        populate_test_db()
+        login_sysadmin_superuser(self)
+
+    def test_changelists(self):
+        for model_name in ['documentationrecord', 'maintenancerecord',
+                           'maintenancerecordrelationship']:
+            self.assertNoMarkupColumnsSelected(reverse(
+                'admin:system_maintenance_{}_changelist'.format(model_name)))
+
+    def test_change_form_loads_markup(self):
+        record = MaintenanceRecord.objects.get(status='Failed')
+        record.procedure = 'Full *procedure*'
+        record.save()
+        response = self.client.get(reverse(
+            'admin:system_maintenance_maintenancerecord_change',
+            args=[record.pk]))
+        self.assertContains(response, 'Full *procedure*')
+
+class EstimatedCountPaginatorTest(TestCase):
+
+    def setUp(self):
+        populate_test_db()
+
+    def get_count(self, queryset, estimate):
+        paginator = EstimatedCountPaginator(queryset, 10)
+        with mock.patch.object(
+                EstimatedCountPaginator, 'get_table_estimate',
+                return_value=estimate) as get_table_estimate:
+            count = paginator.count
+        return count, get_table_estimate.called
+
+    def test_large_unfiltered_table_is_estimated(self):
+        with self.assertNumQueries(0):
+            count, estimated = self.get_count(
+                MaintenanceRecord.objects.all(), 50000)
+        self.assertEqual(count, 50000)
+
+    def test_small_table_is_counted(self):
+        count, estimated = self.get_count(MaintenanceRecord.objects.all(), 3)
+        self.assertEqual(count, 3)
+        self.assertTrue(estimated)
+
+    def test_filtered_queryset_is_counted(self):
+        count, estimated = self.get_count(
+            MaintenanceRecord.objects.filter(status='Failed'), 50000)
+        self.assertEqual(count, 1)
+        self.assertFalse(estimated)
+
+    def test_no_estimate_without_postgresql(self):
+        paginator = EstimatedCountPaginator(MaintenanceRecord.objects.all(), 10)
+        self.assertIsNone(
+            paginator.get_table_estimate(MaintenanceRecord.objects.all()))
+        self.assertEqual(paginator.count, 3)
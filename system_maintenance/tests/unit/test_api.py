@@ -0,0 +1,152 @@
+import re
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from system_maintenance.api import RESOURCES
+from system_maintenance.caching import get_cache
+from system_maintenance.tests.utilities import (
+    add_maintenance_records, login_normal_user, login_sysadmin_user,
+    populate_test_db)
+
+
+def api_url(resource_name):
+    return reverse('system_maintenance:api_resource', args=[resource_name])
+
+
+class ApiPermissionTest(TestCase):
+
+    def setUp(self):
+        populate_test_db()
+
+    def test_users_who_are_not_sysadmins_are_forbidden(self):
+        urls = [reverse('system_maintenance:api_index'), api_url('records')]
+        for url in urls:
+            self.assertEqual(self.client.get(url).status_code, 403)
+        login_normal_user(self)
+        for url in urls:
+            self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_index(self):
+        login_sysadmin_user(self)
+        data = self.client.get(reverse('system_maintenance:api_index')).json()
+        self.assertEqual(sorted(data), sorted(RESOURCES))
+        self.assertTrue(data['systems'].endswith(api_url('systems')))
+
+
+class ApiTest(TestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        self.db_objects = populate_test_db()
+        login_sysadmin_user(self)
+
+    def get_json(self, resource_name, params=None, status_code=200):
+        response = self.client.get(api_url(resource_name), params or {})
+        self.assertEqual(response.status_code, status_code)
+        return response.json()
+
+    def test_every_resource(self):
+        for resource_name in RESOURCES:
+            data = self.get_json(resource_name)
+            self.assertTrue(data['results'])
+            self.assertIsNone(data['next'])
+            self.assertIsNone(data['previous'])
+
+    def test_default_maintenance_record_fields(self):
+        record = self.db_objects['maintenance_record_2']
+        data = self.get_json('records', {'ids': record.pk})
+
+        result = data['results'][0]
+        self.assertEqual(result['id'], record.pk)
+        self.assertEqual(
+            result['system'],
+            {'id': self.db_objects['system'].pk, 'name': 'System 1'})
+        self.assertEqual(result['sys_admin']['name'], 'supersysadmin')
+        self.assertEqual(result['hardware'], [])
+        self.assertEqual(
+            result['software'],
+            [{'id': self.db_objects['software'].pk, 'name': 'Software 1'}])
+        self.assertEqual(len(result['documentation_records']), 2)
+        self.assertEqual(result['status'], 'Complete')
+        self.assertNotIn('description', result)
+
+    def test_sparse_fields_defer_markup_columns(self):
+        record = self.db_objects['maintenance_record_2']
+        record.description = 'A *description*'
+        record.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get_json(
+                'records', {'fields': 'id,status', 'ids': record.pk})
+        self.assertEqual(
+            data['results'][0], {'id': record.pk, 'status': 'Complete'})
+        record_query = [
+            query['sql'] for query in queries
+            if 'system_maintenance_maintenancerecord' in query['sql']][-1]
+        self.assertNotIn('description', record_query)
+
+        data = self.get_json(
+            'records', {'fields': 'id,description', 'ids': record.pk})
+        description = data['results'][0]['description']
+        self.assertEqual(description['markup_type'], 'Markdown')
+        self.assertEqual(description['raw'], 'A *description*')
+        self.assertIn('<em>description</em>', description['rendered'])
+
+    def test_unknown_fields(self):
+        data = self.get_json(
+            'records', {'fields': 'id,secret'}, status_code=400)
+        self.assertEqual(data['error'], 'Unknown fields: secret')
+
+    def test_batch_retrieval_keeps_order(self):
+        records = [
+            self.db_objects['maintenance_record_{}'.format(i)]
+            for i in [3, 1]]
+        data = self.get_json('records', {
+            'ids': '{},999,{}'.format(records[0].pk, records[1].pk)})
+        self.assertEqual(
+            [result['id'] for result in data['results']],
+            [record.pk for record in records])
+
+    def test_invalid_parameters(self):
+        for params in [
+                {'ids': 'a,b'}, {'limit': 0}, {'limit': 'x'},
+                {'cursor': 'bad'}, {'status': 'Done'}]:
+            self.get_json('records', params, status_code=400)
+        self.assertEqual(
+            self.client.get(api_url('unknown')).status_code, 404)
+
+    def test_filters(self):
+        data = self.get_json('records', {'status': 'Failed'})
+        self.assertEqual(
+            [result['id'] for result in data['results']],
+            [self.db_objects['maintenance_record_3'].pk])
+
+    def test_keyset_pagination(self):
+        add_maintenance_records(self.db_objects, 5)
+        ids = []
+        params = {'fields': 'id', 'limit': 3}
+        while True:
+            data = self.get_json('records', params)
+            ids.extend(result['id'] for result in data['results'])
+            if not data['next']:
+                break
+            params['cursor'] = re.search(
+                r'cursor=([^&]+)', data['next']).group(1)
+
+        self.assertEqual(len(ids), 8)
+        self.assertEqual(len(set(ids)), 8)
+        self.assertIsNotNone(data['previous'])
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        """
+        Session, user, records (with system, sysadmin and maintenance type
+        joined), hardware, software and documentation records.
+        """
+        add_maintenance_records(self.db_objects, 20)
+        for limit in [2, 20]:
+            with self.assertNumQueries(6):
+                data = self.get_json('records', {'limit': limit})
+            self.assertEqual(len(data['results']), limit)
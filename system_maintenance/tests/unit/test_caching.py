@@ -0,0 +1,248 @@
+import time
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from system_maintenance.caching import (
+    adjust_dashboard_count, bump_model_versions, get_cache,
+    get_dashboard_counts, get_fragment_cache_stats, get_model_versions,
+    rebuild_dashboard_counts)
+from system_maintenance.models import (
+    DocumentationRecord, Hardware, MaintenanceRecord, System)
+from system_maintenance.tests.utilities import (
+    login_sysadmin_superuser, login_sysadmin_user, populate_test_db)
+
+
+EXPECTED_DASHBOARD_COUNTS = {
+    'documentation_record_count': 2,
+    'hardware_count': 1,
+    'maintenance_record_count': 3,
+    'maintenance_type_count': 2,
+    'software_count': 1,
+    'sys_admin_count': 2,
+    'system_count': 1,
+}
+
+
+class DashboardCountsTest(TestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        populate_test_db()
+
+    def test_rebuild_counts_in_one_query(self):
+        with self.assertNumQueries(1):
+            counts = rebuild_dashboard_counts()
+        self.assertEqual(counts, EXPECTED_DASHBOARD_COUNTS)
+
+    def test_cached_counts_cost_no_queries(self):
+        rebuild_dashboard_counts()
+        with self.assertNumQueries(0):
+            counts = get_dashboard_counts()
+        self.assertEqual(counts, EXPECTED_DASHBOARD_COUNTS)
+
+    def test_missing_counts_are_rebuilt(self):
+        rebuild_dashboard_counts()
+        get_cache().delete('system_maintenance:count:system_maintenance.system')
+        with self.assertNumQueries(1):
+            counts = get_dashboard_counts()
+        self.assertEqual(counts, EXPECTED_DASHBOARD_COUNTS)
+
+    def test_counts_expire(self):
+        """
+        Counts adjusted only in another process's cache are rebuilt from
+        the database once they expire.
+        """
+        rebuild_dashboard_counts()
+        adjust_dashboard_count(System, 5)
+        self.assertEqual(get_dashboard_counts()['system_count'], 6)
+
+        with mock.patch('time.time', return_value=time.time() + 61):
+            with self.assertNumQueries(1):
+                counts = get_dashboard_counts()
+        self.assertEqual(counts, EXPECTED_DASHBOARD_COUNTS)
+
+    def test_versions_expire(self):
+        version = get_model_versions([System])[0]
+        with mock.patch('time.time', return_value=time.time() + 61):
+            self.assertGreater(get_model_versions([System])[0], version)
+
+    def test_home_view_uses_cached_counts(self):
+        """
+        Only the session and user queries remain.
+        """
+        rebuild_dashboard_counts()
+        login_sysadmin_user(self)
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                reverse('system_maintenance:system_maintenance_home_view'))
+        self.assertEqual(response.context['maintenance_record_count'], 3)
+
+    def test_rebuild_dashboard_counts_command(self):
+        get_cache().clear()
+        out = StringIO()
+        call_command('rebuild_dashboard_counts', stdout=out)
+
+        self.assertIn('maintenance_record_count: 3', out.getvalue())
+        with self.assertNumQueries(0):
+            self.assertEqual(get_dashboard_counts(), EXPECTED_DASHBOARD_COUNTS)
+
+
+class DashboardCountSignalsTest(TransactionTestCase):
+
+    """
+    Counter cache updates run on commit, so these tests need real
+    transactions.
+    """
+
+    def setUp(self):
+        get_cache().clear()
+        self.db_objects = populate_test_db()
+        rebuild_dashboard_counts()
+
+    def test_save_increments_count(self):
+        Hardware.objects.create(name='Hardware 2')
+        System.objects.create(name='System 2')
+
+        with self.assertNumQueries(0):
+            counts = get_dashboard_counts()
+        self.assertEqual(counts['hardware_count'], 2)
+        self.assertEqual(counts['system_count'], 2)
+
+    def test_update_does_not_change_count(self):
+        hardware = self.db_objects['hardware']
+        hardware.name = 'Renamed Hardware'
+        hardware.save()
+
+        self.assertEqual(get_dashboard_counts()['hardware_count'], 1)
+
+    def test_delete_decrements_count(self):
+        MaintenanceRecord.objects.filter(status='Failed').delete()
+
+        with self.assertNumQueries(0):
+            counts = get_dashboard_counts()
+        self.assertEqual(counts['maintenance_record_count'], 2)
+
+
+class FragmentCacheTest(TestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        self.db_objects = populate_test_db()
+        self.record = self.db_objects['maintenance_record_2']
+        self.record.description = 'Original *description*'
+        self.record.save()
+        login_sysadmin_user(self)
+        # With every panel inlined, so the cached fragments include bodies
+        self.url = reverse(
+            'system_maintenance:maintenance_record_detail',
+            args=[self.record.pk]) + '?panels=all'
+
+    def get_detail_page(self):
+        """
+        Return the detail page and the fragment cache hits and misses
+        while rendering it.
+        """
+        before = get_fragment_cache_stats()
+        response = self.client.get(self.url)
+        after = get_fragment_cache_stats()
+        return response, {
+            key: after[key] - before[key] for key in ['hits', 'misses']}
+
+    def test_fragments_are_cached(self):
+        # One description panel and two inlined documentation records
+        response, stats = self.get_detail_page()
+        self.assertEqual(stats, {'hits': 0, 'misses': 3})
+        self.assertContains(response, '<em>description</em>')
+
+        cached_response, stats = self.get_detail_page()
+        self.assertEqual(stats, {'hits': 3, 'misses': 0})
+        self.assertEqual(cached_response.content, response.content)
+
+    def test_saving_record_invalidates_its_panels(self):
+        self.get_detail_page()
+        updated_at = self.record.updated_at
+
+        self.record.description = 'Edited *description*'
+        self.record.save()
+        self.assertGreater(self.record.updated_at, updated_at)
+
+        response, stats = self.get_detail_page()
+        self.assertEqual(stats, {'hits': 2, 'misses': 1})
+        self.assertContains(response, 'Edited')
+
+    def test_saving_documentation_record_invalidates_inlined_body(self):
+        self.get_detail_page()
+
+        documentation = self.db_objects['documentation_record_1']
+        documentation.documentation = 'Updated *documentation*'
+        documentation.save()
+
+        response, stats = self.get_detail_page()
+        self.assertEqual(stats, {'hits': 2, 'misses': 1})
+        self.assertContains(response, '<em>documentation</em>')
+
+
+class ListPageCacheTest(TestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        self.db_objects = populate_test_db()
+        login_sysadmin_user(self)
+        self.url = reverse('system_maintenance:maintenance_record_list')
+
+    def get_list_page(self, url=None):
+        """
+        Return a list page and whether it was served from the cache.
+        """
+        before = get_fragment_cache_stats()
+        response = self.client.get(url or self.url)
+        self.assertEqual(response.status_code, 200)
+        return response, get_fragment_cache_stats()['hits'] > before['hits']
+
+    def test_pages_are_cached(self):
+        response, cached = self.get_list_page()
+        self.assertFalse(cached)
+
+        # Only the session and user queries remain
+        with self.assertNumQueries(2):
+            cached_response, cached = self.get_list_page()
+        self.assertTrue(cached)
+        self.assertEqual(cached_response.content, response.content)
+
+        # Other pages and filters are cached separately
+        self.assertFalse(self.get_list_page(self.url + '?status=Failed')[1])
+
+    def test_displayed_model_changes_invalidate_pages(self):
+        for model in [MaintenanceRecord, System, User]:
+            self.get_list_page()
+            bump_model_versions([model])
+            self.assertFalse(self.get_list_page()[1], model)
+
+    def test_new_records_are_listed(self):
+        self.get_list_page()
+        MaintenanceRecord.objects.create(
+            system=System.objects.create(name='New System'),
+            sys_admin=self.db_objects['sysadmin'],
+            maintenance_type=self.db_objects['maintenance_type_1'],
+        )
+        bump_model_versions([MaintenanceRecord, System])
+        self.assertContains(self.client.get(self.url), 'New System')
+
+    def test_unrelated_changes_keep_documentation_pages(self):
+        url = reverse('system_maintenance:documentation_record_list')
+        self.get_list_page(url)
+        bump_model_versions([Hardware])
+        self.assertTrue(self.get_list_page(url)[1])
+        bump_model_versions([DocumentationRecord])
+        self.assertFalse(self.get_list_page(url)[1])
+
+    def test_pages_vary_by_staff_status(self):
+        self.get_list_page()
+        login_sysadmin_superuser(self)
+        self.assertFalse(self.get_list_page()[1])
+        self.assertTrue(self.get_list_page()[1])
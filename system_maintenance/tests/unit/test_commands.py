@@ -0,0 +1,403 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from system_maintenance import rendering
+from system_maintenance.activity import rebuild_maintenance_activity
+from system_maintenance.caching import get_cache, get_dashboard_counts
+from system_maintenance.management.commands.import_maintenance_records \
+    import bulk_create_records
+from system_maintenance.models import (DocumentationRecord,
+    MaintenanceActivity, MaintenanceRecord, MaintenanceRecordRelationship,
+    System)
+from system_maintenance.search import search
+from system_maintenance.tests.utilities import populate_test_db
+
+
+class ImportMaintenanceRecordsTest(TestCase):
+
+    def setUp(self):
+        self.db_objects = populate_test_db()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+        self.rows = [
+            {
+                'id': 'A',
+                'system': 'System 1',
+                'sys_admin': 'sysadmin',
+                'maintenance_type': 'Maintenance Type 1',
+                'datetime': '2015-03-01 12:30',
+                'status': 'Complete',
+                'description': 'Swapped *fan*',
+                'procedure': '',
+                'problems': '',
+                'hardware': 'Hardware 1',
+                'software': '',
+                'references': 'B',
+            },
+            {
+                'id': 'B',
+                'system': 'System 1',
+                'sys_admin': 'supersysadmin',
+                'maintenance_type': 'Maintenance Type 2',
+                'datetime': '2015-02-01',
+                'status': 'Failed',
+                'description': 'Upgrade attempt',
+                'procedure': 'Ran the *installer*',
+                'problems': '',
+                'hardware': '',
+                'software': 'Software 1',
+                'references': '',
+            },
+        ]
+
+    def write_csv(self, rows, name='records.csv'):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        return path
+
+    def write_jsonl(self, rows, name='records.jsonl'):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as f:
+            for row in rows:
+                f.write(json.dumps(row) + '\n')
+        return path
+
+    def import_records(self, path, *args):
+        out = StringIO()
+        call_command(
+            'import_maintenance_records', path, *args, stdout=out,
+            stderr=StringIO())
+        return out.getvalue()
+
+    def get_imported_record(self, description):
+        return MaintenanceRecord.objects.get(description=description)
+
+    def test_import_csv(self):
+        output = self.import_records(self.write_csv(self.rows))
+        self.assertIn('Imported 2 records.', output)
+        self.assertIn('records/s', output)
+
+        first = self.get_imported_record('Swapped *fan*')
+        second = self.get_imported_record('Upgrade attempt')
+
+        self.assertEqual(first.sys_admin, self.db_objects['sysadmin'])
+        self.assertEqual(second.status, 'Failed')
+        self.assertEqual(second.datetime.date().isoformat(), '2015-02-01')
+        self.assertEqual(list(first.hardware.all()), [
+            self.db_objects['hardware']])
+        self.assertEqual(list(second.software.all()), [
+            self.db_objects['software']])
+        self.assertIn('<em>fan</em>', first.description.rendered)
+        self.assertIn('<em>installer</em>', second.procedure.rendered)
+
+        # Forward references are resolved once the referenced record exists
+        self.assertEqual(list(first.referenced_records.all()), [second])
+
+    def test_import_jsonl_with_list_values(self):
+        self.rows[1]['software'] = ['Software 1']
+        self.rows[1]['references'] = ['A']
+        self.import_records(self.write_jsonl(self.rows))
+
+        first = self.get_imported_record('Swapped *fan*')
+        second = self.get_imported_record('Upgrade attempt')
+        self.assertEqual(list(second.referenced_records.all()), [first])
+        self.assertEqual(second.software.count(), 1)
+
+    def test_imported_records_are_searchable(self):
+        self.import_records(self.write_csv(self.rows))
+        self.assertEqual(len(search('installer')), 1)
+
+    def test_unknown_names_fail_without_create_missing(self):
+        self.rows[1]['system'] = 'System 2'
+        with self.assertRaisesMessage(CommandError, 'Record 2'):
+            self.import_records(self.write_csv(self.rows))
+        self.assertEqual(MaintenanceRecord.objects.count(), 3)
+
+    def test_create_missing(self):
+        self.rows[1]['system'] = 'System 2'
+        self.rows[1]['hardware'] = 'Hardware 2;Hardware 2;Hardware 1'
+        self.import_records(
+            self.write_csv(self.rows), '--create-missing')
+
+        record = self.get_imported_record('Upgrade attempt')
+        self.assertEqual(record.system.name, 'System 2')
+        self.assertEqual(
+            [hardware.name for hardware in record.hardware.all()],
+            ['Hardware 1', 'Hardware 2'])
+        self.assertEqual(record.hardware_names, 'Hardware 1, Hardware 2')
+        self.assertTrue(record.display_label.startswith(
+            'System 2 - Maintenance Type 2 ('))
+
+    def test_unknown_sys_admins_are_never_created(self):
+        self.rows[0]['sys_admin'] = 'nonsysadmin'
+        with self.assertRaises(CommandError):
+            self.import_records(
+                self.write_csv(self.rows), '--create-missing')
+
+    def test_invalid_values(self):
+        for field, value in [('status', 'Done'), ('datetime', 'yesterday')]:
+            rows = [dict(self.rows[0], **{field: value})]
+            with self.assertRaises(CommandError):
+                self.import_records(self.write_csv(rows))
+
+    def test_missing_file(self):
+        path = os.path.join(self.directory, 'missing.csv')
+        with self.assertRaisesMessage(CommandError, 'Unable to read'):
+            self.import_records(path)
+
+    def test_non_string_json_values(self):
+        for field, value in [
+                ('system', 1), ('status', ['Complete']), ('datetime', 2015),
+                ('description', {'text': 'Swapped fan'})]:
+            rows = [dict(self.rows[0], **{field: value})]
+            with self.assertRaisesMessage(CommandError, 'Record 1'):
+                self.import_records(self.write_jsonl(rows))
+        self.assertEqual(MaintenanceRecord.objects.count(), 3)
+
+    def test_invalid_json(self):
+        path = self.write_jsonl(self.rows)
+        with open(path, 'a') as f:
+            f.write('{"system": \n[1, 2]\n')
+        with self.assertRaisesMessage(CommandError, 'Line 3'):
+            self.import_records(path)
+        with open(path, 'w') as f:
+            f.write('[1, 2]\n')
+        with self.assertRaisesMessage(CommandError, 'Line 1'):
+            self.import_records(path)
+
+    def test_rows_inserted_concurrently_are_not_mistaken_for_imports(self):
+        records = [
+            MaintenanceRecord(
+                system=self.db_objects['system'],
+                sys_admin=self.db_objects['sysadmin'],
+                maintenance_type=self.db_objects['maintenance_type_1'],
+                description='Imported {}'.format(i))
+            for i in range(2)]
+
+        def insert_concurrently(objs, *args, **kwargs):
+            inserted = original_bulk_create(objs, *args, **kwargs)
+            MaintenanceRecord.objects.create(
+                system=self.db_objects['system'],
+                sys_admin=self.db_objects['sysadmin'],
+                maintenance_type=self.db_objects['maintenance_type_1'],
+                description='Concurrent')
+            for obj in objs:
+                obj.pk = None
+            return inserted
+
+        original_bulk_create = MaintenanceRecord.objects.bulk_create
+        with mock.patch.object(
+                MaintenanceRecord.objects, 'bulk_create',
+                side_effect=insert_concurrently):
+            pks = bulk_create_records(records)
+
+        self.assertEqual(
+            [MaintenanceRecord.objects.get(pk=pk).description.raw
+             for pk in pks],
+            ['Imported 0', 'Imported 1'])
+
+    def test_dry_run_rolls_back(self):
+        self.rows[1]['system'] = 'System 2'
+        output = self.import_records(
+            self.write_csv(self.rows), '--dry-run', '--create-missing')
+
+        self.assertIn('Dry run: rolled back 2 records.', output)
+        self.assertEqual(MaintenanceRecord.objects.count(), 3)
+        self.assertEqual(MaintenanceRecordRelationship.objects.count(), 1)
+        self.assertFalse(System.objects.filter(name='System 2').exists())
+
+    def test_queries_per_batch_do_not_grow_with_batch_size(self):
+        def count_queries(row_count):
+            rows = [
+                dict(self.rows[1], id=str(i), description='Bulk {}'.format(i))
+                for i in range(row_count)]
+            path = self.write_csv(rows, 'bulk-{}.csv'.format(row_count))
+            with CaptureQueriesContext(connection) as queries:
+                self.import_records(path, '--batch-size', str(row_count))
+            return len(queries)
+
+        self.assertEqual(count_queries(10), count_queries(40))
+
+
+class RerenderMarkupTest(TestCase):
+
+    def setUp(self):
+        self.db_objects = populate_test_db()
+        self.record = self.db_objects['maintenance_record_1']
+        self.record.description = '*stale*'
+        self.record.save()
+
+    def rerender(self, *args):
+        out = StringIO()
+        call_command('rerender_markup', *args, stdout=out)
+        return out.getvalue()
+
+    def make_stale(self):
+        MaintenanceRecord.objects.filter(pk=self.record.pk).update(
+            _description_rendered='<p>Old</p>')
+        MaintenanceRecord.objects.update(markup_hash='')
+
+    def get_record(self):
+        return MaintenanceRecord.objects.get(pk=self.record.pk)
+
+    def test_current_records_are_skipped(self):
+        self.assertIn(
+            'Checked 5 records: 0 re-rendered, 0 unchanged but rehashed, '
+            '5 skipped.', self.rerender('--processes', '1'))
+
+    def test_stale_records_are_rerendered(self):
+        self.make_stale()
+        updated_at = self.get_record().updated_at
+        output = self.rerender('--processes', '1', '--batch-size', '2')
+
+        self.assertIn('Checked 4 records, rendered 2', output)
+        self.assertIn(
+            'Checked 5 records: 1 re-rendered, 2 unchanged but rehashed, '
+            '2 skipped.', output)
+        record = self.get_record()
+        self.assertEqual(
+            record.description.rendered, '<p><em>stale</em></p>\n')
+        self.assertGreater(record.updated_at, updated_at)
+
+        # Unchanged renders keep their timestamps
+        other = self.db_objects['maintenance_record_2']
+        self.assertEqual(
+            MaintenanceRecord.objects.get(pk=other.pk).updated_at,
+            other.updated_at)
+
+    def test_renderer_changes(self):
+        with mock.patch.object(
+                rendering, 'get_renderer_signature', return_value='new'):
+            self.assertIn(
+                'Checked 3 records: 0 re-rendered, 3 unchanged but '
+                'rehashed, 0 skipped.',
+                self.rerender('--model', 'maintenancerecord',
+                              '--processes', '1'))
+
+    def test_process_pool(self):
+        self.make_stale()
+        self.assertIn(
+            '1 re-rendered, 2 unchanged but rehashed',
+            self.rerender('--processes', '2', '--batch-size', '1'))
+        self.assertIn(
+            '<em>stale</em>', self.get_record().description.rendered)
+
+    def test_force(self):
+        self.assertIn(
+            '0 re-rendered, 5 unchanged but rehashed',
+            self.rerender('--processes', '1', '--force'))
+
+
+class GenerateBenchmarkDataTest(TestCase):
+
+    def generate(self, *args):
+        call_command(
+            'generate_benchmark_data', '--records', '30', '--batch-size',
+            '10', '--documentation', '5', '--systems', '3', '--hardware',
+            '4', '--software', '4', '--maintenance-types', '2',
+            '--sysadmins', '2', '--body-size', '300', *args,
+            stdout=StringIO())
+
+    def test_generate(self):
+        self.generate()
+
+        self.assertEqual(MaintenanceRecord.objects.count(), 30)
+        self.assertEqual(DocumentationRecord.objects.count(), 5)
+        self.assertEqual(System.objects.count(), 3)
+        self.assertTrue(MaintenanceRecordRelationship.objects.exists())
+        self.assertTrue(
+            MaintenanceRecord.hardware.through.objects.exists())
+
+        record = MaintenanceRecord.objects.first()
+        self.assertGreater(len(record.description.raw), 300)
+        self.assertIn('<', record.description.rendered)
+
+        self.assertEqual(
+            get_dashboard_counts()['maintenance_record_count'], 30)
+        self.assertEqual(
+            sum(MaintenanceActivity.objects.values_list('count', flat=True)),
+            30)
+        self.assertTrue(search('backup', record_types=['maintenance']))
+
+    def test_generation_is_reproducible_and_repeatable(self):
+        self.generate()
+        descriptions = list(MaintenanceRecord.objects.order_by(
+            'pk').values_list('description', flat=True))
+
+        # Lookups are reused; only the records are added again
+        self.generate()
+        self.assertEqual(System.objects.count(), 3)
+        self.assertEqual(MaintenanceRecord.objects.count(), 60)
+        self.assertEqual(
+            list(MaintenanceRecord.objects.order_by('pk').values_list(
+                'description', flat=True))[30:],
+            descriptions)
+
+
+class BenchmarkViewsTest(TestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        populate_test_db()
+        rebuild_maintenance_activity()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def benchmark(self, *args):
+        path = os.path.join(self.directory, 'results.json')
+        stderr = StringIO()
+        call_command(
+            'benchmark_views', '--repeat', '1', '--output', path, *args,
+            stdout=StringIO(), stderr=stderr)
+        with open(path) as f:
+            return json.load(f), stderr.getvalue()
+
+    def test_benchmark(self):
+        report, _ = self.benchmark()
+        results = {result['name']: result for result in report['results']}
+
+        for name in [
+                'admin:system_maintenance_maintenancerecord_changelist',
+                'api_resource records',
+                'fragment_view documentation',
+                'fragment_view procedure',
+                'maintenance_record_chain',
+                'maintenance_record_detail',
+                'maintenance_record_export?format=jsonl',
+                'raw_view procedure?format=text',
+                'search?q=backup',
+                'system_maintenance_home_view']:
+            self.assertIn(name, results)
+        self.assertNotIn('logout', results)
+
+        for result in results.values():
+            self.assertEqual(result['status'], 200, result['name'])
+            self.assertGreater(result['peak_memory_kb'], 0)
+            self.assertLessEqual(result['min_ms'], result['max_ms'])
+        self.assertGreater(results['maintenance_record_list']['queries'], 0)
+        self.assertEqual(report['counts']['maintenance_record_count'], 3)
+
+    def test_compare(self):
+        report, _ = self.benchmark()
+        previous = os.path.join(self.directory, 'previous.json')
+        with open(previous, 'w') as f:
+            json.dump(report, f)
+
+        _, stderr = self.benchmark('--skip-admin', '--compare', previous)
+        self.assertIn('maintenance_record_list:', stderr.split(
+            'Compared with')[1])
@@ -0,0 +1,129 @@
+from django.contrib.auth.models import User, update_last_login
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from system_maintenance.caching import (
+    bump_model_versions, get_cache, get_model_versions)
+from system_maintenance.models import (
+    DocumentationRecord, Hardware, MaintenanceRecord)
+from system_maintenance.tests.utilities import (
+    login_sysadmin_superuser, login_sysadmin_user, populate_test_db)
+
+
+class ConditionalGetTest(TestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        self.db_objects = populate_test_db()
+        login_sysadmin_user(self)
+
+        record = self.db_objects['maintenance_record_1']
+        documentation = self.db_objects['documentation_record_1']
+        self.urls = [
+            reverse('system_maintenance:system_maintenance_home_view'),
+            reverse('system_maintenance:documentation_record_list'),
+            reverse(
+                'system_maintenance:documentation_record_detail',
+                args=[documentation.pk]),
+            reverse('system_maintenance:maintenance_record_list'),
+            reverse(
+                'system_maintenance:maintenance_record_detail',
+                args=[record.pk]),
+            reverse('system_maintenance:raw_view', kwargs={
+                'type_of_record': 'maintenance',
+                'type_of_field': 'description',
+                'record_pk': record.pk,
+            }),
+        ]
+
+    def test_unchanged_pages_return_304_without_main_queries(self):
+        """
+        Only the session and user queries remain.
+        """
+        for url in self.urls:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.has_header('Last-Modified'))
+
+            with self.assertNumQueries(2):
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.content, b'')
+
+            response = self.client.get(
+                url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+            self.assertEqual(response.status_code, 304)
+
+    def test_model_change_invalidates_etag(self):
+        url = reverse('system_maintenance:maintenance_record_list')
+        etag = self.client.get(url)['ETag']
+
+        bump_model_versions([Hardware])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_unrelated_change_keeps_etag(self):
+        url = reverse('system_maintenance:documentation_record_list')
+        etag = self.client.get(url)['ETag']
+
+        bump_model_versions([Hardware])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_varies_by_user(self):
+        url = reverse('system_maintenance:system_maintenance_home_view')
+        etag = self.client.get(url)['ETag']
+
+        login_sysadmin_superuser(self)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_versions_count_as_changed(self):
+        url = reverse('system_maintenance:maintenance_record_list')
+        etag = self.client.get(url)['ETag']
+
+        get_cache().clear()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class ModelVersionSignalsTest(TransactionTestCase):
+
+    """
+    Versions are bumped on commit, so these tests need real transactions.
+    """
+
+    def setUp(self):
+        get_cache().clear()
+        self.db_objects = populate_test_db()
+
+    def assertBumps(self, models, change):
+        before = get_model_versions(models)
+        change()
+        after = get_model_versions(models)
+        for model, old, new in zip(models, before, after):
+            self.assertGreater(new, old, model)
+
+    def test_save_and_delete_bump_versions(self):
+        hardware = self.db_objects['hardware']
+        self.assertBumps([Hardware], hardware.save)
+        self.assertBumps(
+            [MaintenanceRecord],
+            self.db_objects['maintenance_record_3'].delete)
+
+    def test_m2m_changes_bump_both_models(self):
+        record = self.db_objects['maintenance_record_1']
+        documentation = self.db_objects['documentation_record_1']
+        self.assertBumps(
+            [DocumentationRecord, MaintenanceRecord],
+            lambda: record.documentation_records.add(documentation))
+        self.assertBumps(
+            [Hardware, MaintenanceRecord],
+            lambda: self.db_objects['hardware'].maintenancerecord_set.clear())
+
+    def test_logins_keep_user_version(self):
+        before = get_model_versions([User])
+        update_last_login(None, User.objects.get(username='sysadmin'))
+        self.assertEqual(get_model_versions([User]), before)
@@ -0,0 +1,209 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.admin.sites import site
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from system_maintenance.admin import export_as_jsonl
+from system_maintenance.export import (EXPORT_FIELDS, export_rows,
+    join_list, split_list)
+from system_maintenance.models import Hardware, MaintenanceRecord
+from system_maintenance.tests.utilities import (
+    CustomAssertions, add_maintenance_records, login_normal_user,
+    login_sysadmin_user, populate_test_db)
+
+
+def streamed_content(response):
+    return b''.join(response.streaming_content).decode()
+
+
+class ExportRowsTest(TestCase):
+
+    def setUp(self):
+        self.db_objects = populate_test_db()
+
+    def test_rows(self):
+        rows = {row['id']: row for row in export_rows(
+            MaintenanceRecord.objects.all())}
+
+        record_2 = self.db_objects['maintenance_record_2']
+        row = rows[record_2.pk]
+        self.assertEqual(list(row), EXPORT_FIELDS)
+        self.assertEqual(row['system'], 'System 1')
+        self.assertEqual(row['sys_admin'], 'supersysadmin')
+        self.assertEqual(row['maintenance_type'], 'Maintenance Type 2')
+        self.assertEqual(row['datetime'], record_2.datetime.isoformat())
+        self.assertEqual(row['status'], 'Complete')
+        self.assertEqual(row['hardware'], [])
+        self.assertEqual(row['software'], ['Software 1'])
+        self.assertEqual(
+            row['references'], [self.db_objects['maintenance_record_1'].pk])
+
+        row = rows[self.db_objects['maintenance_record_3'].pk]
+        self.assertEqual(row['hardware'], ['Hardware 1'])
+        self.assertEqual(row['status'], 'Failed')
+
+    def test_queries_per_chunk(self):
+        """
+        Each chunk costs one query each for hardware, software and
+        references, plus the record query itself.
+        """
+        add_maintenance_records(self.db_objects, 7)
+        with CaptureQueriesContext(connection) as queries:
+            rows = list(export_rows(
+                MaintenanceRecord.objects.all(), chunk_size=5))
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(len(queries), 1 + 3 * 2)
+
+
+class ExportViewTest(TestCase, CustomAssertions):
+
+    def setUp(self):
+        self.db_objects = populate_test_db()
+        self.url = reverse('system_maintenance:maintenance_record_export')
+
+    def test_redirect_users_who_are_not_sysadmins(self):
+        self.assertRedirectUserToAuthentication(
+            'system_maintenance:maintenance_record_export')
+        login_normal_user(self)
+        self.assertRedirectUserToAuthentication(
+            'system_maintenance:maintenance_record_export')
+
+    def test_csv_export(self):
+        login_sysadmin_user(self)
+        response = self.client.get(self.url, {'format': 'csv'})
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename="maintenance-records.csv"')
+
+        rows = list(csv.DictReader(StringIO(streamed_content(response))))
+        self.assertEqual(len(rows), 3)
+        row = rows[[r['id'] for r in rows].index(
+            str(self.db_objects['maintenance_record_3'].pk))]
+        self.assertEqual(row['hardware'], 'Hardware 1')
+        self.assertEqual(row['software'], 'Software 1')
+
+    def test_jsonl_export_uses_list_view_filters(self):
+        login_sysadmin_user(self)
+        response = self.client.get(
+            self.url, {'format': 'jsonl', 'status': 'Failed'})
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [
+            json.loads(line)
+            for line in streamed_content(response).splitlines()]
+        self.assertEqual(
+            [row['id'] for row in rows],
+            [self.db_objects['maintenance_record_3'].pk])
+
+    def test_invalid_format_or_filter_returns_404(self):
+        login_sysadmin_user(self)
+        for params in [{'format': 'xml'}, {'status': 'Done'}]:
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 404)
+
+    def test_list_view_links_to_filtered_export(self):
+        login_sysadmin_user(self)
+        response = self.client.get(
+            reverse('system_maintenance:maintenance_record_list'),
+            {'status': 'Failed'})
+        self.assertContains(
+            response, '{}?status=Failed&amp;format=csv'.format(self.url))
+
+
+class ExportAdminActionTest(TestCase):
+
+    def test_export_selected_records(self):
+        db_objects = populate_test_db()
+        request = RequestFactory().get('/')
+        queryset = MaintenanceRecord.objects.filter(
+            pk=db_objects['maintenance_record_1'].pk)
+
+        response = export_as_jsonl(
+            site._registry[MaintenanceRecord], request, queryset)
+
+        rows = [
+            json.loads(line)
+            for line in streamed_content(response).splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['hardware'], ['Hardware 1'])
+
+
+class ExportImportRoundTripTest(TestCase):
+
+    def test_exported_records_can_be_imported(self):
+        db_objects = populate_test_db()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        login_sysadmin_user(self)
+        paths = []
+        for export_format in ['csv', 'jsonl']:
+            response = self.client.get(
+                reverse('system_maintenance:maintenance_record_export'),
+                {'format': export_format})
+            path = os.path.join(directory, 'export.{}'.format(export_format))
+            with open(path, 'w', newline='') as f:
+                f.write(streamed_content(response))
+            paths.append(path)
+
+        for path in paths:
+            before = MaintenanceRecord.objects.count()
+            call_command(
+                'import_maintenance_records', path, stdout=StringIO())
+            self.assertEqual(MaintenanceRecord.objects.count(), before + 3)
+
+        copy = MaintenanceRecord.objects.order_by('-pk')[0]
+        original = db_objects['maintenance_record_1']
+        self.assertEqual(copy.datetime, original.datetime)
+        self.assertEqual(copy.sys_admin, original.sys_admin)
+        self.assertEqual(list(copy.hardware.all()), [db_objects['hardware']])
+
+    def test_names_with_separators_survive_csv_round_trip(self):
+        db_objects = populate_test_db()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        hardware = db_objects['hardware']
+        hardware.name = r'Rack 3; slot \2'
+        hardware.save()
+        original = db_objects['maintenance_record_1']
+        original.hardware.add(Hardware.objects.create(name='Hardware 2'))
+
+        login_sysadmin_user(self)
+        response = self.client.get(
+            reverse('system_maintenance:maintenance_record_export'),
+            {'format': 'csv'})
+        path = os.path.join(directory, 'export.csv')
+        with open(path, 'w', newline='') as f:
+            f.write(streamed_content(response))
+        call_command('import_maintenance_records', path, stdout=StringIO())
+
+        copy = MaintenanceRecord.objects.exclude(pk=original.pk).get(
+            hardware__name='Hardware 2')
+        self.assertEqual(
+            [item.name for item in copy.hardware.order_by('name')],
+            ['Hardware 2', r'Rack 3; slot \2'])
+        self.assertEqual(Hardware.objects.count(), 2)
+
+
+class ListSeparatorTest(TestCase):
+
+    def test_join_and_split(self):
+        names = ['a;b', 'c\\', r'd\;e', 'f']
+        self.assertEqual(join_list(names), r'a\;b;c\\;d\\\;e;f')
+        self.assertEqual(split_list(join_list(names)), names)
+        self.assertEqual(
+            split_list(join_list(names, ', '), ', '), names)
+        self.assertEqual(split_list(' a ;; b;'), ['a', 'b'])
@@ -0,0 +1,127 @@
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from system_maintenance.caching import get_cache
+from system_maintenance.forms import MaintenanceRecordFilterForm
+from system_maintenance.models import MaintenanceRecord
+from system_maintenance.tests.utilities import (
+    login_sysadmin_user, populate_test_db)
+
+
+class MaintenanceRecordListFilterTest(TestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        self.db_objects = populate_test_db()
+        login_sysadmin_user(self)
+        self.url = reverse('system_maintenance:maintenance_record_list')
+
+    def assertFilteredRecords(self, data, expected_records):
+        response = self.client.get(self.url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertCountEqual(
+            response.context['object_list'],
+            [self.db_objects[record] for record in expected_records])
+        return response
+
+    def test_filter_by_status(self):
+        self.assertFilteredRecords(
+            {'status': 'Failed'}, ['maintenance_record_3'])
+
+    def test_filter_by_system(self):
+        self.assertFilteredRecords(
+            {'system': self.db_objects['system'].pk}, [
+                'maintenance_record_1',
+                'maintenance_record_2',
+                'maintenance_record_3',
+            ])
+
+    def test_filter_by_maintenance_type(self):
+        self.assertFilteredRecords(
+            {'maintenance_type': self.db_objects['maintenance_type_2'].pk},
+            ['maintenance_record_2'])
+
+    def test_filter_by_sys_admin(self):
+        self.assertFilteredRecords(
+            {'sys_admin': self.db_objects['sysadmin'].pk},
+            ['maintenance_record_1', 'maintenance_record_3'])
+
+    def test_filter_by_hardware_and_software(self):
+        self.assertFilteredRecords(
+            {'hardware': self.db_objects['hardware'].pk},
+            ['maintenance_record_1', 'maintenance_record_3'])
+        self.assertFilteredRecords(
+            {
+                'hardware': self.db_objects['hardware'].pk,
+                'software': self.db_objects['software'].pk,
+            },
+            ['maintenance_record_3'])
+
+    def test_active_filters_are_shown(self):
+        response = self.assertFilteredRecords(
+            {'status': 'Failed'}, ['maintenance_record_3'])
+        self.assertEqual(
+            response.context['active_filters'], [('Status', 'Failed')])
+        self.assertContains(response, 'Clear filters')
+
+    def test_empty_filters_are_ignored(self):
+        self.assertFilteredRecords({'system': '', 'status': ''}, [
+            'maintenance_record_1',
+            'maintenance_record_2',
+            'maintenance_record_3',
+        ])
+
+    def test_invalid_filter_returns_404(self):
+        for data in [{'system': 'abc'}, {'system': 999}, {'status': 'Bad'}]:
+            response = self.client.get(self.url, data)
+            self.assertEqual(response.status_code, 404)
+
+
+class MaintenanceRecordIndexTest(TestCase):
+
+    """
+    Test that the main maintenance record querysets are served by the
+    composite `(<field>, -datetime, id)` indexes.
+    """
+
+    def setUp(self):
+        self.db_objects = populate_test_db()
+        if connection.vendor == 'postgresql':
+            # Tiny test tables are otherwise cheaper to scan sequentially
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.order_by('-datetime', 'pk').explain()
+        self.assertIn(index_name, plan)
+
+    def filter_records(self, **data):
+        form = MaintenanceRecordFilterForm(data)
+        self.assertTrue(form.is_valid())
+        return form.filter(MaintenanceRecord.objects.all())
+
+    def test_list_uses_datetime_index(self):
+        self.assertUsesIndex(
+            MaintenanceRecord.objects.all(), 'sm_record_datetime')
+
+    def test_system_filter_uses_index(self):
+        self.assertUsesIndex(
+            self.filter_records(system=self.db_objects['system'].pk),
+            'sm_record_system_datetime')
+
+    def test_status_filter_uses_index(self):
+        self.assertUsesIndex(
+            self.filter_records(status='Failed'),
+            'sm_record_status_datetime')
+
+    def test_maintenance_type_filter_uses_index(self):
+        self.assertUsesIndex(
+            self.filter_records(
+                maintenance_type=self.db_objects['maintenance_type_1'].pk),
+            'sm_record_type_datetime')
+
+    def test_sys_admin_filter_uses_index(self):
+        self.assertUsesIndex(
+            self.filter_records(sys_admin=self.db_objects['sysadmin'].pk),
+            'sm_record_sysadmin_datetime')
@@ -0,0 +1,155 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from system_maintenance.graph import find_cycles, get_record_chain
+from system_maintenance.models import (
+    MaintenanceRecord, MaintenanceRecordRelationship)
+from system_maintenance.tests.utilities import (
+    add_maintenance_records, login_sysadmin_user, populate_test_db)
+
+
+def relate(referencing_record, referenced_record):
+    MaintenanceRecordRelationship.objects.create(
+        referencing_record=referencing_record,
+        referenced_record=referenced_record)
+
+
+class RecordChainTest(TestCase):
+
+    """
+    Test chains over these relationships (X ➤ Y: X references Y):
+
+        E ➤ A ➤ B ➤ C ➤ D ➤ B    F
+    """
+
+    def setUp(self):
+        db_objects = populate_test_db()
+        MaintenanceRecordRelationship.objects.all().delete()
+        records = add_maintenance_records(db_objects, 6)
+        self.pks = {name: record.pk for name, record in zip('ABCDEF', records)}
+        for referencing, referenced in ['AB', 'BC', 'CD', 'DB', 'EA']:
+            relate(records['ABCDEF'.index(referencing)],
+                   records['ABCDEF'.index(referenced)])
+
+    def get_depths(self, chain):
+        names = {pk: name for name, pk in self.pks.items()}
+        return {names[pk]: depth for pk, depth in chain.depths.items()}
+
+    def test_both_directions(self):
+        with self.assertNumQueries(2):
+            chain = get_record_chain(self.pks['A'], depth=10)
+
+        self.assertEqual(
+            self.get_depths(chain),
+            {'A': 0, 'B': 1, 'E': 1, 'C': 2, 'D': 2})
+        self.assertEqual(len(chain.edges), 5)
+        self.assertEqual(
+            chain.cycles,
+            [{self.pks['B'], self.pks['C'], self.pks['D']}])
+        self.assertFalse(chain.truncated)
+
+    def test_depth_limit(self):
+        chain = get_record_chain(self.pks['A'], depth=1)
+
+        self.assertEqual(self.get_depths(chain), {'A': 0, 'B': 1, 'E': 1})
+        self.assertEqual(len(chain.edges), 2)
+        self.assertEqual(chain.cycles, [])
+        self.assertTrue(chain.truncated)
+
+    def test_one_direction(self):
+        chain = get_record_chain(self.pks['A'], direction='referenced')
+        self.assertEqual(
+            self.get_depths(chain), {'A': 0, 'B': 1, 'C': 2, 'D': 3})
+
+        chain = get_record_chain(self.pks['A'], direction='referencing')
+        self.assertEqual(self.get_depths(chain), {'A': 0, 'E': 1})
+
+    def test_unrelated_record(self):
+        chain = get_record_chain(self.pks['F'])
+        self.assertEqual(self.get_depths(chain), {'F': 0})
+        self.assertEqual(chain.edges, [])
+
+    def test_invalid_direction(self):
+        with self.assertRaises(ValueError):
+            get_record_chain(self.pks['A'], direction='sideways')
+
+
+class FindCyclesTest(TestCase):
+
+    def test_find_cycles(self):
+        edges = [(1, 2), (2, 1), (2, 3), (3, 4), (4, 5), (5, 3), (5, 6)]
+        self.assertEqual(
+            sorted(find_cycles(range(1, 7), edges), key=min),
+            [{1, 2}, {3, 4, 5}])
+
+    def test_no_cycles(self):
+        self.assertEqual(find_cycles([1, 2, 3], [(1, 2), (1, 3), (2, 3)]), [])
+
+
+class RecordChainViewTest(TestCase):
+
+    def setUp(self):
+        self.db_objects = populate_test_db()
+        self.root = self.db_objects['maintenance_record_1']
+        login_sysadmin_user(self)
+
+    def add_referencing_records(self, count):
+        for record in add_maintenance_records(self.db_objects, count):
+            relate(record, self.root)
+
+    def get_chain_page(self, url):
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_query_count_does_not_grow_with_chain(self):
+        """
+        The queries are: session, user, chain, edges and records.
+        """
+        url = reverse(
+            'system_maintenance:maintenance_record_chain',
+            args=[self.root.pk])
+
+        self.add_referencing_records(3)
+        response = self.get_chain_page(url)
+        self.assertEqual(len(response.context['chain'].depths), 5)
+
+        self.add_referencing_records(30)
+        response = self.get_chain_page(url)
+        self.assertEqual(len(response.context['chain'].depths), 35)
+        self.assertContains(response, '1 hop away')
+
+    def test_json(self):
+        response = self.client.get(
+            reverse(
+                'system_maintenance:maintenance_record_chain_json',
+                args=[self.root.pk]),
+            {'depth': 1})
+        data = response.json()
+
+        record_2 = self.db_objects['maintenance_record_2']
+        self.assertEqual(data['root'], self.root.pk)
+        self.assertEqual(data['depth'], 1)
+        self.assertEqual(data['direction'], 'both')
+        self.assertFalse(data['truncated'])
+        self.assertEqual(
+            [(record['id'], record['depth']) for record in data['records']],
+            [(self.root.pk, 0), (record_2.pk, 1)])
+        self.assertEqual(data['records'][1]['system'], 'System 1')
+        self.assertEqual(data['edges'], [[record_2.pk, self.root.pk]])
+        self.assertEqual(data['cycles'], [])
+
+    def test_invalid_parameters_return_404(self):
+        for name in [
+                'maintenance_record_chain', 'maintenance_record_chain_json']:
+            url = reverse('system_maintenance:{}'.format(name), args=[
+                self.root.pk])
+            for params in [
+                    {'depth': 'x'}, {'depth': 0}, {'depth': 1000},
+                    {'direction': 'sideways'}]:
+                self.assertEqual(
+                    self.client.get(url, params).status_code, 404)
+
+            url = reverse('system_maintenance:{}'.format(name), args=[999])
+            self.assertEqual(self.client.get(url).status_code, 404)
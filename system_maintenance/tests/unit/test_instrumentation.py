@@ -0,0 +1,137 @@
+import json
+from unittest import mock
+
+from django.conf import settings
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from system_maintenance.caching import get_cache
+from system_maintenance.instrumentation import (Profile, instrument,
+    metrics, profile)
+from system_maintenance.models import MaintenanceRecord, System
+from system_maintenance.tests.utilities import (
+    login_sysadmin_user, populate_test_db)
+
+
+class ProfileTest(TestCase):
+
+    def setUp(self):
+        populate_test_db()
+
+    def test_queries(self):
+        with profile() as current:
+            list(System.objects.all())
+            list(MaintenanceRecord.objects.all())
+
+        self.assertEqual(current.queries, 2)
+        self.assertGreater(current.db_time, 0)
+        self.assertGreaterEqual(current.duration, current.db_time)
+        self.assertEqual(
+            [query['sql'].split()[0] for query in
+             current.get_slowest_queries()],
+            ['SELECT', 'SELECT'])
+
+    def test_slowest_queries_are_limited(self):
+        current = Profile(slow_query_count=2)
+        for duration in [0.3, 0.1, 0.5, 0.2]:
+            current.add_query('SELECT {}'.format(duration), duration)
+        self.assertEqual(current.queries, 4)
+        self.assertEqual(
+            [query['seconds'] for query in current.get_slowest_queries()],
+            [0.5, 0.3])
+
+    def test_nested_profiles(self):
+        with profile() as outer:
+            list(System.objects.all())
+            with profile() as inner:
+                list(System.objects.all())
+        self.assertEqual(outer.queries, 2)
+        self.assertEqual(inner.queries, 1)
+
+    def test_template_time(self):
+        template = Template('{% for i in items %}{{ i }}{% endfor %}')
+        with profile() as current:
+            template.render(Context({'items': range(100)}))
+        self.assertGreater(current.template_time, 0)
+
+        # Renders outside profiles aren't counted
+        template.render(Context({'items': range(100)}))
+
+    def test_instrument(self):
+        metrics.reset()
+        with self.assertLogs('system_maintenance.instrumentation') as logs:
+            with instrument('report'):
+                list(System.objects.all())
+
+        data = json.loads(logs.records[0].getMessage())
+        self.assertEqual(data['view'], 'report')
+        self.assertEqual(data['queries'], 1)
+        self.assertIn(
+            'system_maintenance_db_queries_total{view="report"} 1',
+            metrics.render())
+
+
+@override_settings(MIDDLEWARE=[
+    'system_maintenance.middleware.InstrumentationMiddleware',
+] + settings.MIDDLEWARE)
+class InstrumentationMiddlewareTest(TestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        populate_test_db()
+        login_sysadmin_user(self)
+        metrics.reset()
+
+    def test_requests_are_recorded_by_url_name(self):
+        url = reverse('system_maintenance:maintenance_record_list')
+        with self.assertLogs('system_maintenance.instrumentation') as logs:
+            self.client.get(url)
+            self.client.get(url)
+
+        data = json.loads(logs.records[0].getMessage())
+        self.assertEqual(
+            data['view'], 'system_maintenance:maintenance_record_list')
+        self.assertEqual(data['status'], 200)
+        self.assertEqual(data['path'], url)
+        self.assertGreater(data['queries'], 0)
+        self.assertGreater(data['template_seconds'], 0)
+        self.assertTrue(data['slowest_queries'])
+
+        response = self.client.get(reverse('system_maintenance:metrics'))
+        self.assertEqual(
+            response['Content-Type'], 'text/plain; version=0.0.4')
+        text = response.content.decode()
+        self.assertIn(
+            'system_maintenance_requests_total{view="system_maintenance:'
+            'maintenance_record_list",status="200"} 2', text)
+        self.assertIn(
+            'system_maintenance_request_duration_seconds_count{view='
+            '"system_maintenance:maintenance_record_list"} 2', text)
+        self.assertIn(
+            '# TYPE system_maintenance_template_duration_seconds_total '
+            'counter', text)
+        self.assertIn('system_maintenance_fragment_cache_hits_total ', text)
+
+    def test_other_apps_are_not_recorded(self):
+        self.client.get(reverse('admin:index'))
+        self.assertNotIn('admin', metrics.render())
+
+
+class MetricsViewTest(TestCase):
+
+    def test_metrics_are_restricted(self):
+        url = reverse('system_maintenance:metrics')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        with mock.patch(
+                'system_maintenance.views.SYSTEM_MAINTENANCE_METRICS_IPS',
+                ['10.0.0.5']):
+            self.assertEqual(
+                self.client.get(url, REMOTE_ADDR='10.0.0.5').status_code, 200)
+            self.assertEqual(
+                self.client.get(url, REMOTE_ADDR='10.0.0.1').status_code, 403)
+
+        populate_test_db()
+        login_sysadmin_user(self)
+        self.assertEqual(
+            self.client.get(url, REMOTE_ADDR='10.0.0.1').status_code, 200)
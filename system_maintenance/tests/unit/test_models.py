@@ -1,9 +1,17 @@
+from importlib import import_module
+from io import StringIO
+from unittest import mock
+
+from django.apps import apps
 from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
 
 from system_maintenance.models import (
-    DocumentationRecord, Hardware, MaintenanceRecord,
-    MaintenanceRecordRelationship, MaintenanceType, Software, SysAdmin, System)
+    DISPLAY_FIELDS, MAINTENANCE_MARKUP_FIELDS, DocumentationRecord, Hardware,
+    MaintenanceRecord, MaintenanceRecordRelationship, MaintenanceType,
+    Software, SysAdmin, System, get_markup_columns)
 from system_maintenance.tests.utilities import populate_test_db
 
 
@@ -24,6 +32,164 @@ class MaintenanceRecordRelationshipTest(TestCase):
             relationship.full_clean()
 
 
+class MaintenanceRecordDisplayColumnsTest(TestCase):
+
+    """
+    Test that the denormalized display columns of maintenance records stay
+    current.
+    """
+
+    def setUp(self):
+        self.db_objects = populate_test_db()
+        self.record = self.db_objects['maintenance_record_1']
+
+    def get_columns(self, record=None):
+        return MaintenanceRecord.objects.values_list(
+            *DISPLAY_FIELDS).get(pk=(record or self.record).pk)
+
+    def expected_label(self):
+        return 'System 1 - Maintenance Type 1 ({})'.format(
+            MaintenanceRecord.objects.get(pk=self.record.pk).datetime.date())
+
+    def test_save_and_m2m_changes(self):
+        self.assertEqual(
+            self.get_columns(), (self.expected_label(), 'Hardware 1', ''))
+
+        hardware = Hardware.objects.create(name='A Hardware')
+        self.record.hardware.add(hardware)
+        self.record.software.add(self.db_objects['software'])
+        self.assertEqual(
+            self.get_columns()[1:], ('A Hardware, Hardware 1', 'Software 1'))
+
+        # The instance was kept current, so saving it doesn't undo the
+        # changes
+        self.record.status = 'Failed'
+        self.record.save()
+        self.assertEqual(
+            self.get_columns()[1:], ('A Hardware, Hardware 1', 'Software 1'))
+
+        self.record.hardware.clear()
+        self.assertEqual(self.get_columns()[1], '')
+
+    def test_reverse_m2m_changes(self):
+        hardware = self.db_objects['hardware']
+        hardware.maintenancerecord_set.add(
+            self.db_objects['maintenance_record_2'])
+        self.assertEqual(
+            self.get_columns(self.db_objects['maintenance_record_2'])[1],
+            'Hardware 1')
+
+        hardware.maintenancerecord_set.clear()
+        self.assertEqual(self.get_columns()[1], '')
+
+    def test_renames_and_deletes(self):
+        system = self.db_objects['system']
+        system.name = 'Renamed'
+        system.save()
+        self.assertTrue(self.get_columns()[0].startswith('Renamed - '))
+
+        hardware = self.db_objects['hardware']
+        hardware.name = 'Renamed Hardware'
+        hardware.save()
+        self.assertEqual(self.get_columns()[1], 'Renamed Hardware')
+
+        hardware.delete()
+        self.assertEqual(self.get_columns()[1], '')
+
+    def test_str_does_not_query(self):
+        expected_label = self.expected_label()
+        record = MaintenanceRecord.objects.get(pk=self.record.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(str(record), expected_label)
+
+    def test_refresh_display_columns(self):
+        MaintenanceRecord.objects.update(
+            display_label='', hardware_names='', software_names='')
+        self.assertEqual(
+            MaintenanceRecord.objects.refresh_display_columns(batch_size=2),
+            3)
+        self.assertEqual(
+            self.get_columns(), (self.expected_label(), 'Hardware 1', ''))
+
+        # Current records aren't written again
+        self.assertEqual(
+            MaintenanceRecord.objects.refresh_display_columns(), 0)
+
+    def test_migration_fills_existing_records(self):
+        migration = import_module(
+            'system_maintenance.migrations.0010_fill_display_columns')
+        MaintenanceRecord.objects.update(
+            display_label='', hardware_names='', software_names='')
+        migration.fill_display_columns(
+            apps, mock.Mock(connection=connection))
+        self.assertEqual(
+            self.get_columns(), (self.expected_label(), 'Hardware 1', ''))
+        self.assertEqual(
+            MaintenanceRecord.objects.refresh_display_columns(), 0)
+
+    def test_rebuild_command(self):
+        MaintenanceRecord.objects.update(hardware_names='')
+        out = StringIO()
+        call_command('rebuild_display_columns', stdout=out)
+        self.assertIn('Updated the display columns of 2 ', out.getvalue())
+        self.assertEqual(self.get_columns()[1], 'Hardware 1')
+
+
+
+class MarkupFieldCreationCounterTest(TestCase):
+
+    """
+    Test that the companion fields markupfield adds for adjacent markup
+    fields don't share creation counters with other fields.
+    """
+
+    def test_concrete_fields_are_ordered_and_unique(self):
+        fields = MaintenanceRecord._meta.concrete_fields
+        counters = [field.creation_counter for field in fields]
+        self.assertEqual(len(set(counters)), len(counters))
+        self.assertEqual(counters, sorted(counters))
+
+        names = [field.name for field in fields]
+        for markup_field in MAINTENANCE_MARKUP_FIELDS:
+            index = names.index(markup_field)
+            self.assertEqual(names[index:index + 3], [
+                markup_field,
+                '{}_markup_type'.format(markup_field),
+                '_{}_rendered'.format(markup_field),
+            ])
+
+    def test_defer_markup_field(self):
+        record = populate_test_db()['maintenance_record_1']
+        deferred = MaintenanceRecord.objects.defer(
+            *get_markup_columns(['procedure'], markup_types=True)).get(
+                pk=record.pk).get_deferred_fields()
+        self.assertEqual(deferred, {
+            'procedure', 'procedure_markup_type', '_procedure_rendered'})
+
+
+class SummariesTest(TestCase):
+
+    def setUp(self):
+        populate_test_db()
+
+    def test_maintenance_record_summaries(self):
+        with self.assertNumQueries(1):
+            records = list(MaintenanceRecord.objects.summaries())
+            for record in records:
+                str(record), record.sys_admin.user, record.hardware_names
+        self.assertEqual(
+            records[0].get_deferred_fields(), set(get_markup_columns(
+                MAINTENANCE_MARKUP_FIELDS, markup_types=True)))
+
+    def test_documentation_record_summaries(self):
+        with self.assertNumQueries(1):
+            records = list(DocumentationRecord.objects.summaries())
+            for record in records:
+                str(record), str(record.maintenance_type)
+        self.assertEqual(
+            records[0].get_deferred_fields(), set(get_markup_columns(
+                ['documentation'], markup_types=True)))
+
 class SaveAndRetrieveTests(TestCase):
 
     """
@@ -0,0 +1,151 @@
+import datetime
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from system_maintenance import views
+from system_maintenance.caching import get_cache
+from system_maintenance.models import DocumentationRecord, MaintenanceRecord
+from system_maintenance.pagination import InvalidCursor, KeysetPaginator
+from system_maintenance.tests.utilities import (
+    add_maintenance_records, login_sysadmin_user, populate_test_db)
+
+
+class KeysetPaginatorTest(TestCase):
+
+    def setUp(self):
+        db_objects = populate_test_db()
+        records = add_maintenance_records(db_objects, 10)
+
+        # Give several records the same datetime to exercise the pk
+        # tie-breaker
+        same_datetime = timezone.now() - datetime.timedelta(days=1)
+        MaintenanceRecord.objects.filter(
+            pk__in=[record.pk for record in records[:5]]
+        ).update(datetime=same_datetime)
+
+        self.expected = list(
+            MaintenanceRecord.objects.order_by('-datetime', 'pk'))
+        self.paginator = KeysetPaginator(
+            MaintenanceRecord.objects.all(), 4, ordering=['-datetime', 'pk'])
+
+    def test_forward_pagination_visits_every_record_once(self):
+        observed = []
+        page = self.paginator.page()
+        self.assertFalse(page.has_previous())
+        while True:
+            observed.extend(page)
+            if not page.has_next():
+                break
+            page = self.paginator.page(page.next_cursor)
+
+        self.assertEqual(observed, self.expected)
+
+    def test_backward_pagination_visits_every_record_once(self):
+        observed = []
+        page = self.paginator.page(self.paginator.encode_cursor(
+            None, backwards=True))
+        self.assertFalse(page.has_next())
+        while True:
+            observed = list(page) + observed
+            if not page.has_previous():
+                break
+            page = self.paginator.page(page.previous_cursor)
+
+        self.assertEqual(observed, self.expected)
+
+    def test_previous_page_of_next_page_is_first_page(self):
+        first_page = self.paginator.page()
+        second_page = self.paginator.page(first_page.next_cursor)
+        self.assertEqual(
+            list(self.paginator.page(second_page.previous_cursor)),
+            list(first_page))
+
+    def test_invalid_cursor(self):
+        for cursor in ['garbage', 'e30', 'eyJiIjogZmFsc2UsICJ2IjogWzFdfQ']:
+            with self.assertRaises(InvalidCursor):
+                self.paginator.page(cursor)
+
+
+class KeysetPaginatedListViewTest(TestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        db_objects = populate_test_db()
+        add_maintenance_records(db_objects, 12)
+        login_sysadmin_user(self)
+        self.url = reverse('system_maintenance:maintenance_record_list')
+
+        patcher = mock.patch.multiple(
+            views.MaintenanceRecordListView,
+            paginate_by=3, pagination='keyset')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_query_count(self, **data):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, data)
+        return response, len(queries)
+
+    def test_deep_page_costs_the_same_as_first_page(self):
+        response, first_page_queries = self.get_query_count()
+        for _ in range(3):
+            cursor = response.context['page_obj'].next_cursor
+            response, queries = self.get_query_count(cursor=cursor)
+            self.assertEqual(queries, first_page_queries)
+
+    def test_keyset_pagination_template(self):
+        response = self.client.get(self.url)
+        self.assertTemplateUsed(
+            response, 'system_maintenance/_keyset_pagination.html')
+        self.assertContains(
+            response, '?cursor={}'.format(
+                response.context['page_obj'].next_cursor))
+        self.assertNotContains(response, '?page=')
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(self.url, {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_offset_pagination_remains_available(self):
+        with mock.patch.object(
+                views.MaintenanceRecordListView, 'pagination', 'offset'):
+            response = self.client.get(self.url, {'page': 2})
+        self.assertTemplateUsed(response, 'system_maintenance/_pagination.html')
+        self.assertContains(response, '2 / 5')
+
+
+class KeysetPaginatedDocumentationRecordListViewTest(TestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        populate_test_db()
+        maintenance_type = DocumentationRecord.objects.first().maintenance_type
+        for i in range(5):
+            DocumentationRecord.objects.create(
+                title='Extra Documentation {}'.format(i),
+                maintenance_type=maintenance_type,
+                documentation='',
+            )
+        login_sysadmin_user(self)
+        self.url = reverse('system_maintenance:documentation_record_list')
+
+    def test_pages_follow_title_order(self):
+        observed = []
+        data = {}
+        with mock.patch.multiple(
+                views.DocumentationRecordListView,
+                paginate_by=2, pagination='keyset'):
+            while True:
+                page = self.client.get(self.url, data).context['page_obj']
+                observed.extend(page)
+                if not page.has_next():
+                    break
+                data = {'cursor': page.next_cursor}
+
+        self.assertEqual(
+            observed, list(DocumentationRecord.objects.order_by('title')))
@@ -0,0 +1,155 @@
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from system_maintenance.caching import get_cache
+from system_maintenance.tests.utilities import (
+    login_sysadmin_user, populate_test_db)
+from system_maintenance.views import get_byte_range, raw_text_response
+
+
+def raw_url(type_of_record, type_of_field, record_pk):
+    return reverse('system_maintenance:raw_view', kwargs={
+        'type_of_record': type_of_record,
+        'type_of_field': type_of_field,
+        'record_pk': record_pk,
+    })
+
+
+class GetByteRangeTest(TestCase):
+
+    def test_ranges(self):
+        self.assertEqual(get_byte_range('bytes=0-9', 100), (0, 10))
+        self.assertEqual(get_byte_range('bytes=90-', 100), (90, 100))
+        self.assertEqual(get_byte_range('bytes=90-200', 100), (90, 100))
+        self.assertEqual(get_byte_range('bytes=-10', 100), (90, 100))
+        self.assertEqual(get_byte_range('bytes=-200', 100), (0, 100))
+
+    def test_ignored_ranges(self):
+        for header in [None, '', 'bytes=-', 'bytes=9-0', 'items=0-9',
+                       'bytes=0-9,20-29']:
+            self.assertIsNone(get_byte_range(header, 100))
+
+    def test_unsatisfiable_ranges(self):
+        for header in ['bytes=100-', 'bytes=100-200', 'bytes=-0']:
+            start, stop = get_byte_range(header, 100)
+            self.assertGreaterEqual(start, 100)
+
+
+class RawViewTest(TestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        self.db_objects = populate_test_db()
+        login_sysadmin_user(self)
+
+        self.record = self.db_objects['maintenance_record_1']
+        self.record.procedure = 'Step ✓\n' * 5000
+        self.record.save()
+        self.content = self.record.procedure.raw.encode('utf-8')
+        self.url = raw_url('maintenance', 'procedure', self.record.pk)
+
+    def get_text(self, **headers):
+        return self.client.get(self.url, {'format': 'text'}, **headers)
+
+    def test_html_page(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'raw procedure | {}'.format(
+            self.record))
+        self.assertContains(response, 'Step ✓')
+
+    def test_html_page_loads_only_needed_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        record_queries = [
+            query['sql'] for query in queries.captured_queries
+            if '"system_maintenance_maintenancerecord"' in query['sql']]
+        # The title doesn't load deferred fields
+        self.assertEqual(len(record_queries), 1)
+        record_query = record_queries[0]
+        self.assertIn('"procedure"', record_query)
+        self.assertNotIn('JOIN', record_query)
+        self.assertNotIn('_procedure_rendered', record_query)
+        self.assertNotIn('"description"', record_query)
+
+    def test_text(self):
+        response = self.get_text()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            response['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(
+            int(response['Content-Length']), len(self.content))
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+
+    def test_text_loads_only_raw_column(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.get_text()
+        record_query = [
+            query['sql'] for query in queries.captured_queries
+            if 'system_maintenance_maintenancerecord' in query['sql']][0]
+        self.assertTrue(record_query.startswith(
+            'SELECT "system_maintenance_maintenancerecord"."procedure" FROM'))
+
+    def test_range(self):
+        response = self.get_text(HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 100-199/{}'.format(
+            len(self.content)))
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(
+            b''.join(response.streaming_content), self.content[100:200])
+
+    def test_suffix_range(self):
+        response = self.get_text(HTTP_RANGE='bytes=-10')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(
+            b''.join(response.streaming_content), self.content[-10:])
+
+    def test_unsatisfiable_range(self):
+        response = self.get_text(HTTP_RANGE='bytes={}-'.format(
+            len(self.content)))
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */{}'.format(
+            len(self.content)))
+
+    def test_if_range(self):
+        etag = self.get_text()['ETag']
+        response = self.get_text(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+
+        response = self.get_text(
+            HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"outdated"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+
+    def test_if_range_without_validators(self):
+        request = RequestFactory().get(
+            '/', HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"outdated"')
+        response = raw_text_response(request, self.content.decode('utf-8'))
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(
+            b''.join(response.streaming_content), self.content[:10])
+
+    def test_documentation(self):
+        documentation = self.db_objects['documentation_record_1']
+        documentation.documentation = 'Some *documentation*'
+        documentation.save()
+        response = self.client.get(
+            raw_url('documentation', 'documentation', documentation.pk),
+            {'format': 'text'})
+        self.assertEqual(
+            b''.join(response.streaming_content), b'Some *documentation*')
+
+    def test_unknown_record_type_field_or_record(self):
+        for url in [
+                raw_url('system', 'description', self.record.pk),
+                raw_url('maintenance', 'documentation', self.record.pk),
+                raw_url('maintenance', '_procedure_rendered', self.record.pk),
+                raw_url('maintenance', 'procedure', 0)]:
+            self.assertEqual(self.client.get(url).status_code, 404)
+            self.assertEqual(
+                self.client.get(url, {'format': 'text'}).status_code, 404)
@@ -0,0 +1,145 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from system_maintenance import fields, rendering
+from system_maintenance.fields import RENDERING_PLACEHOLDER
+from system_maintenance.models import (DocumentationRecord, MaintenanceRecord,
+    RenderJob)
+from system_maintenance.tests.utilities import (
+    login_sysadmin_user, populate_test_db)
+
+
+LARGE_BODY = '*Large* procedure\n\n' + 'x' * 100
+
+
+class AsyncRenderingTest(TestCase):
+
+    def setUp(self):
+        self.db_objects = populate_test_db()
+        self.record = self.db_objects['maintenance_record_1']
+
+    def use_mode(self, mode):
+        """
+        Defer rendering markup of at least 100 characters in `mode`.
+        """
+        for module, values in [
+                (fields, {
+                    'SYSTEM_MAINTENANCE_ASYNC_RENDERING': mode,
+                    'SYSTEM_MAINTENANCE_ASYNC_RENDERING_MIN_SIZE': 100,
+                }),
+                (rendering, {'SYSTEM_MAINTENANCE_ASYNC_RENDERING': mode})]:
+            patcher = mock.patch.multiple(module, **values)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def get_record(self):
+        return MaintenanceRecord.objects.get(pk=self.record.pk)
+
+    def save_large_procedure(self):
+        self.record.procedure = LARGE_BODY
+        self.record.description = 'Small'
+        self.record.save()
+
+    def test_rendering_inline_by_default(self):
+        self.save_large_procedure()
+        self.assertIn('<em>Large</em>', self.get_record().procedure.rendered)
+        self.assertFalse(RenderJob.objects.exists())
+
+    def test_database_queue(self):
+        self.use_mode('database')
+        self.save_large_procedure()
+
+        record = self.get_record()
+        self.assertEqual(record.procedure.rendered, RENDERING_PLACEHOLDER)
+        self.assertEqual(record.description.rendered, '<p>Small</p>\n')
+        job = RenderJob.objects.get()
+        self.assertEqual(
+            (job.record_type, job.record_id, job.field_name),
+            ('maintenance', record.pk, 'procedure'))
+
+        login_sysadmin_user(self)
+        url = reverse('system_maintenance:fragment_view', kwargs={
+            'type_of_record': 'maintenance',
+            'type_of_field': 'procedure',
+            'record_pk': record.pk,
+        })
+        self.assertContains(self.client.get(url), 'Rendering…')
+
+        out = StringIO()
+        call_command('process_render_jobs', stdout=out)
+        self.assertIn('Ran 1 render jobs.', out.getvalue())
+        self.assertFalse(RenderJob.objects.exists())
+        rendered = self.get_record()
+        self.assertIn('<em>Large</em>', rendered.procedure.rendered)
+        self.assertGreater(rendered.updated_at, record.updated_at)
+        self.assertContains(self.client.get(url), '<em>Large</em>')
+
+    def test_sync_mode_renders_right_away(self):
+        self.use_mode('sync')
+        document = DocumentationRecord.objects.create(
+            title='Large', documentation=LARGE_BODY,
+            maintenance_type=self.db_objects['maintenance_type_1'])
+        self.assertIn('<em>Large</em>', document.documentation.rendered)
+        self.assertIn(
+            '<em>Large</em>', DocumentationRecord.objects.get(
+                pk=document.pk).documentation.rendered)
+        self.assertFalse(RenderJob.objects.exists())
+
+    def test_save_while_queued(self):
+        self.use_mode('database')
+        self.save_large_procedure()
+        stale_job = RenderJob.objects.get()
+
+        self.record.procedure = LARGE_BODY.replace('Large', 'Larger')
+        self.record.save()
+
+        # The stale job renders the current markup, but leaves the
+        # requeued job
+        rendering.run_render_job(stale_job)
+        self.assertIn(
+            '<em>Larger</em>', self.get_record().procedure.rendered)
+        self.assertEqual(RenderJob.objects.count(), 1)
+        self.assertEqual(rendering.process_render_jobs(), 1)
+        self.assertFalse(RenderJob.objects.exists())
+
+    def test_failing_jobs_are_retried_then_skipped(self):
+        self.use_mode('database')
+        self.save_large_procedure()
+
+        with mock.patch.object(
+                rendering, 'render_markup', side_effect=ValueError('Bad')):
+            with self.assertLogs('system_maintenance.rendering'):
+                for _ in range(rendering.MAX_RENDER_ATTEMPTS):
+                    self.assertEqual(rendering.process_render_jobs(), 1)
+            self.assertEqual(rendering.process_render_jobs(), 0)
+
+        job = RenderJob.objects.get()
+        self.assertEqual(job.attempts, rendering.MAX_RENDER_ATTEMPTS)
+        self.assertEqual(job.error, 'Bad')
+
+        # Saving the record again requeues its job
+        self.record.save()
+        self.assertEqual(RenderJob.objects.get().attempts, 0)
+
+    def test_deleted_records_lose_their_jobs(self):
+        self.use_mode('database')
+        record = MaintenanceRecord.objects.create(
+            system=self.db_objects['system'],
+            sys_admin=self.db_objects['sysadmin'],
+            maintenance_type=self.db_objects['maintenance_type_1'],
+            problems=LARGE_BODY,
+        )
+        self.assertTrue(RenderJob.objects.exists())
+        record.delete()
+        self.assertFalse(RenderJob.objects.exists())
+
+    def test_bulk_inserts_render_inline(self):
+        self.use_mode('database')
+        with fields.rendering_inline():
+            self.save_large_procedure()
+        self.assertIn('<em>Large</em>', self.get_record().procedure.rendered)
+        self.assertFalse(RenderJob.objects.exists())
@@ -0,0 +1,223 @@
+from io import StringIO
+
+from django.contrib.admin.sites import AdminSite
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from system_maintenance.admin import (DocumentationRecordAdmin,
+    MaintenanceRecordAdmin, MaintenanceRecordRelationshipAdmin)
+from system_maintenance.models import (DocumentationRecord, Hardware,
+    MaintenanceRecord, MaintenanceRecordRelationship)
+from system_maintenance.search import (FallbackSearchBackend, get_backend,
+    get_terms, search, search_filter)
+from system_maintenance.tests.utilities import (
+    login_sysadmin_user, populate_test_db)
+
+
+def hit_ids(hits):
+    return [(hit.record_type, hit.record_id) for hit in hits]
+
+
+class SearchIndexTest(TestCase):
+
+    def setUp(self):
+        self.db_objects = populate_test_db()
+
+        self.record = self.db_objects['maintenance_record_1']
+        self.record.description = 'Replaced the failing power supply.'
+        self.record.save()
+
+        self.documentation = self.db_objects['documentation_record_1']
+        self.documentation.documentation = 'How to replace a power supply.'
+        self.documentation.save()
+
+    def test_search_finds_records_by_markup_text(self):
+        hits = search('power supply')
+        self.assertCountEqual(hit_ids(hits), [
+            ('documentation', self.documentation.pk),
+            ('maintenance', self.record.pk),
+        ])
+
+    def test_search_matches_word_prefixes(self):
+        self.assertEqual(
+            hit_ids(search('suppl', record_types=['maintenance'])),
+            [('maintenance', self.record.pk)])
+
+    def test_search_requires_every_word(self):
+        self.assertEqual(search('power unicorn'), [])
+
+    def test_search_ignores_search_syntax(self):
+        self.assertEqual(get_terms('"power" AND (supply*'), [
+            'power', 'AND', 'supply'])
+        self.assertEqual(search('"(*'), [])
+
+    def test_title_matches_rank_above_body_matches(self):
+        other = self.db_objects['documentation_record_2']
+        other.title = 'Power supply replacement'
+        other.save()
+
+        # Unrelated documents give the search terms meaningful weight
+        for i in range(5):
+            DocumentationRecord.objects.create(
+                title='Unrelated {}'.format(i),
+                maintenance_type=self.documentation.maintenance_type,
+                documentation='Nothing to see here.',
+            )
+
+        hits = search('power supply', record_types=['documentation'])
+        self.assertEqual(hit_ids(hits), [
+            ('documentation', other.pk),
+            ('documentation', self.documentation.pk),
+        ])
+
+    def test_search_finds_related_names(self):
+        self.assertCountEqual(
+            hit_ids(search('Hardware', record_types=['maintenance'])), [
+                ('maintenance', self.db_objects['maintenance_record_1'].pk),
+                ('maintenance', self.db_objects['maintenance_record_3'].pk),
+            ])
+
+    def test_renaming_related_object_reindexes_records(self):
+        hardware = self.db_objects['hardware']
+        hardware.name = 'Oscilloscope'
+        hardware.save()
+
+        self.assertEqual(len(search('Oscilloscope')), 2)
+
+    def test_m2m_changes_reindex_records(self):
+        hardware = Hardware.objects.create(name='Tachometer')
+        self.record.hardware.add(hardware)
+        self.assertEqual(
+            hit_ids(search('Tachometer')), [('maintenance', self.record.pk)])
+
+        self.record.hardware.remove(hardware)
+        self.assertEqual(search('Tachometer'), [])
+
+        hardware.maintenancerecord_set.add(self.record)
+        self.assertEqual(len(search('Tachometer')), 1)
+
+        hardware.maintenancerecord_set.clear()
+        self.assertEqual(search('Tachometer'), [])
+
+    def test_deleted_records_are_removed_from_index(self):
+        self.documentation.maintenance_records.clear()
+        self.documentation.delete()
+        MaintenanceRecord.objects.filter(pk=self.record.pk).delete()
+        self.assertEqual(search('power supply'), [])
+
+    def test_rebuild_search_index_command(self):
+        get_backend().clear()
+        self.assertEqual(search('power supply'), [])
+
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('maintenance records: 3', out.getvalue())
+        self.assertEqual(len(search('power supply')), 2)
+
+
+class FallbackSearchBackendTest(TestCase):
+
+    def setUp(self):
+        self.db_objects = populate_test_db()
+        self.backend = FallbackSearchBackend()
+
+    def test_search(self):
+        hits = self.backend.search('maintenance', ['hardware'], 10)
+        self.assertCountEqual(hit_ids(hits), [
+            ('maintenance', self.db_objects['maintenance_record_1'].pk),
+            ('maintenance', self.db_objects['maintenance_record_3'].pk),
+        ])
+
+    def test_filter(self):
+        records = MaintenanceRecord.objects.filter(
+            self.backend.filter('maintenance', ['software', '1'], 'pk'))
+        self.assertCountEqual(records, [
+            self.db_objects['maintenance_record_2'],
+            self.db_objects['maintenance_record_3'],
+        ])
+
+
+class AdminSearchTest(TestCase):
+
+    def setUp(self):
+        self.db_objects = populate_test_db()
+        self.request = RequestFactory().get('/')
+        self.site = AdminSite()
+
+        record = self.db_objects['maintenance_record_2']
+        record.problems = 'Kernel panic after upgrade'
+        record.save()
+
+    def get_search_results(self, model_admin_class, model, search_term):
+        model_admin = model_admin_class(model, self.site)
+        queryset, use_distinct = model_admin.get_search_results(
+            self.request, model.objects.all(), search_term)
+        self.assertFalse(use_distinct)
+        return list(queryset)
+
+    def test_maintenance_record_admin_search(self):
+        self.assertEqual(
+            self.get_search_results(
+                MaintenanceRecordAdmin, MaintenanceRecord, 'kernel panic'),
+            [self.db_objects['maintenance_record_2']])
+
+    def test_documentation_record_admin_search(self):
+        self.assertEqual(
+            self.get_search_results(
+                DocumentationRecordAdmin, DocumentationRecord,
+                'Documentation 2'),
+            [self.db_objects['documentation_record_2']])
+
+    def test_relationship_admin_search_matches_either_record(self):
+        relationship = MaintenanceRecordRelationship.objects.get()
+        for search_term in ['kernel', 'hardware 1']:
+            self.assertEqual(
+                self.get_search_results(
+                    MaintenanceRecordRelationshipAdmin,
+                    MaintenanceRecordRelationship, search_term),
+                [relationship])
+
+    def test_search_term_without_words_matches_nothing(self):
+        self.assertEqual(
+            list(MaintenanceRecord.objects.filter(
+                search_filter('maintenance', '!!!'))),
+            [])
+
+
+class SearchViewTest(TestCase):
+
+    def setUp(self):
+        self.db_objects = populate_test_db()
+        login_sysadmin_user(self)
+        self.url = reverse('system_maintenance:search')
+
+    def test_search_view_lists_ranked_results(self):
+        response = self.client.get(self.url, {'q': 'Maintenance Type 1'})
+        self.assertTemplateUsed(
+            response, 'system_maintenance/search_results.html')
+        self.assertEqual(
+            [
+                (record_type, record.pk)
+                for record_type, record in response.context['results']
+            ],
+            hit_ids(search('Maintenance Type 1')))
+        self.assertEqual(len(response.context['results']), 4)
+
+    def test_search_view_filters_by_record_type(self):
+        response = self.client.get(
+            self.url, {'q': 'Maintenance Type', 'type': 'maintenance'})
+        self.assertEqual(len(response.context['results']), 3)
+        self.assertTrue(all(
+            record_type == 'maintenance'
+            for record_type, record in response.context['results']))
+
+    def test_search_view_without_query(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['results'], [])
+        self.assertNotContains(response, 'No records match')
+
+    def test_search_view_without_results(self):
+        response = self.client.get(self.url, {'q': 'unicorn'})
+        self.assertContains(response, 'No records match')
@@ -1,15 +1,25 @@
 import re
+import time
+from unittest import mock
 
 from django.contrib.auth import views as auth_views
+from django.contrib.auth.models import User
 from django.urls import resolve, reverse
+from django.db import connection
 from django.template.loader import render_to_string
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from system_maintenance import views
-from system_maintenance.models import DocumentationRecord, MaintenanceRecord
+from system_maintenance.app_settings import (
+    SYSTEM_MAINTENANCE_SYSADMIN_SESSION_TTL)
+from system_maintenance.caching import bump_model_versions, get_cache
+from system_maintenance.models import (
+    MAINTENANCE_MARKUP_FIELDS, DocumentationRecord, MaintenanceRecord,
+    MaintenanceRecordRelationship, SysAdmin, get_markup_columns)
 from system_maintenance.tests.utilities import (
-    CustomAssertions, login_normal_user, login_sysadmin_superuser,
-    login_sysadmin_user, populate_test_db)
+    CustomAssertions, add_maintenance_records, login_normal_user,
+    login_sysadmin_superuser, login_sysadmin_user, populate_test_db)
 
 
 class CommonViewTests:
@@ -128,6 +138,66 @@ class RedirectNonSysAdminUserToAuthenticationTest(TestCase, CustomAssertions):
             'system_maintenance:documentation_record_list')
 
 
+class SysAdminRoleCacheTest(TestCase):
+
+    """
+    Test that the sysadmin role is remembered in the session at login and
+    looked up again after sysadmins change.
+    """
+
+    def setUp(self):
+        get_cache().clear()
+        populate_test_db()
+        self.user = User.objects.get(username='nonsysadmin')
+        self.url = reverse('system_maintenance:documentation_record_list')
+
+    def get_response(self):
+        """
+        Return the status code and the number of sysadmin queries of a
+        request.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        sysadmin_queries = [
+            query for query in queries.captured_queries
+            if SysAdmin._meta.db_table in query['sql']]
+        return response.status_code, len(sysadmin_queries)
+
+    def test_role_is_cached_at_login(self):
+        login_sysadmin_user(self)
+        self.assertEqual(self.get_response(), (200, 0))
+        self.assertEqual(self.get_response(), (200, 0))
+
+    def test_new_sysadmin_is_allowed(self):
+        login_normal_user(self)
+        self.assertEqual(self.get_response(), (302, 0))
+
+        sysadmin = SysAdmin.objects.create(user=self.user)
+        # Normally bumped when the transaction commits
+        bump_model_versions([SysAdmin])
+        self.assertEqual(self.get_response(), (200, 1))
+        self.assertEqual(self.get_response(), (200, 0))
+
+        sysadmin.delete()
+        bump_model_versions([SysAdmin])
+        self.assertEqual(self.get_response(), (302, 1))
+
+    def test_revoked_sysadmin_is_rechecked_without_version_bump(self):
+        sysadmin = SysAdmin.objects.create(user=self.user)
+        login_normal_user(self)
+        self.assertEqual(self.get_response(), (200, 0))
+
+        # E.g., the version bump went to another process's local cache
+        sysadmin.delete()
+        self.assertEqual(self.get_response(), (200, 0))
+
+        # Only the session entry ages, not the cached SysAdmin version
+        with mock.patch('system_maintenance.views.time') as mock_time:
+            mock_time.time.return_value = \
+                time.time() + SYSTEM_MAINTENANCE_SYSADMIN_SESSION_TTL
+            self.assertEqual(self.get_response(), (302, 1))
+
+
 class AuthenticationViewTest(TestCase, CommonViewTests):
 
     def setUp(self):
@@ -219,6 +289,7 @@ class HomeViewTest(TestCase, CommonViewTests):
 class DocumentationRecordListViewTest(TestCase, CommonViewTests):
 
     def setUp(self):
+        get_cache().clear()
         populate_test_db()
         login_sysadmin_user(self)
 
@@ -238,6 +309,7 @@ class DocumentationRecordListViewTest(TestCase, CommonViewTests):
 class MaintenanceRecordListViewTest(TestCase, CommonViewTests):
 
     def setUp(self):
+        get_cache().clear()
         populate_test_db()
         login_sysadmin_user(self)
 
@@ -252,3 +324,271 @@ class MaintenanceRecordListViewTest(TestCase, CommonViewTests):
         self.context = {
             'object_list': MaintenanceRecord.objects.all(),
         }
+
+
+class MaintenanceRecordListViewQueryCountTest(TestCase):
+
+    """
+    Test that a page of maintenance records costs a constant number of
+    queries, regardless of the page size.
+
+    The expected queries are: session, user and records (with system,
+    maintenance type and sysadmin joined). Hardware and software are listed
+    from denormalized columns.
+    """
+
+    expected_queries = 3
+    pagination = 'keyset'
+
+    def setUp(self):
+        get_cache().clear()
+        db_objects = populate_test_db()
+        add_maintenance_records(db_objects, 25)
+        login_sysadmin_user(self)
+        self.url = reverse('system_maintenance:maintenance_record_list')
+
+    def assertPageQueries(self, paginate_by):
+        with mock.patch.multiple(
+                views.MaintenanceRecordListView,
+                paginate_by=paginate_by, pagination=self.pagination):
+            with self.assertNumQueries(self.expected_queries):
+                response = self.client.get(self.url)
+        self.assertEqual(len(response.context['object_list']), paginate_by)
+
+    def test_small_page_query_count(self):
+        self.assertPageQueries(2)
+
+    def test_large_page_query_count(self):
+        self.assertPageQueries(25)
+
+
+class OffsetMaintenanceRecordListViewQueryCountTest(
+        MaintenanceRecordListViewQueryCountTest):
+
+    """
+    Offset pagination costs one extra query to count the records.
+    """
+
+    expected_queries = 4
+    pagination = 'offset'
+
+
+class RelatedRecordsQueryCountTest(TestCase):
+
+    """
+    Test that the related-records panels of detail pages render their
+    maintenance record list items without per-row queries.
+    """
+
+    def setUp(self):
+        self.db_objects = populate_test_db()
+        login_sysadmin_user(self)
+
+    def get_query_count(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        return len(queries)
+
+    def test_documentation_record_detail_query_count(self):
+        documentation = self.db_objects['documentation_record_1']
+        url = reverse(
+            'system_maintenance:documentation_record_detail',
+            args=[documentation.pk])
+        baseline = self.get_query_count(url)
+
+        add_maintenance_records(self.db_objects, 10)
+        self.assertEqual(self.get_query_count(url), baseline)
+
+    def test_maintenance_record_detail_query_count(self):
+        record = self.db_objects['maintenance_record_1']
+        url = reverse(
+            'system_maintenance:maintenance_record_detail', args=[record.pk])
+        baseline = self.get_query_count(url)
+
+        for referencing_record in add_maintenance_records(
+                self.db_objects, 10):
+            MaintenanceRecordRelationship.objects.create(
+                referenced_record=record,
+                referencing_record=referencing_record,
+            )
+        self.assertEqual(self.get_query_count(url), baseline)
+
+
+
+class ListColumnsTest(TestCase, CustomAssertions):
+
+    """
+    Test that pages listing records load only their summaries, without
+    their markup columns.
+    """
+
+    def setUp(self):
+        get_cache().clear()
+        self.db_objects = populate_test_db()
+        login_sysadmin_user(self)
+
+    def test_maintenance_record_list(self):
+        self.assertNoMarkupColumnsSelected(
+            reverse('system_maintenance:maintenance_record_list'))
+
+    def test_documentation_record_list(self):
+        self.assertNoMarkupColumnsSelected(
+            reverse('system_maintenance:documentation_record_list'))
+
+    def test_maintenance_record_chain(self):
+        self.assertNoMarkupColumnsSelected(reverse(
+            'system_maintenance:maintenance_record_chain',
+            args=[self.db_objects['maintenance_record_2'].pk]))
+
+    def test_search_results(self):
+        self.assertNoMarkupColumnsSelected(
+            reverse('system_maintenance:search') + '?q=System')
+
+class MaintenanceRecordDetailViewQueryCountTest(TestCase):
+
+    """
+    Test that a maintenance record detail page costs a fixed number of
+    queries once every relation is populated.
+
+    The expected queries are: session, user, record (with relation counts
+    annotated), hardware, software, documentation records, and referenced
+    and referencing records.
+    """
+
+    expected_queries = 8
+
+    def setUp(self):
+        self.db_objects = populate_test_db()
+        login_sysadmin_user(self)
+
+        self.record = self.db_objects['maintenance_record_2']
+        self.record.hardware.add(self.db_objects['hardware'])
+        MaintenanceRecordRelationship.objects.create(
+            referenced_record=self.record,
+            referencing_record=self.db_objects['maintenance_record_3'],
+        )
+        self.url = reverse(
+            'system_maintenance:maintenance_record_detail',
+            args=[self.record.pk])
+
+    def test_detail_query_count(self):
+        with self.assertNumQueries(self.expected_queries):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_detail_query_count_with_more_relations(self):
+        for record in add_maintenance_records(self.db_objects, 5):
+            record.documentation_records.add(
+                self.db_objects['documentation_record_2'])
+            MaintenanceRecordRelationship.objects.create(
+                referenced_record=record,
+                referencing_record=self.record,
+            )
+            MaintenanceRecordRelationship.objects.create(
+                referenced_record=self.record,
+                referencing_record=record,
+            )
+
+        with self.assertNumQueries(self.expected_queries):
+            self.client.get(self.url)
+
+    def test_detail_relation_counts(self):
+        response = self.client.get(self.url)
+        record = response.context['object']
+
+        self.assertEqual(record.hardware_count, 1)
+        self.assertEqual(record.software_count, 1)
+        self.assertEqual(record.documentation_record_count, 2)
+        self.assertEqual(record.referenced_record_count, 1)
+        self.assertEqual(record.referencing_record_count, 1)
+
+
+class LazyPanelsTest(TestCase):
+
+    """
+    Test that maintenance record detail pages leave the bodies of their
+    markup panels and related documents to be loaded from fragment URLs,
+    unless every panel is inlined with `?panels=all`.
+    """
+
+    def setUp(self):
+        self.db_objects = populate_test_db()
+        login_sysadmin_user(self)
+
+        self.record = self.db_objects['maintenance_record_2']
+        self.record.procedure = 'Long *procedure*'
+        self.record.save()
+        self.documentation = self.db_objects['documentation_record_1']
+        self.documentation.documentation = 'Long *runbook*'
+        self.documentation.save()
+        self.url = reverse(
+            'system_maintenance:maintenance_record_detail',
+            args=[self.record.pk])
+
+    def fragment_url(self, type_of_record, type_of_field, record_pk):
+        return reverse('system_maintenance:fragment_view', kwargs={
+            'type_of_record': type_of_record,
+            'type_of_field': type_of_field,
+            'record_pk': record_pk,
+        })
+
+    def test_bodies_are_loaded_later(self):
+        response = self.client.get(self.url)
+
+        self.assertContains(response, 'href="#procedure"')
+        self.assertContains(response, 'data-fragment-url="{}"'.format(
+            self.fragment_url('maintenance', 'procedure', self.record.pk)))
+        self.assertContains(response, 'data-fragment-url="{}"'.format(
+            self.fragment_url(
+                'documentation', 'documentation', self.documentation.pk)))
+        self.assertContains(response, 'href="?panels=all#procedure"')
+        self.assertNotContains(response, '<em>procedure</em>')
+        self.assertNotContains(response, '<em>runbook</em>')
+
+        # Only the markup types of the records' markup fields are loaded
+        record = response.context['object']
+        self.assertLessEqual(
+            set(get_markup_columns(MAINTENANCE_MARKUP_FIELDS)),
+            record.get_deferred_fields())
+        for documentation in record.documentation_records.all():
+            self.assertEqual(
+                documentation.get_deferred_fields(),
+                {'documentation', '_documentation_rendered'})
+
+        # Related records are listed from their summaries
+        for related_record in record.referenced_records.all():
+            self.assertLessEqual(
+                set(get_markup_columns(
+                    MAINTENANCE_MARKUP_FIELDS, markup_types=True)),
+                related_record.get_deferred_fields())
+
+    def test_panels_all_inlines_bodies(self):
+        response = self.client.get(self.url, {'panels': 'all'})
+        self.assertContains(response, '<em>procedure</em>')
+        self.assertContains(response, '<em>runbook</em>')
+        self.assertNotContains(response, 'data-fragment-url')
+
+    def test_fragments(self):
+        response = self.client.get(
+            self.fragment_url('maintenance', 'procedure', self.record.pk))
+        self.assertEqual(
+            response.content.decode(), '<p>Long <em>procedure</em></p>\n')
+
+        response = self.client.get(self.fragment_url(
+            'documentation', 'documentation', self.documentation.pk))
+        self.assertEqual(
+            response.content.decode(), '<p>Long <em>runbook</em></p>\n')
+
+    def test_unknown_fragments(self):
+        for args in [('maintenance', 'status', self.record.pk),
+                     ('system', 'procedure', self.record.pk),
+                     ('maintenance', 'procedure', 0)]:
+            response = self.client.get(self.fragment_url(*args))
+            self.assertEqual(response.status_code, 404)
+
+    def test_fragments_require_sysadmin(self):
+        self.client.logout()
+        login_normal_user(self)
+        response = self.client.get(
+            self.fragment_url('maintenance', 'procedure', self.record.pk))
+        self.assertEqual(response.status_code, 302)
@@ -1,9 +1,23 @@
+import re
+
 from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from system_maintenance.models import (
-    DocumentationRecord, Hardware, MaintenanceRecord,
-    MaintenanceRecordRelationship, MaintenanceType, Software, SysAdmin, System)
+    MAINTENANCE_MARKUP_FIELDS, DocumentationRecord, Hardware,
+    MaintenanceRecord, MaintenanceRecordRelationship, MaintenanceType,
+    Software, SysAdmin, System, get_markup_columns)
+
+
+# A markup column of a maintenance or documentation record's table (or of a
+# table alias, for records joined more than once) in SQL
+MARKUP_COLUMN_REGEX = re.compile(r'"({}|{}|T\d+)"\."({})"'.format(
+    MaintenanceRecord._meta.db_table,
+    DocumentationRecord._meta.db_table,
+    '|'.join(get_markup_columns(
+        MAINTENANCE_MARKUP_FIELDS + ['documentation'], markup_types=True))))
 
 
 class CustomAssertions:
@@ -30,6 +44,18 @@ class CustomAssertions:
         response = self.client.get(url)
         self.assertRedirects(response, '{}?next={}'.format(auth_url, url))
 
+    def assertNoMarkupColumnsSelected(self, url):
+        """
+        Get a URL and test that none of its queries select a column of a
+        maintenance or documentation record's markup fields.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        for query in queries:
+            self.assertIsNone(
+                MARKUP_COLUMN_REGEX.search(query['sql']), query['sql'])
+
 
 def populate_test_db():
     """
@@ -122,6 +148,31 @@ def populate_test_db():
     return db_objects
 
 
+def add_maintenance_records(db_objects, count):
+    """
+    Add `count` maintenance records (each with hardware, software and
+    documentation) to a database populated by `populate_test_db()`.
+    Returns a list of the saved records.
+    """
+    records = []
+    for i in range(count):
+        record = MaintenanceRecord.objects.create(
+            system=db_objects['system'],
+            sys_admin=db_objects['sysadmin'],
+            maintenance_type=db_objects['maintenance_type_1'],
+            description='Bulk record {}'.format(i),
+            procedure='',
+            problems='',
+        )
+        record.hardware.add(db_objects['hardware'])
+        record.software.add(db_objects['software'])
+        record.documentation_records.add(
+            db_objects['documentation_record_1'])
+        records.append(record)
+
+    return records
+
+
 def login_normal_user(self):
     """
     Login as a normal user.
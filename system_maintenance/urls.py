@@ -1,18 +1,28 @@
 from django.urls import path
 from django.contrib.auth import views as auth_views
 
-from . import views
+from . import api, views
 
 
 app_name = 'system_maintenance'
 
 urlpatterns = [
     path('', views.system_maintenance_home_view, name='system_maintenance_home_view'),
+    path('activity/', views.activity_trend_view, name='activity_trend'),
+    path('activity/json/', views.activity_trend_json_view, name='activity_trend_json'),
+    path('api/', api.index_view, name='api_index'),
+    path('api/<slug:resource_name>/', api.resource_view, name='api_resource'),
     path('authentication/', auth_views.LoginView.as_view(template_name='system_maintenance/authentication.html'), name='authentication'),
     path('documentation/', views.DocumentationRecordListView.as_view(), name='documentation_record_list'),
     path('documentation/<int:pk>/', views.DocumentationRecordDetailView.as_view(), name='documentation_record_detail'),
+    path('fragment/<type_of_record>/<type_of_field>/<int:record_pk>/', views.fragment_view, name='fragment_view'),
     path('logout/', auth_views.LogoutView.as_view(next_page='/system_maintenance/'), name='logout'),
+    path('metrics/', views.metrics_view, name='metrics'),
     path('raw/<type_of_record>/<type_of_field>/<int:record_pk>/', views.raw_view, name='raw_view'),
     path('records/', views.MaintenanceRecordListView.as_view(), name='maintenance_record_list'),
     path('records/<int:pk>/', views.MaintenanceRecordDetailView.as_view(), name='maintenance_record_detail'),
+    path('records/<int:pk>/chain/', views.maintenance_record_chain_view, name='maintenance_record_chain'),
+    path('records/<int:pk>/chain/json/', views.maintenance_record_chain_json_view, name='maintenance_record_chain_json'),
+    path('records/export/', views.export_view, name='maintenance_record_export'),
+    path('search/', views.search_view, name='search'),
 ]
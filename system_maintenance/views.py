@@ -1,12 +1,57 @@
-from django.contrib.auth.decorators import user_passes_test
-from django.urls import reverse_lazy
-from django.shortcuts import render
+import datetime
+import hashlib
+import re
+import time
+from functools import wraps
+
+from django.contrib.auth.views import redirect_to_login
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+from django.forms.forms import pretty_name
+from django.http import (Http404, HttpResponse, HttpResponseForbidden,
+    JsonResponse, StreamingHttpResponse)
+from django.urls import reverse
+from django.shortcuts import get_object_or_404, render
+from django.utils import timezone
+from django.utils.timezone import get_current_timezone_name
 from django.utils.decorators import method_decorator
+from django.utils.http import quote_etag
+from django.utils.translation import get_language
+from django.views.decorators.http import condition
 from django.views.generic import DetailView, ListView
 
-from .app_settings import SYSTEM_MAINTENANCE_PAGINATE_BY
-from .models import (DocumentationRecord, Hardware, MaintenanceRecord,
-    MaintenanceType, Software, SysAdmin, System)
+from .app_settings import (SYSTEM_MAINTENANCE_CHAIN_MAX_DEPTH,
+    SYSTEM_MAINTENANCE_METRICS_IPS, SYSTEM_MAINTENANCE_PAGINATE_BY,
+    SYSTEM_MAINTENANCE_PAGINATION, SYSTEM_MAINTENANCE_SYSADMIN_SESSION_TTL)
+from .caching import (DASHBOARD_COUNT_MODELS, VERSIONED_MODELS,
+    get_dashboard_counts, get_model_versions, get_versioned_fragment)
+from .export import EXPORT_FORMATS, export_response
+from .activity import INTERVALS, TREND_GROUPS, get_activity_trend
+from .forms import ActivityTrendForm, MaintenanceRecordFilterForm
+from .graph import DIRECTIONS, get_record_chain
+from .instrumentation import metrics
+from .models import (MAINTENANCE_MARKUP_FIELDS, DocumentationRecord,
+    MaintenanceRecord, MaintenanceType, SysAdmin, System, get_markup_columns)
+from .pagination import InvalidCursor, KeysetPaginator
+from .search import search
+
+
+RAW_CHUNK_SIZE = 8192
+
+# Markup fields shown by `raw_view`, and the (local) fields each record's
+# title is loaded from
+RAW_FIELDS = {
+    'documentation': (DocumentationRecord, ['documentation'], ['title']),
+    'maintenance': (
+        MaintenanceRecord,
+        MAINTENANCE_MARKUP_FIELDS,
+        ['display_label'],
+    ),
+}
+
+# Session key of the user's cached sysadmin role
+SYSADMIN_SESSION_KEY = '_system_maintenance_sysadmin'
 
 
 def sysadmin_check(user):
@@ -17,79 +62,629 @@ def sysadmin_check(user):
     return user.is_active and hasattr(user, 'sysadmin')
 
 
+def session_sysadmin_check(session, user):
+    """
+    Check whether user is a sysadmin and has an active account, like
+    `sysadmin_check`, but remember the sysadmin role in the user's session.
+    The role is looked up again after any `SysAdmin` is saved or deleted,
+    and once it's older than `SYSTEM_MAINTENANCE_SYSADMIN_SESSION_TTL`
+    seconds (in case the version bump didn't reach this process's cache).
+    """
+    if not user.is_active:
+        return False
+
+    now = time.time()
+    version = get_model_versions([SysAdmin])[0]
+    cached = session.get(SYSADMIN_SESSION_KEY)
+    if cached and len(cached) == 4 and cached[0] == user.pk and \
+            cached[2] == version and \
+            now - cached[3] < SYSTEM_MAINTENANCE_SYSADMIN_SESSION_TTL:
+        return cached[1]
+
+    is_sysadmin = SysAdmin.objects.filter(user=user.pk).exists()
+    session[SYSADMIN_SESSION_KEY] = [user.pk, is_sysadmin, version, now]
+    return is_sysadmin
+
+
+def request_sysadmin_check(request):
+    """
+    Check whether the request's user is a sysadmin and has an active
+    account, using the session's cached role if there is a session.
+    """
+    session = getattr(request, 'session', None)
+    if session is None:
+        return sysadmin_check(request.user)
+    return session_sysadmin_check(session, request.user)
+
+
+def sysadmin_required(view):
+    """
+    Decorate a view to redirect users who aren't active sysadmins to the
+    System Maintenance authentication page.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request_sysadmin_check(request):
+            return view(request, *args, **kwargs)
+        return redirect_to_login(
+            request.get_full_path(),
+            reverse('system_maintenance:authentication'))
+    return wrapper
+
+
+def get_pagination_query(request):
+    """
+    Return the request's query string without pagination parameters, ready
+    to be prefixed to a 'page' or 'cursor' parameter.
+    """
+    query = request.GET.copy()
+    for param in ['cursor', 'page']:
+        query.pop(param, None)
+    return '{}&'.format(query.urlencode()) if query else ''
+
+
+def get_record_chain_or_404(request, pk):
+    """
+    Return the `RecordChain` of a maintenance record, following the
+    request's `depth` and `direction` parameters.
+    """
+    try:
+        depth = int(request.GET.get(
+            'depth', SYSTEM_MAINTENANCE_CHAIN_MAX_DEPTH))
+    except ValueError:
+        raise Http404('Invalid depth.')
+    if not 1 <= depth <= SYSTEM_MAINTENANCE_CHAIN_MAX_DEPTH:
+        raise Http404('Invalid depth.')
+
+    direction = request.GET.get('direction', 'both')
+    if direction not in DIRECTIONS:
+        raise Http404('Invalid direction.')
+
+    chain = get_record_chain(pk, depth, direction)
+    return chain, depth, direction
+
+
+def get_activity_trend_or_404(request):
+    """
+    Return the `ActivityTrend` following the request's parameters, and the
+    form that validated them.
+    """
+    form = ActivityTrendForm(request.GET)
+    if not form.is_valid():
+        raise Http404('Invalid trend parameters.')
+
+    trend = get_activity_trend(
+        form.cleaned_data['start'],
+        form.cleaned_data['end'],
+        interval=form.cleaned_data['interval'],
+        group_by=form.cleaned_data['group_by'],
+        filters=form.get_filters(),
+    )
+    return trend, form
+
+
+def get_validators(request, models):
+    """
+    Return an `(etag, last_modified)` tuple for a page built from `models`,
+    based on the models' version timestamps and on who is viewing it.
+    """
+    versions = get_model_versions(models)
+    key = ':'.join([
+        str(request.user.pk),
+        str(request.user.is_staff),
+        get_language() or '',
+    ] + [repr(version) for version in versions])
+    etag = hashlib.md5(key.encode()).hexdigest()
+    last_modified = datetime.datetime.fromtimestamp(
+        max(versions), tz=timezone.utc)
+    return etag, last_modified
+
+
+def versioned_condition(models):
+    """
+    Decorate a view to answer conditional GET requests (`If-None-Match` and
+    `If-Modified-Since`) with 304 Not Modified, unless one of `models` has
+    changed. The view itself doesn't run for a 304.
+    """
+    def get_request_validators(request):
+        # Computed once per request, for both the ETag and Last-Modified
+        if not hasattr(request, '_system_maintenance_validators'):
+            request._system_maintenance_validators = get_validators(
+                request, models)
+        return request._system_maintenance_validators
+
+    def etag(request, *args, **kwargs):
+        return get_request_validators(request)[0]
+
+    def last_modified(request, *args, **kwargs):
+        return get_request_validators(request)[1]
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+class ConditionalGetMixin(object):
+    """
+    Answers conditional GET requests with 304 Not Modified, unless one of
+    `condition_models` has changed. Place after `SysAdminRequiredMixin`.
+    """
+
+    condition_models = VERSIONED_MODELS
+
+    def dispatch(self, *args, **kwargs):
+        view = versioned_condition(self.condition_models)(super().dispatch)
+        return view(*args, **kwargs)
+
+
+class VersionedPageCacheMixin(object):
+    """
+    Caches rendered pages until one of `condition_models` changes. Pages
+    vary by URL (including the query string), by whether the user is staff
+    and by the active language and time zone. Place after
+    `ConditionalGetMixin`.
+    """
+
+    condition_models = VERSIONED_MODELS
+
+    def get(self, request, *args, **kwargs):
+        def render():
+            response = super(VersionedPageCacheMixin, self).get(
+                request, *args, **kwargs)
+            return response.render().content
+
+        return HttpResponse(get_versioned_fragment(
+            'page', self.condition_models, render, [
+                request.get_full_path(),
+                request.user.is_staff,
+                get_language(),
+                get_current_timezone_name(),
+            ]))
+
+
 class SysAdminRequiredMixin(object):
     """
     Checks whether user is a sysadmin and has an active account.
     """
 
-    @method_decorator(user_passes_test(
-        sysadmin_check,
-        login_url=reverse_lazy('system_maintenance:authentication')))
+    @method_decorator(sysadmin_required)
     def dispatch(self, *args, **kwargs):
         return super(SysAdminRequiredMixin, self).dispatch(*args, **kwargs)
 
 
-@user_passes_test(
-    sysadmin_check,
-    login_url=reverse_lazy('system_maintenance:authentication'))
-def raw_view(request, **kwargs):
-    if kwargs['type_of_record'] == 'documentation':
-        record = DocumentationRecord.objects.get(pk=kwargs['record_pk'])
-    elif kwargs['type_of_record'] == 'maintenance':
-        record = MaintenanceRecord.objects.get(pk=kwargs['record_pk'])
+class KeysetPaginationMixin(object):
+    """
+    Paginates a `ListView` with cursors over `keyset_ordering` instead of
+    page numbers, unless `pagination` is 'offset'.
+    """
+
+    keyset_ordering = None
+    pagination = SYSTEM_MAINTENANCE_PAGINATION
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.pagination == 'offset':
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = KeysetPaginator(
+            queryset, page_size, ordering=self.keyset_ordering)
+        try:
+            page = paginator.page(self.request.GET.get('cursor'))
+        except InvalidCursor:
+            raise Http404('Invalid cursor.')
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['pagination_query'] = get_pagination_query(self.request)
+        return context
+
+
+# Trends are read from the rollup, which changes along with these
+ACTIVITY_TREND_MODELS = [MaintenanceRecord, MaintenanceType, System]
+
+
+@sysadmin_required
+@versioned_condition(ACTIVITY_TREND_MODELS)
+def activity_trend_view(request):
+    trend, form = get_activity_trend_or_404(request)
+    query = request.GET.copy()
+    query.pop('group_by', None)
+    query.pop('interval', None)
+
+    context = {
+        'active_filters': form.get_active_filters(),
+        'end': form.cleaned_data['end'],
+        'group_by': form.cleaned_data['group_by'],
+        'group_choices': [
+            (group, pretty_name(group)) for group in sorted(TREND_GROUPS)],
+        'interval': form.cleaned_data['interval'],
+        'interval_choices': INTERVALS,
+        'query': query.urlencode(),
+        'rows': [
+            (period, [counts[i] for label, counts in trend.series],
+             trend.totals[i])
+            for i, period in enumerate(trend.periods)],
+        'start': form.cleaned_data['start'],
+        'trend': trend,
+    }
+    return render(
+        request, 'system_maintenance/activity_trend.html', context)
+
+
+@sysadmin_required
+@versioned_condition(ACTIVITY_TREND_MODELS)
+def activity_trend_json_view(request):
+    trend, form = get_activity_trend_or_404(request)
+    return JsonResponse({
+        'start': form.cleaned_data['start'],
+        'end': form.cleaned_data['end'],
+        'group_by': form.cleaned_data['group_by'],
+        'interval': form.cleaned_data['interval'],
+        'periods': trend.periods,
+        'series': [
+            {'label': label, 'counts': counts}
+            for label, counts in trend.series],
+        'totals': trend.totals,
+    }, encoder=DjangoJSONEncoder)
+
+
+@sysadmin_required
+def export_view(request):
+    """
+    Stream the maintenance records matching the list view's filters as CSV
+    or JSON Lines (`?format=csv` or `?format=jsonl`).
+    """
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        raise Http404('Invalid export format.')
+
+    filter_form = MaintenanceRecordFilterForm(request.GET)
+    if not filter_form.is_valid():
+        raise Http404('Invalid filter.')
+    return export_response(
+        filter_form.filter(MaintenanceRecord.objects.all()), export_format)
+
+
+@sysadmin_required
+def maintenance_record_chain_view(request, pk):
+    chain, depth, direction = get_record_chain_or_404(request, pk)
+    records = MaintenanceRecord.objects.summaries().in_bulk(
+        list(chain.depths))
+    if pk not in records:
+        raise Http404('No maintenance record found.')
+
+    levels = {}
+    for record_pk, hops in chain.depths.items():
+        levels.setdefault(hops, []).append(records[record_pk])
+    for level in levels.values():
+        level.sort(key=lambda record: (record.datetime, record.pk),
+                   reverse=True)
+
+    context = {
+        'chain': chain,
+        'cycle_count': len(chain.cycles),
+        'depth': depth,
+        'direction': direction,
+        'directions': DIRECTIONS,
+        'levels': sorted(levels.items()),
+        'max_depth': SYSTEM_MAINTENANCE_CHAIN_MAX_DEPTH,
+        'object': records[pk],
+    }
+    return render(
+        request, 'system_maintenance/maintenance_record_chain.html', context)
+
+
+@sysadmin_required
+def maintenance_record_chain_json_view(request, pk):
+    chain, depth, direction = get_record_chain_or_404(request, pk)
+    summaries = MaintenanceRecord.objects.filter(
+        pk__in=list(chain.depths),
+    ).values(
+        'pk', 'datetime', 'status', 'system__name',
+        'maintenance_type__maintenance_type',
+    )
+    summaries = {summary['pk']: summary for summary in summaries}
+    if pk not in summaries:
+        raise Http404('No maintenance record found.')
+
+    in_cycle = set().union(*chain.cycles)
+    records = [
+        {
+            'id': record_pk,
+            'depth': hops,
+            'datetime': summaries[record_pk]['datetime'].isoformat(),
+            'in_cycle': record_pk in in_cycle,
+            'maintenance_type':
+                summaries[record_pk]['maintenance_type__maintenance_type'],
+            'status': summaries[record_pk]['status'],
+            'system': summaries[record_pk]['system__name'],
+            'url': reverse(
+                'system_maintenance:maintenance_record_detail',
+                args=[record_pk]),
+        }
+        for record_pk, hops in sorted(
+            chain.depths.items(), key=lambda item: (item[1], item[0]))]
+
+    return JsonResponse({
+        'root': pk,
+        'depth': depth,
+        'direction': direction,
+        'truncated': chain.truncated,
+        'records': records,
+        'edges': chain.edges,
+        'cycles': [sorted(cycle) for cycle in chain.cycles],
+    })
+
+
+def get_byte_range(range_header, length):
+    """
+    Return the `(start, stop)` offsets requested by a `Range: bytes=...`
+    header for content of `length` bytes, or None if the header is missing,
+    malformed or asks for several ranges (in which case the whole content is
+    sent). `start` is at least `length` if the range can't be satisfied.
+    """
+    match = re.fullmatch(r'\s*bytes=(\d*)-(\d*)\s*', range_header or '')
+    if not match or match.groups() == ('', ''):
+        return None
+
+    first, last = match.groups()
+    if not first:
+        # A suffix range: the last `last` bytes
+        return max(length - int(last), 0), length
+    start = int(first)
+    stop = length if not last else min(int(last) + 1, length)
+    if stop <= start and start < length:
+        return None
+    return start, stop
+
+
+def stream_bytes(content, start, stop, chunk_size=RAW_CHUNK_SIZE):
+    view = memoryview(content)
+    for offset in range(start, stop, chunk_size):
+        yield bytes(view[offset:min(offset + chunk_size, stop)])
+
+
+def raw_text_response(request, raw):
+    """
+    Return a streamed `text/plain` response of `raw`, honouring a `Range`
+    header (unless an `If-Range` header names an outdated ETag). `If-Range`
+    is ignored for requests that weren't given validators by
+    `versioned_condition`.
+    """
+    content = (raw or '').encode('utf-8')
+    length = len(content)
+
+    byte_range = get_byte_range(request.META.get('HTTP_RANGE'), length)
+    if_range = request.META.get('HTTP_IF_RANGE')
+    validators = getattr(request, '_system_maintenance_validators', None)
+    if byte_range and if_range and validators and \
+            if_range != quote_etag(validators[0]):
+        byte_range = None
+
+    if byte_range is None:
+        start, stop, status = 0, length, 200
+    elif byte_range[0] >= length:
+        response = HttpResponse(
+            status=416, content_type='text/plain; charset=utf-8')
+        response['Content-Range'] = 'bytes */{}'.format(length)
+        return response
     else:
-        pass
+        (start, stop), status = byte_range, 206
+
+    response = StreamingHttpResponse(
+        stream_bytes(content, start, stop), status=status,
+        content_type='text/plain; charset=utf-8')
+    response['Accept-Ranges'] = 'bytes'
+    response['Content-Length'] = stop - start
+    if status == 206:
+        response['Content-Range'] = 'bytes {}-{}/{}'.format(
+            start, stop - 1, length)
+    return response
 
-    field = getattr(record, kwargs['type_of_field'])
+
+def get_markup_field_or_404(type_of_record, type_of_field):
+    """
+    Return the model of a `RAW_FIELDS` record type and the fields its title
+    is built from, or raise `Http404` for an unknown record type or field.
+    """
+    try:
+        model, fields, title_fields = RAW_FIELDS[type_of_record]
+    except KeyError:
+        raise Http404('Unknown record type.')
+    if type_of_field not in fields:
+        raise Http404('Unknown field.')
+    return model, title_fields
+
+
+@sysadmin_required
+@versioned_condition(VERSIONED_MODELS)
+def fragment_view(request, type_of_record, type_of_field, record_pk):
+    """
+    Serve a markup field's rendered HTML on its own, for detail pages to
+    load their panel bodies after the rest of the page. Only the field's
+    rendered column is loaded.
+    """
+    model, _ = get_markup_field_or_404(type_of_record, type_of_field)
+    rendered = get_object_or_404(
+        model.objects.values_list(
+            '_{}_rendered'.format(type_of_field), flat=True),
+        pk=record_pk)
+    return HttpResponse(rendered or '')
+
+
+@sysadmin_required
+@versioned_condition(VERSIONED_MODELS)
+def raw_view(request, type_of_record, type_of_field, record_pk):
+    """
+    Show a markup field's raw text in a page, or, with `?format=text`, as
+    streamed plain text that supports `Range` requests. Only the field's
+    column (and, for the page, the record's title) is loaded.
+    """
+    model, title_fields = get_markup_field_or_404(
+        type_of_record, type_of_field)
+
+    if request.GET.get('format') == 'text':
+        raw = get_object_or_404(
+            model.objects.values_list(type_of_field, flat=True),
+            pk=record_pk)
+        return raw_text_response(request, raw)
+
+    record = get_object_or_404(
+        model.objects.only(type_of_field, *title_fields), pk=record_pk)
 
     context = {
-        'type_of_field': kwargs['type_of_field'],
-        'raw': field.raw,
+        'type_of_field': type_of_field,
+        'type_of_record': type_of_record,
+        'raw': getattr(record, type_of_field).raw,
         'record': record,
     }
     return render(
         request, 'system_maintenance/raw.html', context)
 
 
-@user_passes_test(
-    sysadmin_check,
-    login_url=reverse_lazy('system_maintenance:authentication'))
-def system_maintenance_home_view(request):
+def metrics_view(request):
+    """
+    Serve instrumentation metrics in Prometheus' text format to sysadmins
+    and to clients at `SYSTEM_MAINTENANCE_METRICS_IPS`.
+    """
+    if not (request.META.get('REMOTE_ADDR') in SYSTEM_MAINTENANCE_METRICS_IPS
+            or request_sysadmin_check(request)):
+        return HttpResponseForbidden(content_type='text/plain')
+    return HttpResponse(
+        metrics.render(), content_type='text/plain; version=0.0.4')
+
+
+@sysadmin_required
+def search_view(request):
+    query = request.GET.get('q', '').strip()
+    record_type = request.GET.get('type')
+    record_types = [record_type] if record_type in [
+        'documentation', 'maintenance'] else None
+
+    hits = search(query, record_types=record_types) if query else []
+    page_obj = Paginator(hits, SYSTEM_MAINTENANCE_PAGINATE_BY).get_page(
+        request.GET.get('page'))
+
+    # Load only the records on this page, keeping the order of the hits
+    records = {
+        'documentation': DocumentationRecord.objects.summaries(),
+        'maintenance': MaintenanceRecord.objects.summaries(),
+    }
+    for hit_type, queryset in records.items():
+        records[hit_type] = queryset.in_bulk(
+            [hit.record_id for hit in page_obj if hit.record_type == hit_type])
+    results = [
+        (hit.record_type, records[hit.record_type][hit.record_id])
+        for hit in page_obj if hit.record_id in records[hit.record_type]]
+
     context = {
-        'documentation_record_count':
-            DocumentationRecord.objects.all().count(),
-        'hardware_count': Hardware.objects.all().count(),
-        'maintenance_record_count': MaintenanceRecord.objects.all().count(),
-        'maintenance_type_count': MaintenanceType.objects.all().count(),
-        'software_count': Software.objects.all().count(),
-        'sys_admin_count': SysAdmin.objects.all().count(),
-        'system_count': System.objects.all().count(),
+        'is_paginated': page_obj.has_other_pages(),
+        'page_obj': page_obj,
+        'pagination_query': get_pagination_query(request),
+        'query': query,
+        'record_type': record_type,
+        'results': results,
     }
+    return render(
+        request, 'system_maintenance/search_results.html', context)
+
+
+@sysadmin_required
+@versioned_condition(list(DASHBOARD_COUNT_MODELS.values()))
+def system_maintenance_home_view(request):
+    context = get_dashboard_counts()
     return render(
         request, 'system_maintenance/system_maintenance_home.html', context)
 
 
-class DocumentationRecordDetailView(SysAdminRequiredMixin, DetailView):
+class DocumentationRecordDetailView(
+        SysAdminRequiredMixin, ConditionalGetMixin, DetailView):
 
     model = DocumentationRecord
     template_name = 'system_maintenance/documentation_record_detail.html'
 
+    def get_queryset(self):
+        return super().get_queryset().select_related(
+            'maintenance_type',
+        ).prefetch_related(
+            Prefetch(
+                'maintenance_records',
+                queryset=MaintenanceRecord.objects.summaries()),
+        )
 
-class DocumentationRecordListView(SysAdminRequiredMixin, ListView):
 
+class DocumentationRecordListView(
+        SysAdminRequiredMixin, ConditionalGetMixin, VersionedPageCacheMixin,
+        KeysetPaginationMixin, ListView):
+
+    condition_models = [DocumentationRecord, MaintenanceType]
+    keyset_ordering = ['title']
     model = DocumentationRecord
     paginate_by = SYSTEM_MAINTENANCE_PAGINATE_BY
     template_name = 'system_maintenance/documentation_record_list.html'
 
+    def get_queryset(self):
+        return super().get_queryset().summaries()
+
 
-class MaintenanceRecordDetailView(SysAdminRequiredMixin, DetailView):
+class MaintenanceRecordDetailView(
+        SysAdminRequiredMixin, ConditionalGetMixin, DetailView):
 
     model = MaintenanceRecord
     template_name = 'system_maintenance/maintenance_record_detail.html'
 
+    def get_lazy_panels(self):
+        """
+        Return whether the markup panels and related documents' bodies are
+        loaded from `fragment_view` after the page (by app.js), instead of
+        inlined. `?panels=all` inlines them, for browsers without
+        JavaScript.
+        """
+        return self.request.GET.get('panels') != 'all'
+
+    def get_queryset(self):
+        queryset = super().get_queryset().with_related(
+        ).with_relation_counts().with_markup_lengths()
+        documentation_records = DocumentationRecord.objects.all()
+        if self.get_lazy_panels():
+            queryset = queryset.defer(
+                *get_markup_columns(MAINTENANCE_MARKUP_FIELDS))
+            documentation_records = documentation_records.defer(
+                *get_markup_columns(['documentation']))
+
+        return queryset.prefetch_related(
+            'hardware',
+            'software',
+            Prefetch(
+                'documentation_records', queryset=documentation_records),
+            Prefetch(
+                'referenced_records',
+                queryset=MaintenanceRecord.objects.summaries()),
+            Prefetch(
+                'referencing_records',
+                queryset=MaintenanceRecord.objects.summaries()),
+        )
 
-class MaintenanceRecordListView(SysAdminRequiredMixin, ListView):
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['lazy_panels'] = self.get_lazy_panels()
+        return context
 
+
+class MaintenanceRecordListView(
+        SysAdminRequiredMixin, ConditionalGetMixin, VersionedPageCacheMixin,
+        KeysetPaginationMixin, ListView):
+
+    keyset_ordering = ['-datetime', 'pk']
     model = MaintenanceRecord
     paginate_by = SYSTEM_MAINTENANCE_PAGINATE_BY
     template_name = 'system_maintenance/maintenance_record_list.html'
+
+    def get_queryset(self):
+        self.filter_form = MaintenanceRecordFilterForm(self.request.GET)
+        if not self.filter_form.is_valid():
+            raise Http404('Invalid filter.')
+        return self.filter_form.filter(super().get_queryset().summaries())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['active_filters'] = self.filter_form.get_active_filters()
+        return context